@@ -0,0 +1,230 @@
+# async_engine.py
+import asyncio
+import logging
+from types import ModuleType
+from typing import Any, Dict, List, Optional
+
+from googleapiclient.discovery import Resource
+
+from chat_pipeline import ChatPipeline
+from checkpoint import CheckpointStore
+from metrics import POLL_LAG
+from outbound import OutboundDispatcher, OutboundMessage
+from polling import PollScheduler
+from scheduler import Job, Scheduler, message_jobs
+from youtube_api import (
+    LiveChatEndedError,
+    PageTokenInvalidError,
+    get_chat_messages,
+    send_chat_message,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncChatEngine:
+    """
+    Runs polling, message processing, outbound sends and the message scheduler
+    as independent asyncio tasks connected by bounded queues.
+
+    Blocking googleapiclient calls run in worker threads, so a slow
+    liveChatMessages().insert never delays fetching the next page. The inbound
+    queue applies backpressure to polling; the outbound queue drops messages
+    when full instead of stalling message processing. The send task hands
+    queued messages to an OutboundDispatcher, which batches and rate limits them.
+    """
+
+    def __init__(
+        self,
+        youtube: Resource,
+        live_chat_id: str,
+        pipeline: ChatPipeline,
+        config: ModuleType,
+        dispatcher: Optional[OutboundDispatcher] = None,
+        checkpoints: Optional[CheckpointStore] = None,
+    ) -> None:
+        self.youtube = youtube
+        self.live_chat_id = live_chat_id
+        self.pipeline = pipeline
+        self.config = config
+        self.inbound: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(
+            maxsize=config.ASYNC_INBOUND_QUEUE_SIZE
+        )
+        self.outbound: "asyncio.Queue[Optional[OutboundMessage]]" = asyncio.Queue(
+            maxsize=config.ASYNC_OUTBOUND_QUEUE_SIZE
+        )
+        self.dispatcher = dispatcher or OutboundDispatcher(
+            lambda text: send_chat_message(youtube, live_chat_id, text), config
+        )
+        self.poller = PollScheduler(config)
+        self.checkpoints = checkpoints
+        self.resume_token: Optional[str] = None
+        checkpoint = checkpoints.get(live_chat_id) if checkpoints else None
+        if checkpoint and checkpoint.get("page_token"):
+            logger.info("Resuming live chat %s from the last checkpoint.", live_chat_id)
+            self.resume_token = checkpoint["page_token"]
+            pipeline.resume_after(checkpoint.get("last_message_id"))
+        self.stopped = asyncio.Event()
+        self.scheduler = Scheduler()
+        self.scheduler.replace(self._message_jobs(config))
+        self._scheduler_wakeup = asyncio.Event()
+        self.finished = False
+        self.dropped_messages = 0
+
+    def apply_config(self, config: ModuleType) -> None:
+        """Switches the engine and its pipeline to a reloaded config snapshot."""
+        # Built first, so bad jobs leave the engine on the old config
+        jobs = self._message_jobs(config)
+        self.pipeline.apply_config(config)
+        self.dispatcher.config = config
+        self.config = config
+        self.scheduler.replace(jobs)
+
+    def _message_jobs(self, config: ModuleType) -> List[Job]:
+        return message_jobs(
+            config, self.enqueue_outbound, lambda: self.pipeline.last_activity_at
+        )
+
+    def enqueue_outbound(self, message: OutboundMessage) -> bool:
+        """Queues a message for sending. Returns False if the queue is full."""
+        try:
+            self.outbound.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.dropped_messages += 1
+            logger.warning("Outbound queue is full. Dropping message: %s", message)
+            return False
+
+    async def poll_loop(self) -> None:
+        """Fetches pages of chat messages and hands them to the processor."""
+        next_page_token = self.resume_token
+        loop = asyncio.get_running_loop()
+        try:
+            while not self.stopped.is_set():
+                poll_started = loop.time()
+                try:
+                    chat_response = await asyncio.to_thread(
+                        get_chat_messages,
+                        self.youtube,
+                        self.live_chat_id,
+                        next_page_token,
+                    )
+                except LiveChatEndedError as e:
+                    logger.warning("The live chat has ended (%s).", e)
+                    if self.checkpoints is not None:
+                        self.checkpoints.clear(self.live_chat_id)
+                    self.finished = True
+                    break
+                except PageTokenInvalidError as e:
+                    # The saved page token has expired: start over from the live
+                    # edge. Other errors keep the token and retry.
+                    logger.warning(
+                        "Could not resume from the page token (%s). Starting fresh.",
+                        e,
+                    )
+                    next_page_token = None
+                    self.pipeline.start_fresh()
+                    continue
+                if not chat_response:
+                    retry_delay = self.poller.on_error()
+                    if retry_delay is None:
+                        logger.warning(
+                            "Could not retrieve chat messages. The stream might have ended."
+                        )
+                        self.finished = True
+                        break
+                    logger.warning(
+                        "Could not retrieve chat messages. Retrying in %.1fs.",
+                        retry_delay,
+                    )
+                    delay = retry_delay
+                else:
+                    await self.inbound.put(chat_response)
+                    next_page_token = chat_response.get("nextPageToken")
+                    delay = self.poller.next_delay(
+                        chat_response.get("pollingIntervalMillis"),
+                        loop.time() - poll_started,
+                        len(chat_response.get("items", [])),
+                    )
+                poll_due_at = loop.time() + delay
+                try:
+                    await asyncio.wait_for(self.stopped.wait(), delay)
+                except asyncio.TimeoutError:
+                    POLL_LAG.observe(max(0.0, loop.time() - poll_due_at))
+        finally:
+            await self.inbound.put(None)
+
+    async def process_loop(self) -> None:
+        """Runs pages through the chat pipeline and queues the responses."""
+        try:
+            while True:
+                chat_response = await self.inbound.get()
+                if chat_response is None:
+                    break
+                # Commands may block, so keep them off the event loop
+                responses = await asyncio.to_thread(
+                    self.pipeline.process_page, chat_response
+                )
+                if self.checkpoints is not None and chat_response.get("items"):
+                    self.checkpoints.update(
+                        self.live_chat_id,
+                        chat_response.get("nextPageToken"),
+                        self.pipeline.last_message_id,
+                    )
+                for response in responses:
+                    self.enqueue_outbound(response)
+        finally:
+            await self.outbound.put(None)
+
+    async def send_loop(self) -> None:
+        """Feeds queued messages to the dispatcher and sends them as they become due."""
+        while True:
+            try:
+                message = await asyncio.wait_for(
+                    self.outbound.get(), self.dispatcher.time_until_due()
+                )
+            except asyncio.TimeoutError:
+                await asyncio.to_thread(self.dispatcher.flush)
+                continue
+            if message is None:
+                # Don't hold back welcomes waiting for more names on shutdown
+                await asyncio.to_thread(self.dispatcher.flush, True)
+                break
+            self.dispatcher.submit(message)
+            await asyncio.to_thread(self.dispatcher.flush)
+
+    async def scheduler_loop(self) -> None:
+        """Runs scheduled jobs on the loop, sleeping until the next one is due."""
+        loop = asyncio.get_running_loop()
+        # Reloads change the jobs from the config watcher's thread
+        self.scheduler.notify = lambda: loop.call_soon_threadsafe(
+            self._scheduler_wakeup.set
+        )
+        while not self.stopped.is_set():
+            self._scheduler_wakeup.clear()
+            delay = self.scheduler.run_pending()
+            try:
+                await asyncio.wait_for(self._scheduler_wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self) -> None:
+        """Runs the engine until the stream ends or stop() is called."""
+        loop = asyncio.get_running_loop()
+        # Command responses finish on executor threads: hop back onto the loop
+        self.pipeline.respond = lambda message: loop.call_soon_threadsafe(
+            self.enqueue_outbound, message
+        )
+        scheduler = asyncio.create_task(self.scheduler_loop())
+        try:
+            await asyncio.gather(
+                self.poll_loop(), self.process_loop(), self.send_loop()
+            )
+        finally:
+            self.stop()
+            await scheduler
+
+    def stop(self) -> None:
+        """Asks the engine to stop after the current poll."""
+        self.stopped.set()
+        self._scheduler_wakeup.set()
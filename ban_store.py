@@ -0,0 +1,138 @@
+# ban_store.py
+import json
+import logging
+import os
+import threading
+import time
+from typing import FrozenSet, Iterable, Optional
+
+import config
+from file_utils import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+
+class BanStore:
+    """
+    In-memory ban list backed by a JSON file.
+    The file is read once and kept in a frozenset, so membership checks are O(1)
+    and lock-free. Mutations are written through atomically, and maybe_reload()
+    picks up external edits by checking the file's mtime at most every
+    reload_interval seconds.
+    """
+
+    def __init__(self, path: str, reload_interval: float = 5.0) -> None:
+        self.path = path
+        self.reload_interval = reload_interval
+        self._users: FrozenSet[str] = frozenset()
+        self._mtime_ns: Optional[int] = None
+        self._next_check = 0.0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def __contains__(self, username: object) -> bool:
+        if not self._loaded:
+            self.load()
+        return username in self._users
+
+    def __len__(self) -> int:
+        if not self._loaded:
+            self.load()
+        return len(self._users)
+
+    def users(self) -> FrozenSet[str]:
+        """Returns an immutable snapshot of the banned users."""
+        if not self._loaded:
+            self.load()
+        return self._users
+
+    def _stat_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def load(self) -> None:
+        """(Re)reads the ban list from disk."""
+        with self._lock:
+            mtime_ns = self._stat_mtime()
+            users: FrozenSet[str] = frozenset()
+            if mtime_ns is not None:
+                try:
+                    with open(self.path, "r") as f:
+                        data = json.load(f)
+                    users = frozenset(data.get("banned_users", []))
+                except (json.JSONDecodeError, IOError) as e:
+                    logger.error("Error loading banned users: %s", e)
+                    # Keep serving the previous list rather than unbanning everyone
+                    users = self._users
+            self._users = users
+            self._mtime_ns = mtime_ns
+            self._loaded = True
+            self._next_check = time.monotonic() + self.reload_interval
+
+    def maybe_reload(self, now: Optional[float] = None) -> bool:
+        """Reloads the file if it changed on disk. Returns True if it was reloaded."""
+        if not self._loaded:
+            self.load()
+            return True
+        now = time.monotonic() if now is None else now
+        if now < self._next_check:
+            return False
+        self._next_check = now + self.reload_interval
+        if self._stat_mtime() == self._mtime_ns:
+            return False
+        logger.info("Ban list %s changed on disk. Reloading.", self.path)
+        self.load()
+        return True
+
+    def _write(self, users: FrozenSet[str]) -> None:
+        # Called with the lock held
+        try:
+            atomic_write_json(self.path, {"banned_users": sorted(users)})
+        except IOError as e:
+            logger.error("Error saving banned users: %s", e)
+        self._users = users
+        self._mtime_ns = self._stat_mtime()
+
+    def add(self, username: str) -> bool:
+        """Bans a user. Returns False if the user was already banned."""
+        if not self._loaded:
+            self.load()
+        with self._lock:
+            if username in self._users:
+                return False
+            self._write(self._users | {username})
+            return True
+
+    def remove(self, username: str) -> bool:
+        """Unbans a user. Returns False if the user was not banned."""
+        if not self._loaded:
+            self.load()
+        with self._lock:
+            if username not in self._users:
+                return False
+            self._write(self._users - {username})
+            return True
+
+    def replace(self, usernames: Iterable[str]) -> None:
+        """Replaces the whole ban list."""
+        with self._lock:
+            self._write(frozenset(usernames))
+            self._loaded = True
+
+
+_ban_store: Optional[BanStore] = None
+_ban_store_lock = threading.Lock()
+
+
+def get_ban_store() -> BanStore:
+    """Returns the process-wide ban store shared by the bot and the ban commands."""
+    global _ban_store
+    if _ban_store is None:
+        with _ban_store_lock:
+            if _ban_store is None:
+                _ban_store = BanStore(
+                    config.BANNED_USERS_FILE, config.BAN_LIST_RELOAD_SECONDS
+                )
+    return _ban_store
@@ -0,0 +1,58 @@
+# benchmarks/bench_ban_store.py
+"""
+Compares the per-message cost of the ban check before and after BanStore.
+
+Run from the project root:
+    python -m benchmarks.bench_ban_store [num_banned] [num_messages]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Set
+
+from ban_store import BanStore
+
+
+def legacy_load_banned_users(banned_file: str) -> Set[str]:
+    """The old per-message implementation: stat, open and parse the file."""
+    if os.path.exists(banned_file):
+        with open(banned_file, "r") as f:
+            data = json.load(f)
+            return set(data.get("banned_users", []))
+    return set()
+
+
+def main() -> None:
+    num_banned = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    num_messages = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "banned_users.json")
+        with open(path, "w") as f:
+            json.dump({"banned_users": [f"user{i}" for i in range(num_banned)]}, f)
+        authors = [f"chatter{i}" for i in range(num_messages)]
+
+        start = time.perf_counter()
+        for author in authors:
+            _ = author in legacy_load_banned_users(path)
+        legacy = (time.perf_counter() - start) / num_messages
+
+        store = BanStore(path)
+        store.load()
+        start = time.perf_counter()
+        for author in authors:
+            store.maybe_reload()
+            _ = author in store
+        cached = (time.perf_counter() - start) / num_messages
+
+    print(f"ban list size:           {num_banned}")
+    print(f"legacy per message:      {legacy * 1e6:12.2f} us")
+    print(f"BanStore per message:    {cached * 1e6:12.2f} us")
+    print(f"speedup:                 {legacy / cached:12.0f}x")
+
+
+if __name__ == "__main__":
+    main()
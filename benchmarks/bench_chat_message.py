@@ -0,0 +1,77 @@
+# benchmarks/bench_chat_message.py
+"""
+Compares the per-item ingestion cost of the original loop in main.py with
+ChatMessage.from_item, on pages of synthetic items with distinct publishedAt
+values.
+
+Run from the project root:
+    python -m benchmarks.bench_chat_message [items_per_page] [pages]
+"""
+
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+from chat_message import ChatMessage, parse_timestamp
+from fake_youtube import make_chat_item
+
+
+def legacy_normalize(item: Dict[str, Any]) -> Tuple[str, str, str, float]:
+    """The original per-item work in main.main(), including the in-loop import."""
+    author_details = item["authorDetails"]
+    author_id = author_details["channelId"]
+    author_name = author_details["displayName"]
+    message = item["snippet"]["displayMessage"].strip()
+    message_time_str = item["snippet"]["publishedAt"]
+    from datetime import datetime
+
+    message_time = datetime.fromisoformat(
+        message_time_str.replace("Z", "+00:00")
+    ).timestamp()
+    return author_id, author_name, message, message_time
+
+
+def legacy_parse(value: str) -> float:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def make_page(size: int) -> List[Dict[str, Any]]:
+    start = 1_700_000_000.0
+    return [
+        make_chat_item(
+            f"m{i}", f"UC{i % 5000}", f"User {i % 5000}", "hello", start + i * 0.013
+        )
+        for i in range(size)
+    ]
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    page = make_page(size)
+
+    stamps = [item["snippet"]["publishedAt"] for item in page]
+
+    def best(fn: Callable[[], object]) -> float:
+        timings = []
+        for _ in range(pages):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings) / size * 1e9
+
+    legacy_ts = best(lambda: [legacy_parse(s) for s in stamps])
+    fast_ts = best(lambda: [parse_timestamp(s) for s in stamps])
+    legacy = best(lambda: [legacy_normalize(item) for item in page])
+    fast = best(lambda: [ChatMessage.from_item(item) for item in page])
+
+    print(f"items per page:            {size}")
+    print(f"legacy timestamp parse:    {legacy_ts:10.0f} ns/item")
+    print(f"parse_timestamp:           {fast_ts:10.0f} ns/item")
+    print(f"legacy item normalization: {legacy:10.0f} ns/item")
+    print(f"ChatMessage.from_item:     {fast:10.0f} ns/item")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_command_handler.py
+"""
+Measures handle_command throughput on synthetic chat, against the previous
+implementation (split every message, log the registry, rebuild role lists).
+
+Run from the project root:
+    python -m benchmarks.bench_command_handler [num_messages]
+"""
+
+import logging
+import random
+import sys
+import time
+from types import ModuleType
+from typing import Callable, List, Optional
+
+import config
+import command_handler
+from command_handler import commands, handle_command, load_commands
+
+
+def legacy_has_permission(author_id: str, command: str, config: ModuleType) -> bool:
+    if command not in config.COMMAND_PERMISSIONS:
+        return True
+    user_roles: List[str] = []
+    if author_id in config.MODERATORS:
+        user_roles.append("moderator")
+    for role in config.COMMAND_PERMISSIONS[command]:
+        if role in user_roles:
+            return True
+    return False
+
+
+def legacy_handle_command(
+    command: str, config: ModuleType, author_id: str, message: str
+) -> Optional[str]:
+    command_name = message.split(" ")[0]
+    logging.info(f"Handling command: {command_name}")
+    logging.info(f"Available commands: {commands.keys()}")
+    if command_name in commands:
+        if legacy_has_permission(author_id, command_name, config):
+            return commands[command_name](config, message)
+        return "You do not have permission to use this command."
+    return None
+
+
+def synthetic_messages(count: int, command_ratio: float = 0.1) -> List[str]:
+    rng = random.Random(42)
+    chatter = ["hello!", "lol", "first time here", "gg", "what game is this?"]
+    command_list = ["!link", "!discord", "!ban someone", "!unknown"]
+    return [
+        (
+            rng.choice(command_list)
+            if rng.random() < command_ratio
+            else rng.choice(chatter)
+        )
+        for _ in range(count)
+    ]
+
+
+def run(
+    handler: Callable[[str, ModuleType, str, str], Optional[str]],
+    messages: List[str],
+) -> float:
+    start = time.perf_counter()
+    for message in messages:
+        handler(message, config, "UCviewer", message)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    logging.getLogger().setLevel(logging.ERROR)
+    load_commands()
+    # Keep the !ban path on the permission check rather than touching the ban list
+    config.MODERATORS = [f"UCmod{i}" for i in range(50)]
+    config.GLOBAL_COMMAND_COOLDOWN_SECONDS = 0
+    command_handler.cooldowns.reset()
+    messages = synthetic_messages(count)
+
+    for name, handler in (
+        ("legacy", legacy_handle_command),
+        ("compiled", handle_command),
+    ):
+        elapsed = run(handler, messages)
+        print(
+            f"{name:10} {count / elapsed:14,.0f} msgs/s  "
+            f"({elapsed / count * 1e9:8.0f} ns/msg)"
+        )
+
+
+if __name__ == "__main__":
+    main()
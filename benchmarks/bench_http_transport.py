@@ -0,0 +1,131 @@
+# benchmarks/bench_http_transport.py
+"""
+Compares YouTube API request latency with pooled keep-alive connections
+(ThreadLocalHttp) and with a fresh connection per request, the only
+thread-safe option without pooling. Runs against fake_youtube_server.py in a
+separate process, over plain HTTP on loopback, so the saving per request is
+the TCP handshake; against the real API pooling also saves the TLS handshake.
+
+Run from the project root:
+    python -m benchmarks.bench_http_transport [requests] [threads]
+"""
+
+import logging
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import httplib2
+from googleapiclient.discovery import Resource, build
+
+from http_transport import ThreadLocalHttp
+from youtube_api import get_chat_messages, get_live_chat_id
+
+
+class FreshConnectionHttp:
+    """Opens a new connection for every request."""
+
+    def request(
+        self,
+        uri: str,
+        method: str = "GET",
+        body: Optional[Any] = None,
+        headers: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> Tuple[Any, bytes]:
+        http = httplib2.Http()
+        try:
+            return http.request(
+                uri, method=method, body=body, headers=headers, **kwargs
+            )
+        finally:
+            http.close()
+
+
+def start_server(port: int) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "fake_youtube_server.py", "--port", str(port)],
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.05)
+    server.kill()
+    raise RuntimeError("fake_youtube_server.py did not start")
+
+
+def make_service(endpoint: str, http: Any) -> Resource:
+    return build(
+        "youtube",
+        "v3",
+        http=http,
+        client_options={"api_endpoint": endpoint},
+        static_discovery=True,
+    )
+
+
+def timed_polls(youtube: Resource, live_chat_id: str, count: int) -> List[float]:
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        get_chat_messages(youtube, live_chat_id)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label: str, timings: List[float], elapsed: float) -> None:
+    timings.sort()
+    p50 = timings[len(timings) // 2] * 1000
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000
+    print(
+        f"{label:36} p50 {p50:7.2f} ms   p99 {p99:7.2f} ms   "
+        f"{len(timings) / elapsed:8.0f} req/s"
+    )
+
+
+def main() -> None:
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    logging.basicConfig(level=logging.ERROR)
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    endpoint = f"http://127.0.0.1:{port}"
+    server = start_server(port)
+    try:
+        for label, http in (
+            ("fresh connection", FreshConnectionHttp()),
+            ("pooled (ThreadLocalHttp)", ThreadLocalHttp()),
+        ):
+            youtube = make_service(endpoint, http)
+            live_chat_id = get_live_chat_id(youtube, "bench")
+            assert live_chat_id is not None
+
+            start = time.perf_counter()
+            timings = timed_polls(youtube, live_chat_id, requests)
+            report(f"{label}, 1 thread", timings, time.perf_counter() - start)
+
+            per_thread = requests // threads
+            start = time.perf_counter()
+            with ThreadPoolExecutor(threads) as pool:
+                results = pool.map(
+                    lambda _: timed_polls(youtube, live_chat_id, per_thread),
+                    range(threads),
+                )
+                timings = [t for result in results for t in result]
+            report(f"{label}, {threads} threads", timings, time.perf_counter() - start)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
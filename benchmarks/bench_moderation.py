@@ -0,0 +1,117 @@
+# benchmarks/bench_moderation.py
+"""
+Compares banned-phrase matching strategies with many phrases: one regex per
+phrase, a single alternation regex (both timed on a sample and extrapolated,
+since they are far too slow to run over every message), and the
+ModerationFilter automaton over every message. Also reports
+how long compiling the automaton takes, which is what a config reload pays.
+
+Run from the project root:
+    python -m benchmarks.bench_moderation [phrases] [messages]
+"""
+
+import random
+import re
+import sys
+import time
+from typing import Callable, List, Pattern, Set, Tuple
+
+from moderation import ModerationFilter
+
+SYLLABLES = ["ka", "lo", "mi", "nu", "sa", "te", "ri", "po", "vu", "xe", "zo", "qi"]
+
+
+def make_word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def make_phrases(count: int, rng: random.Random) -> List[str]:
+    phrases: Set[str] = set()
+    while len(phrases) < count:
+        # Two-word phrases, so random messages rarely contain one by chance
+        phrases.add(f"{make_word(rng)} {make_word(rng)}")
+    return sorted(phrases)
+
+
+def make_messages(
+    count: int, phrases: List[str], rng: random.Random, hit_rate: float = 0.01
+) -> List[str]:
+    messages = []
+    for _ in range(count):
+        words = [make_word(rng) for _ in range(rng.randint(3, 12))]
+        if rng.random() < hit_rate:
+            words.insert(rng.randrange(len(words)), rng.choice(phrases))
+        messages.append(" ".join(words))
+    return messages
+
+
+def timed(fn: Callable[[], int]) -> Tuple[float, int]:
+    start = time.perf_counter()
+    hits = fn()
+    return time.perf_counter() - start, hits
+
+
+def main() -> None:
+    num_phrases = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    num_messages = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    rng = random.Random(0)
+    phrases = make_phrases(num_phrases, rng)
+    messages = make_messages(num_messages, phrases, rng)
+    loop_sample = messages[:200]
+    alternation_sample = messages[:2000]
+
+    start = time.perf_counter()
+    moderation_filter = ModerationFilter([{"phrases": phrases, "action": "ignore"}])
+    compile_automaton = time.perf_counter() - start
+
+    start = time.perf_counter()
+    per_phrase: List[Pattern[str]] = [
+        re.compile(rf"\b{re.escape(phrase)}\b", re.IGNORECASE) for phrase in phrases
+    ]
+    compile_per_phrase = time.perf_counter() - start
+
+    start = time.perf_counter()
+    alternation = re.compile(
+        r"\b(?:" + "|".join(map(re.escape, phrases)) + r")\b", re.IGNORECASE
+    )
+    compile_alternation = time.perf_counter() - start
+
+    loop_time, _ = timed(
+        lambda: sum(
+            any(pattern.search(text) for pattern in per_phrase) for text in loop_sample
+        )
+    )
+    alternation_time, _ = timed(
+        lambda: sum(alternation.search(text) is not None for text in alternation_sample)
+    )
+    automaton_time, automaton_hits = timed(
+        lambda: sum(moderation_filter.check(text) is not None for text in messages)
+    )
+
+    def per_message(seconds: float, count: int) -> float:
+        return seconds / count * 1e6
+
+    def all_messages(seconds: float, count: int) -> str:
+        return f"~{seconds / count * num_messages:.0f} s for all messages"
+
+    print(f"phrases: {num_phrases}, messages: {num_messages}")
+    print(f"automaton states: {moderation_filter.automaton.states}")
+    print(
+        f"compile: automaton {compile_automaton * 1000:.0f} ms, "
+        f"per-phrase regexes {compile_per_phrase * 1000:.0f} ms, "
+        f"alternation regex {compile_alternation * 1000:.0f} ms"
+    )
+    for name, seconds, count in (
+        ("per-phrase regex loop", loop_time, len(loop_sample)),
+        ("alternation regex", alternation_time, len(alternation_sample)),
+        ("ModerationFilter", automaton_time, num_messages),
+    ):
+        print(
+            f"{name + ':':22} {per_message(seconds, count):10.1f} us/message"
+            f"  ({all_messages(seconds, count)})"
+        )
+    print(f"messages with a banned phrase: {automaton_hits}")
+
+
+if __name__ == "__main__":
+    main()
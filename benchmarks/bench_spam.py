@@ -0,0 +1,75 @@
+# benchmarks/bench_spam.py
+"""
+Measures SpamDetector throughput on a chat where a share of the messages is
+a copy-paste raid, and shows that the time per message and the index size
+stay flat as the chat grows.
+
+Run from the project root:
+    python -m benchmarks.bench_spam [messages] [users]
+"""
+
+import random
+import sys
+import time
+from collections import Counter
+from typing import Counter as CounterType
+from typing import List, Optional
+
+import config
+from chat_message import ChatMessage
+from fake_youtube import make_chat_item
+from spam import SpamDetector
+
+WORDS = (
+    "the stream is so good today love this game what a play gg lets go "
+    "chat when is the next video hello from brazil nice clutch lol that was "
+    "insane can you play the old map again"
+).split()
+RAID = "FREE robux giveaway at my channel, go check it out now"
+
+
+def make_messages(
+    count: int, users: int, rng: random.Random, raid_rate: float = 0.1
+) -> List[ChatMessage]:
+    messages = []
+    for i in range(count):
+        author = f"UC{rng.randrange(users)}"
+        if rng.random() < raid_rate:
+            text = RAID + "!" * rng.randint(0, 3)
+        else:
+            text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 14)))
+        item = make_chat_item(f"m{i}", author, author, text)
+        messages.append(ChatMessage.from_item(item))
+    return messages
+
+
+def main() -> None:
+    num_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    num_users = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    rng = random.Random(0)
+    messages = make_messages(num_messages, num_users, rng)
+    detector = SpamDetector(config)
+
+    verdicts: CounterType[Optional[str]] = Counter()
+    # 50 messages per second of chat time
+    chunk = num_messages // 4
+    for part in range(4):
+        start = time.perf_counter()
+        for i in range(part * chunk, (part + 1) * chunk):
+            verdicts[detector.check(messages[i], i / 50)] += 1
+        elapsed = time.perf_counter() - start
+        print(
+            f"messages {part * chunk:>7}-{(part + 1) * chunk:<7} "
+            f"{elapsed / chunk * 1e6:6.1f} us/message, "
+            f"index {len(detector.duplicates)} entries, "
+            f"{len(detector.flood)} users tracked"
+        )
+    print(f"memory: ~{detector.memory_usage() / 1e6:.1f} MB")
+    print(
+        f"verdicts: {verdicts['duplicate']} duplicate, {verdicts['flood']} flood, "
+        f"{verdicts[None]} clean"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# benchmarks/test_pipeline_throughput.py
+"""
+pytest-benchmark suite for the chat hot loop. Not collected by a plain
+`pytest` run; run it explicitly and compare against a saved baseline:
+
+    pytest benchmarks --benchmark-autosave
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:10%
+
+Messages/sec, p50/p99 handle latency, sends per page and peak memory are
+stored in each benchmark's extra_info.
+"""
+
+import logging
+from typing import Any, List
+
+import pytest
+
+from replay import Page, ReplayResult, generate_pages, replay
+
+pytest.importorskip("pytest_benchmark")
+
+PAGES = 20
+ITEMS_PER_PAGE = 2000
+
+
+@pytest.fixture(scope="module", autouse=True)
+def quiet_logging() -> Any:
+    root = logging.getLogger()
+    level = root.level
+    root.setLevel(logging.ERROR)
+    yield
+    root.setLevel(level)
+
+
+def record(benchmark: Any, result: ReplayResult) -> None:
+    for key, value in result.as_dict().items():
+        benchmark.extra_info[key] = round(value, 2)
+
+
+@pytest.mark.parametrize("num_users", [100, 10_000])
+def test_replay_throughput(benchmark: Any, num_users: int) -> None:
+    pages = generate_pages(PAGES, ITEMS_PER_PAGE, num_users=num_users)
+    results: List[ReplayResult] = []
+
+    def run() -> None:
+        results.append(replay(pages))
+
+    benchmark.pedantic(run, rounds=5, iterations=1)
+    record(benchmark, results[-1])
+    assert results[-1].messages == PAGES * ITEMS_PER_PAGE
+
+
+def test_replay_peak_memory(benchmark: Any) -> None:
+    pages: List[Page] = generate_pages(PAGES, ITEMS_PER_PAGE, num_users=10_000)
+    results: List[ReplayResult] = []
+
+    def run() -> None:
+        results.append(replay(pages, trace_memory=True))
+
+    benchmark.pedantic(run, rounds=1, iterations=1)
+    record(benchmark, results[-1])
+    assert results[-1].peak_memory
@@ -0,0 +1,98 @@
+# chat_message.py
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+_fromisoformat = datetime.fromisoformat
+
+# authorDetails flags and the role names they map to
+_ROLE_FLAGS = (
+    ("isChatOwner", "owner"),
+    ("isChatModerator", "moderator"),
+    ("isChatSponsor", "sponsor"),
+    ("isVerified", "verified"),
+)
+# Chat roles that are never moderated and bypass command cooldowns
+EXEMPT_ROLES = frozenset({"owner", "moderator"})
+# Every combination of flags maps to one shared frozenset
+_ROLE_SETS: Dict[Tuple[Any, ...], FrozenSet[str]] = {}
+
+
+def parse_timestamp(value: str) -> float:
+    """
+    Converts an ISO 8601 publishedAt value to a Unix timestamp.
+    YouTube sends "+00:00" offsets, which fromisoformat (implemented in C)
+    parses directly; only a trailing "Z", which Python < 3.11 rejects, is
+    rewritten first.
+    """
+    if value[-1] == "Z":
+        value = value[:-1] + "+00:00"
+    return _fromisoformat(value).timestamp()
+
+
+def roles_from_details(author_details: Dict[str, Any]) -> FrozenSet[str]:
+    """Returns the shared role set for the flags in an authorDetails object."""
+    key = tuple(author_details.get(flag, False) for flag, _ in _ROLE_FLAGS)
+    roles = _ROLE_SETS.get(key)
+    if roles is None:
+        roles = frozenset(role for (_, role), on in zip(_ROLE_FLAGS, key) if on)
+        _ROLE_SETS[key] = roles
+    return roles
+
+
+class ChatMessage:
+    """
+    A chat item from liveChatMessages().list, normalized once on ingestion and
+    shared by logging, cooldowns, de-duplication and commands.
+    """
+
+    __slots__ = (
+        "id",
+        "author_id",
+        "author_name",
+        "text",
+        "published_at",
+        "_author_details",
+    )
+
+    def __init__(
+        self,
+        id: Optional[str],
+        author_id: str,
+        author_name: str,
+        text: str,
+        published_at: float,
+        author_details: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.id = id
+        self.author_id = author_id
+        self.author_name = author_name
+        self.text = text
+        self.published_at = published_at
+        self._author_details = author_details
+
+    @classmethod
+    def from_item(cls, item: Dict[str, Any]) -> "ChatMessage":
+        snippet = item["snippet"]
+        author_details = item["authorDetails"]
+        return cls(
+            item.get("id"),
+            author_details["channelId"],
+            author_details["displayName"],
+            snippet["displayMessage"].strip(),
+            parse_timestamp(snippet["publishedAt"]),
+            author_details,
+        )
+
+    @property
+    def published_ms(self) -> int:
+        """Publication time in epoch milliseconds."""
+        return int(self.published_at * 1000)
+
+    @property
+    def roles(self) -> FrozenSet[str]:
+        """Chat roles of the author, e.g. "owner" or "moderator"."""
+        # Only commands look at roles, so they are resolved on access
+        return roles_from_details(self._author_details or {})
+
+    def __repr__(self) -> str:
+        return f"ChatMessage({self.id!r}, {self.author_name!r}, {self.text!r})"
@@ -0,0 +1,349 @@
+# chat_pipeline.py
+import functools
+import logging
+import math
+import time
+from collections import OrderedDict
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from ban_store import BanStore, get_ban_store
+from chat_message import ChatMessage
+from command_handler import (
+    COMMAND_PREFIX,
+    commands,
+    get_dispatch_table,
+    handle_command,
+    parse_command,
+)
+from command_executor import CommandExecutor
+from cooldowns import is_exempt
+from dedup import RecentIds
+from metrics import MESSAGES_FILTERED, MESSAGES_INGESTED
+from moderation import (
+    BAN,
+    TIMEOUT,
+    WARN,
+    ModerationHandler,
+    ModerationRule,
+    get_moderation_filter,
+)
+from outbound import OutboundMessage
+from polling import LatencyStats
+from spam import SpamDetector
+from user_state import CooldownTracker, UserSet, create_seen_users
+from welcome_store import PersistentUserSet, WelcomeStore
+
+logger = logging.getLogger(__name__)
+# Every incoming message is logged here, so it can be sampled or silenced alone
+chat_logger = logging.getLogger(f"{__name__}.chat")
+
+
+class ChatPipeline:
+    """
+    Turns pages returned by liveChatMessages().list into outbound chat messages.
+    Holds the per-chat state (welcomed users, cooldowns, history skipping) so the
+    same processing can be driven by the sync loop or the asyncio engine.
+    """
+
+    def __init__(
+        self,
+        config: ModuleType,
+        bot_channel_name: Optional[str],
+        ban_store: Optional[BanStore] = None,
+        startup_time: Optional[float] = None,
+        welcome_store: Optional[WelcomeStore] = None,
+        executor: Optional[CommandExecutor] = None,
+        respond: Optional[Callable[[OutboundMessage], Any]] = None,
+        moderate: Optional[ModerationHandler] = None,
+    ) -> None:
+        self.config = config
+        self.bot_channel_name = bot_channel_name
+        self.ban_store = ban_store if ban_store is not None else get_ban_store()
+        # Record startup time to avoid processing old messages
+        self.startup_time = time.time() if startup_time is None else startup_time
+        self.is_first_fetch = True
+        self.seen_users: Union[UserSet, PersistentUserSet] = create_seen_users(config)
+        self.welcome_store = welcome_store
+        if welcome_store is not None:
+            self.seen_users = PersistentUserSet(self.seen_users, welcome_store)
+        self.cooldowns = CooldownTracker(
+            config.USER_MESSAGE_COOLDOWN_SECONDS, config.USER_STATE_MAX_USERS
+        )
+        self.latency = LatencyStats()
+        # When someone other than the bot last chatted, for scheduled jobs
+        # that only run in an active chat
+        self.last_activity_at = 0.0
+        self.last_message_id: Optional[str] = None
+        self.recent_ids = RecentIds(config.DEDUP_WINDOW_SIZE)
+        # With an executor, commands run on its pool and their responses are
+        # handed to respond() when ready instead of being returned
+        self.executor = executor
+        self.respond = respond
+        # Carries out timeouts and bans for banned phrases and spam
+        self.moderate = moderate
+        # Until when each author's last timeout or ban lasts, and its severity,
+        # so messages that keep breaking a rule don't repeat the API call
+        self.actioned: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self.spam = SpamDetector(config)
+        # Compiles the banned phrases now, so bad rules fail at startup
+        get_moderation_filter(config)
+        self._resume_after: Optional[str] = None
+
+    def apply_config(self, config: ModuleType) -> None:
+        """
+        Switches to a reloaded config snapshot. Whatever can fail is built
+        first, so a bad snapshot leaves the pipeline on the old config.
+        """
+        # Compile changed moderation rules here rather than on the next message
+        get_moderation_filter(config)
+        self.spam.configure(config)
+        self.cooldowns.cooldown = config.USER_MESSAGE_COOLDOWN_SECONDS
+        self.config = config
+
+    def resume_after(self, message_id: Optional[str]) -> None:
+        """
+        Continues from a checkpoint: the history skip is turned off so messages
+        sent while the bot was down are handled, and items up to and including
+        message_id are dropped if the next page repeats them.
+        """
+        self.is_first_fetch = False
+        self._resume_after = message_id
+
+    def start_fresh(self) -> None:
+        """
+        Drops a checkpoint that could not be resumed: the next page is handled
+        like the first one after a normal start.
+        """
+        self.is_first_fetch = True
+        self._resume_after = None
+
+    def process_page(self, chat_response: Dict[str, Any]) -> List[OutboundMessage]:
+        """Processes one page of chat items and returns the messages to send."""
+        # Pick up external edits to the ban list once per page, not per message
+        self.ban_store.maybe_reload()
+
+        items = chat_response.get("items", [])
+        MESSAGES_INGESTED.inc(amount=len(items))
+        if self._resume_after is not None:
+            ids = [item.get("id") for item in items]
+            if self._resume_after in ids:
+                items = items[ids.index(self._resume_after) + 1 :]
+            self._resume_after = None
+
+        outgoing: List[OutboundMessage] = []
+        for item in items:
+            message = ChatMessage.from_item(item)
+            if message.id is not None:
+                if self.recent_ids.check_and_add(message.id):
+                    MESSAGES_FILTERED.inc("duplicate")
+                    logger.debug("Skipping duplicate message %s", message.id)
+                    continue
+                self.last_message_id = message.id
+            response = self.process_message(message)
+            if response:
+                outgoing.append(response)
+
+        if self.welcome_store is not None:
+            self.welcome_store.flush()
+
+        # After first fetch, we can process all subsequent messages
+        if self.is_first_fetch:
+            self.is_first_fetch = False
+            logger.info(
+                "Finished skipping old messages. Now processing new messages in real-time."
+            )
+        return outgoing
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Approximate bytes used by the per-user state."""
+        return {
+            "seen_users": self.seen_users.memory_usage(),
+            "cooldowns": self.cooldowns.memory_usage(),
+            "spam": self.spam.memory_usage(),
+        }
+
+    def process_item(self, item: Dict[str, Any]) -> Optional[OutboundMessage]:
+        """Processes a single chat item and returns the message to send, if any."""
+        return self.process_message(ChatMessage.from_item(item))
+
+    def process_message(self, message: ChatMessage) -> Optional[OutboundMessage]:
+        """Processes a normalized chat message and returns the message to send."""
+        # Skip old messages on first fetch to avoid reprocessing chat history
+        if self.is_first_fetch and message.published_at < self.startup_time:
+            MESSAGES_FILTERED.inc("old")
+            logger.debug(
+                "Skipping old message from %s: %s", message.author_name, message.text
+            )
+            return None
+
+        outgoing = self._handle_message(message)
+        # End-to-end latency from publishedAt until the message was handled
+        self.latency.observe(time.time() - message.published_at)
+        return outgoing
+
+    def _handle_message(self, chat_message: ChatMessage) -> Optional[OutboundMessage]:
+        config = self.config
+        author_id = chat_message.author_id
+        author_name = chat_message.author_name
+        message = chat_message.text
+        now = time.time()
+        chat_logger.info("Chat from %s: %s", author_name, message)
+
+        # Ignore messages from the bot itself
+        if self.bot_channel_name and author_name == self.bot_channel_name:
+            MESSAGES_FILTERED.inc("own_message")
+            return None
+        self.last_activity_at = now
+
+        # Check if user is banned
+        if author_name in self.ban_store:
+            MESSAGES_FILTERED.inc("banned")
+            logger.info("Ignoring message from banned user: %s", author_name)
+            return None
+
+        # Banned phrases; the author's roles are only looked up on a match
+        moderation_filter = get_moderation_filter(config)
+        if moderation_filter is not None:
+            violation = moderation_filter.check(message)
+            if violation is not None and not self._is_exempt(chat_message):
+                rule, phrase = violation
+                return self._moderate(
+                    chat_message,
+                    rule,
+                    "moderated",
+                    f"contains banned phrase {phrase!r}",
+                    now,
+                )
+
+        # Floods and copy-paste raids, even from users on cooldown
+        spam = self.spam.check(chat_message, now)
+        if spam is not None and not self._is_exempt(chat_message):
+            return self._moderate(
+                chat_message, self.spam.rule, "spam", f"is {spam} spam", now
+            )
+
+        # Rate limiting
+        if not self.cooldowns.try_acquire(author_id, now):
+            MESSAGES_FILTERED.inc("cooldown")
+            logger.info("User %s is on cooldown. Ignoring message.", author_name)
+            return None
+
+        # Welcome new users (but only for new messages, not old ones)
+        if author_id not in self.seen_users:
+            self.seen_users.add(author_id)
+            logger.info("Welcoming new user: %s", author_name)
+            # This welcome message should also be subject to cooldown, so we stop here
+            return OutboundMessage.welcome(author_name)
+
+        if not message.startswith(COMMAND_PREFIX):
+            return None
+        # Moderators and the owner bypass command cooldowns
+        roles = chat_message.roles
+        if self.executor is not None:
+            # Keyed by the resolved name, so aliases share their command's
+            # limits and stats, and unknown commands never reach the pool
+            command_name = parse_command(message)[0]
+            command_name = get_dispatch_table(config).aliases.get(
+                command_name, command_name
+            )
+            if command_name not in commands:
+                return None
+            self.executor.submit(
+                author_id,
+                command_name,
+                functools.partial(
+                    handle_command, message, config, author_id, message, roles
+                ),
+                functools.partial(self._command_done, message, author_name),
+            )
+            return None
+
+        response = handle_command(message, config, author_id, message, roles)
+        if not response:
+            return None
+        logger.info(
+            "Responding to command '%s' from %s with: %s",
+            message,
+            author_name,
+            response,
+        )
+        return OutboundMessage.command(response)
+
+    def _is_exempt(self, message: ChatMessage) -> bool:
+        """The same exemption as for command cooldowns, MODERATORS included."""
+        moderators = get_dispatch_table(self.config).moderators
+        return is_exempt(message.author_id, message.roles, moderators)
+
+    def _moderate(
+        self,
+        message: ChatMessage,
+        rule: ModerationRule,
+        reason: str,
+        detail: str,
+        now: float,
+    ) -> Optional[OutboundMessage]:
+        MESSAGES_FILTERED.inc(reason)
+        logger.info(
+            "Message from %s %s (%s): %s",
+            message.author_name,
+            detail,
+            rule.action,
+            message.text,
+        )
+        if rule.action in (TIMEOUT, BAN):
+            if self.moderate is None:
+                logger.warning(
+                    "No moderation handler set. Cannot %s %s.",
+                    rule.action,
+                    message.author_name,
+                )
+            elif self._already_actioned(message.author_id, rule, now):
+                logger.debug(
+                    "%s already has a %s in effect.", message.author_name, rule.action
+                )
+            else:
+                self.moderate(message, rule)
+        if rule.action == WARN:
+            return OutboundMessage.command(
+                self.config.MODERATION_WARN_MESSAGE.format(username=message.author_name)
+            )
+        return None
+
+    def _already_actioned(
+        self, author_id: str, rule: ModerationRule, now: float
+    ) -> bool:
+        """
+        Returns True if author_id is still under an action at least as severe
+        as rule; otherwise records rule's action and returns False.
+        """
+        actioned = self.actioned
+        previous = actioned.get(author_id)
+        if previous is not None and now < previous[0] and previous[1] >= rule.severity:
+            return True
+        until = now + rule.duration if rule.action == TIMEOUT else math.inf
+        actioned[author_id] = (until, rule.severity)
+        actioned.move_to_end(author_id)
+        while actioned and (
+            len(actioned) > self.config.USER_STATE_MAX_USERS
+            or next(iter(actioned.values()))[0] <= now
+        ):
+            actioned.popitem(last=False)
+        return False
+
+    def _command_done(
+        self, message: str, author_name: str, response: Optional[str]
+    ) -> None:
+        """Called on an executor thread when a command submitted by this pipeline finishes."""
+        if not response:
+            return
+        if self.respond is None:
+            logger.warning("No responder set. Dropping response to '%s'.", message)
+            return
+        logger.info(
+            "Responding to command '%s' from %s with: %s",
+            message,
+            author_name,
+            response,
+        )
+        self.respond(OutboundMessage.command(response))
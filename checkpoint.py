@@ -0,0 +1,92 @@
+# checkpoint.py
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from file_utils import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStore:
+    """
+    Remembers, per live chat, the nextPageToken to resume from and the ID of
+    the last message processed, so a restarted bot picks up where it left off.
+
+    Every update is written with an atomic rename, which survives a crash of
+    the bot itself; the file is only fsync'ed every fsync_interval seconds, so
+    an OS crash can lose at most that much progress.
+    """
+
+    def __init__(self, path: str, fsync_interval: float = 5.0) -> None:
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self._chats: Dict[str, Dict[str, Optional[str]]] = {}
+        self._last_fsync = 0.0
+        self._dirty = False
+        self._unsynced = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                self._chats = json.load(f).get("chats", {})
+        except (json.JSONDecodeError, IOError) as e:
+            logger.error("Error loading checkpoint %s: %s", self.path, e)
+
+    def get(self, live_chat_id: str) -> Optional[Dict[str, Optional[str]]]:
+        """Returns {"page_token": ..., "last_message_id": ...} for a chat, if any."""
+        with self._lock:
+            entry = self._chats.get(live_chat_id)
+            return dict(entry) if entry else None
+
+    def update(
+        self,
+        live_chat_id: str,
+        page_token: Optional[str],
+        last_message_id: Optional[str],
+    ) -> None:
+        """Records progress for a chat and writes it out."""
+        with self._lock:
+            self._chats[live_chat_id] = {
+                "page_token": page_token,
+                "last_message_id": last_message_id,
+            }
+            self._dirty = True
+        self.flush()
+
+    def clear(self, live_chat_id: str) -> None:
+        """Forgets a chat, e.g. after its stream has ended."""
+        with self._lock:
+            if self._chats.pop(live_chat_id, None) is None:
+                return
+            self._dirty = True
+        self.flush(fsync=True)
+
+    def flush(self, fsync: Optional[bool] = None) -> None:
+        """Writes pending changes. fsync defaults to once per fsync_interval."""
+        with self._lock:
+            now = time.monotonic()
+            if fsync is None:
+                fsync = now - self._last_fsync >= self.fsync_interval
+            if not self._dirty and not (fsync and self._unsynced):
+                return
+            try:
+                atomic_write_json(self.path, {"chats": self._chats}, fsync=fsync)
+            except IOError as e:
+                logger.error("Error saving checkpoint %s: %s", self.path, e)
+                return
+            if fsync:
+                self._last_fsync = now
+            self._unsynced = not fsync
+            self._dirty = False
+
+    def close(self) -> None:
+        """Makes sure everything written so far is on disk."""
+        self.flush(fsync=True)
@@ -0,0 +1,234 @@
+# command_executor.py
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from types import ModuleType
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+ResultCallback = Callable[[Optional[str]], None]
+
+
+class CommandTask:
+    """One queued command invocation."""
+
+    __slots__ = (
+        "user_key",
+        "command",
+        "fn",
+        "on_result",
+        "submitted",
+        "started",
+        "future",
+        "finished",
+        "timed_out",
+    )
+
+    def __init__(
+        self,
+        user_key: str,
+        command: str,
+        fn: Callable[[], Optional[str]],
+        on_result: ResultCallback,
+    ) -> None:
+        self.user_key = user_key
+        self.command = command
+        self.fn = fn
+        self.on_result = on_result
+        self.submitted = time.monotonic()
+        self.started = 0.0
+        self.future: Optional["Future[Optional[str]]"] = None
+        self.finished = False
+        self.timed_out = False
+
+
+class CommandStats:
+    __slots__ = ("executed", "timeouts", "errors", "total_time", "max_time")
+
+    def __init__(self) -> None:
+        self.executed = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+
+class CommandExecutor:
+    """
+    Runs chat commands on a thread pool so a slow command can't stall polling.
+
+    - Each user's commands run one at a time, in the order they were sent, so
+      their responses come back in order.
+    - At most COMMAND_CONCURRENCY_LIMITS[command] (default COMMAND_WORKERS)
+      invocations of a command run at once; extra ones wait their turn.
+    - A command still running after its timeout (COMMAND_TIMEOUTS[command] or
+      COMMAND_TIMEOUT_SECONDS) is abandoned: its result is discarded and the
+      user's next command may start. Threads can't be killed, so a hung
+      command keeps its worker until it returns.
+    """
+
+    def __init__(self, config: ModuleType) -> None:
+        self.config = config
+        self.pool = ThreadPoolExecutor(
+            max_workers=config.COMMAND_WORKERS, thread_name_prefix="command"
+        )
+        self._user_queues: Dict[str, Deque[CommandTask]] = {}
+        self._busy_users: Set[str] = set()
+        self._running: Dict[str, int] = {}
+        self._waiting: Dict[str, Deque[CommandTask]] = {}
+        self._deadlines: List[Tuple[float, int, CommandTask]] = []
+        self._sequence = itertools.count()
+        self._stats: Dict[str, CommandStats] = {}
+        self._lock = threading.Condition()
+        self._closed = False
+        self._watchdog = threading.Thread(
+            target=self._watch_timeouts, name="command-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    def timeout_for(self, command: str) -> float:
+        return float(
+            self.config.COMMAND_TIMEOUTS.get(
+                command, self.config.COMMAND_TIMEOUT_SECONDS
+            )
+        )
+
+    def limit_for(self, command: str) -> int:
+        return int(
+            self.config.COMMAND_CONCURRENCY_LIMITS.get(
+                command, self.config.COMMAND_WORKERS
+            )
+        )
+
+    def submit(
+        self,
+        user_key: str,
+        command: str,
+        fn: Callable[[], Optional[str]],
+        on_result: ResultCallback,
+    ) -> None:
+        """Queues fn to run after the user's earlier commands; on_result gets its response."""
+        task = CommandTask(user_key, command, fn, on_result)
+        with self._lock:
+            if self._closed:
+                return
+            self._user_queues.setdefault(user_key, deque()).append(task)
+            if user_key not in self._busy_users:
+                self._start_next_for_user(user_key)
+
+    def _start_next_for_user(self, user_key: str) -> None:
+        # Called with the lock held
+        queue = self._user_queues.get(user_key)
+        if not queue:
+            self._user_queues.pop(user_key, None)
+            self._busy_users.discard(user_key)
+            return
+        task = queue.popleft()
+        self._busy_users.add(user_key)
+        if self._running.get(task.command, 0) < self.limit_for(task.command):
+            self._launch(task)
+        else:
+            self._waiting.setdefault(task.command, deque()).append(task)
+
+    def _launch(self, task: CommandTask) -> None:
+        # Called with the lock held
+        self._running[task.command] = self._running.get(task.command, 0) + 1
+        task.started = time.monotonic()
+        task.future = self.pool.submit(self._run, task)
+        deadline = task.started + self.timeout_for(task.command)
+        heapq.heappush(self._deadlines, (deadline, next(self._sequence), task))
+        self._lock.notify()
+
+    def _run(self, task: CommandTask) -> Optional[str]:
+        response: Optional[str] = None
+        failed = False
+        try:
+            response = task.fn()
+        except Exception as e:
+            failed = True
+            logger.error("Command %s failed: %s", task.command, e)
+        if self._finish(task, timed_out=False, failed=failed):
+            task.on_result(response)
+        return response
+
+    def _finish(self, task: CommandTask, timed_out: bool, failed: bool = False) -> bool:
+        """Releases the task's slots. Returns False if it had already finished."""
+        with self._lock:
+            if task.finished:
+                return False
+            task.finished = True
+            task.timed_out = timed_out
+            elapsed = time.monotonic() - task.started
+            stats = self._stats.setdefault(task.command, CommandStats())
+            if timed_out:
+                stats.timeouts += 1
+            else:
+                stats.executed += 1
+                stats.errors += failed
+                stats.total_time += elapsed
+                stats.max_time = max(stats.max_time, elapsed)
+
+            self._running[task.command] -= 1
+            waiting = self._waiting.get(task.command)
+            if waiting:
+                self._launch(waiting.popleft())
+            self._start_next_for_user(task.user_key)
+            return True
+
+    def _watch_timeouts(self) -> None:
+        with self._lock:
+            while not self._closed:
+                now = time.monotonic()
+                while self._deadlines and (
+                    self._deadlines[0][2].finished or self._deadlines[0][0] <= now
+                ):
+                    _, _, task = heapq.heappop(self._deadlines)
+                    if task.finished:
+                        continue
+                    logger.warning(
+                        "Command %s from %s timed out after %.1fs.",
+                        task.command,
+                        task.user_key,
+                        self.timeout_for(task.command),
+                    )
+                    if task.future is not None:
+                        task.future.cancel()
+                    # _finish takes the lock again; Condition wraps an RLock
+                    self._finish(task, timed_out=True)
+                wait = self._deadlines[0][0] - now if self._deadlines else None
+                self._lock.wait(wait)
+
+    def queue_depth(self) -> int:
+        """Commands submitted but not yet started."""
+        with self._lock:
+            return sum(len(q) for q in self._user_queues.values()) + sum(
+                len(q) for q in self._waiting.values()
+            )
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-command execution counts and timings."""
+        with self._lock:
+            return {
+                command: {
+                    "executed": s.executed,
+                    "timeouts": s.timeouts,
+                    "errors": s.errors,
+                    "mean_time": s.total_time / s.executed if s.executed else 0.0,
+                    "max_time": s.max_time,
+                }
+                for command, s in self._stats.items()
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stops accepting commands and drops the ones not yet started."""
+        with self._lock:
+            self._closed = True
+            self._user_queues.clear()
+            self._waiting.clear()
+            self._lock.notify()
+        self.pool.shutdown(wait=wait, cancel_futures=True)
@@ -5,37 +5,103 @@ import importlib.util
 import sys
 import logging
 import time
+import weakref
+from functools import lru_cache
 from types import ModuleType
-from typing import Dict, Callable, Any, Optional, List
+from typing import Dict, Callable, Any, FrozenSet, Optional, List, Tuple
+
+from cooldowns import CooldownEngine, CooldownLimits, is_exempt
+from metrics import COMMANDS_EXECUTED, MESSAGES_FILTERED
+
+logger = logging.getLogger(__name__)
 
 # The type for a command function is a callable that takes the config module and a message, and returns a string.
 CommandFunction = Callable[[ModuleType, str], str]
 commands: Dict[str, CommandFunction] = {}
-last_command_time: float = 0
+# Shared by every stream, like the command registry; buckets are kept per
+# stream (config.VIDEO_ID)
+cooldowns = CooldownEngine()
+
+COMMAND_PREFIX = "!"
+
+# Bumped whenever a command is loaded or unloaded, to invalidate the dispatch table
+_commands_version = 0
+
+
+class DispatchTable:
+    """
+    Lookups derived from config that handle_command needs on every command:
+    alias resolution, per restricted command the frozenset of user IDs
+    allowed to run it, and the cooldown limits. Rebuilt only when config or
+    the loaded commands change.
+    """
+
+    def __init__(self, config: ModuleType) -> None:
+        self.aliases: Dict[str, str] = dict(getattr(config, "COMMAND_ALIASES", {}))
+        self.moderators = frozenset(config.MODERATORS)
+        self.cooldowns = CooldownLimits(config)
+        role_members: Dict[str, FrozenSet[str]] = {
+            "moderator": self.moderators,
+        }
+        self.allowed_users: Dict[str, FrozenSet[str]] = {}
+        for command, roles in config.COMMAND_PERMISSIONS.items():
+            allowed: FrozenSet[str] = frozenset()
+            for role in roles:
+                allowed |= role_members.get(role, frozenset())
+            self.allowed_users[command] = allowed
+
+
+# One table per config object, since multi-stream mode uses a config per stream.
+# Weak keys let the tables of replaced config snapshots go with them.
+_dispatch_tables: (
+    "weakref.WeakKeyDictionary[ModuleType, Tuple[Tuple[Any, ...], DispatchTable]]"
+) = weakref.WeakKeyDictionary()
+
+
+def get_dispatch_table(config: ModuleType) -> DispatchTable:
+    """Returns the dispatch table for config, rebuilding it only if something changed."""
+    moderators = config.MODERATORS
+    permissions = config.COMMAND_PERMISSIONS
+    aliases = getattr(config, "COMMAND_ALIASES", None)
+    command_cooldowns = getattr(config, "COMMAND_COOLDOWNS", None)
+    key = (
+        id(moderators),
+        len(moderators),
+        id(permissions),
+        len(permissions),
+        id(aliases),
+        id(command_cooldowns),
+        getattr(config, "GLOBAL_COMMAND_COOLDOWN_SECONDS", 0),
+        _commands_version,
+    )
+    cached = _dispatch_tables.get(config)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    table = DispatchTable(config)
+    _dispatch_tables[config] = (key, table)
+    return table
+
+
+@lru_cache(maxsize=4096)
+def parse_command(message: str) -> Tuple[str, str]:
+    """Splits a chat message into (command name, arguments). Cached, since chat repeats itself."""
+    name, _, args = message.partition(" ")
+    return name, args.strip()
 
 
 def has_permission(author_id: str, command: str, config: ModuleType) -> bool:
     """Checks if a user has permission to execute a command."""
-    if command not in config.COMMAND_PERMISSIONS:
+    allowed = get_dispatch_table(config).allowed_users.get(command)
+    if allowed is None:
         return True  # No permission required
-
-    required_roles = config.COMMAND_PERMISSIONS[command]
-    user_roles: List[str] = []
-
-    if author_id in config.MODERATORS:
-        user_roles.append("moderator")
-
-    for role in required_roles:
-        if role in user_roles:
-            return True
-
-    return False
+    return author_id in allowed
 
 
 def load_command(command_name: str) -> bool:
     """Loads a single command."""
+    global _commands_version
     module_name = f"commands.{command_name}_command"
-    logging.info(f"Loading command: {command_name} from {module_name}")
+    logger.info("Loading command: %s from %s", command_name, module_name)
     try:
         if module_name in sys.modules:
             module = importlib.reload(sys.modules[module_name])
@@ -44,22 +110,25 @@ def load_command(command_name: str) -> bool:
         command_key = f"!{command_name}"
         if hasattr(module, "execute") and callable(module.execute):
             commands[command_key] = module.execute
-            logging.info(f"Loaded command: {command_key}")
+            _commands_version += 1
+            logger.info("Loaded command: %s", command_key)
             return True
     except Exception as e:
-        logging.error(f"Failed to load command {command_name}: {e}")
+        logger.error("Failed to load command %s: %s", command_name, e)
     return False
 
 
 def unload_command(command_name: str) -> bool:
     """Unloads a single command."""
+    global _commands_version
     command_key = f"!{command_name}"
     if command_key in commands:
         del commands[command_key]
+        _commands_version += 1
         module_name = f"commands.{command_name}_command"
         if module_name in sys.modules:
             del sys.modules[module_name]
-        logging.info(f"Unloaded command: {command_key}")
+        logger.info("Unloaded command: %s", command_key)
         return True
     return False
 
@@ -71,41 +140,84 @@ def reload_command(command_name: str) -> bool:
     return False
 
 
-def load_commands() -> None:
-    """Dynamically loads all command modules from the commands directory."""
+class _LazyCommand:
+    """Stands in for a command whose module is imported the first time it runs."""
+
+    def __init__(self, command_name: str) -> None:
+        self.command_name = command_name
+
+    def __call__(self, config: ModuleType, message: str) -> str:
+        command_key = f"!{self.command_name}"
+        if commands.get(command_key) is self and not load_command(self.command_name):
+            unload_command(self.command_name)
+            return ""
+        return commands[command_key](config, message)
+
+
+def load_commands(lazy: bool = False) -> None:
+    """
+    Dynamically loads all command modules from the commands directory. With
+    lazy=True, commands are only registered by file name and each module is
+    imported on first use.
+    """
+    global _commands_version
     commands_dir = os.path.join(os.path.dirname(__file__), "commands")
     for filename in os.listdir(commands_dir):
         if filename.endswith(".py") and not filename.startswith("__"):
             command_name = filename.replace("_command.py", "")
-            load_command(command_name)
+            if lazy:
+                commands[f"!{command_name}"] = _LazyCommand(command_name)
+                _commands_version += 1
+            else:
+                load_command(command_name)
 
 
 def handle_command(
-    command: str, config: ModuleType, author_id: str, message: str
+    command: str,
+    config: ModuleType,
+    author_id: str,
+    message: str,
+    roles: FrozenSet[str] = frozenset(),
 ) -> Optional[str]:
-    """Executes a command if it exists and the user has permission."""
-    global last_command_time
-    command_name = message.split(" ")[0]
-    logging.info(f"Handling command: {command_name}")
-    logging.info(f"Available commands: {commands.keys()}")
-    if command_name in commands:
-        if has_permission(author_id, command_name, config):
-            current_time = time.time()
-            if (
-                current_time - last_command_time
-                < config.GLOBAL_COMMAND_COOLDOWN_SECONDS
-            ):
-                logging.info(
-                    f"Global command cooldown is active. Ignoring command '{message}' from {author_id}."
-                )
-                return None
-
-            last_command_time = current_time
-            response = commands[command_name](config, message)
-            return response
-        else:
-            logging.warning(
-                f"User {author_id} does not have permission to execute {command_name}"
+    """
+    Executes a command if it exists, the user has permission and it is not on
+    cooldown. roles are the author's chat roles, for the moderator bypass.
+    """
+    # Most chat messages are not commands: reject them before doing any work
+    if not message.startswith(COMMAND_PREFIX):
+        return None
+    command_name = parse_command(message)[0]
+    table = get_dispatch_table(config)
+    command_name = table.aliases.get(command_name, command_name)
+    if command_name not in commands:
+        return None
+    logger.debug("Handling command: %s", command_name)
+
+    allowed = table.allowed_users.get(command_name)
+    if allowed is not None and author_id not in allowed:
+        logger.warning(
+            "User %s does not have permission to execute %s", author_id, command_name
+        )
+        return "You do not have permission to use this command."
+
+    if table.cooldowns.enabled and not is_exempt(author_id, roles, table.moderators):
+        level = cooldowns.try_acquire(
+            table.cooldowns,
+            author_id,
+            command_name,
+            time.time(),
+            getattr(config, "VIDEO_ID", None),
+        )
+        if level is not None:
+            MESSAGES_FILTERED.inc(f"{level}_cooldown")
+            logger.info(
+                "Command cooldown (%s) is active. Ignoring command '%s' from %s.",
+                level,
+                message,
+                author_id,
             )
-            return "You do not have permission to use this command."
-    return None
+            return None
+
+    COMMANDS_EXECUTED.inc(command_name)
+    response = commands[command_name](config, message)
+    return response
@@ -1,31 +1,18 @@
-import json
-import os
 import logging
 from types import ModuleType
 from typing import Set
 
+from ban_store import get_ban_store
+
 
 def load_banned_users() -> Set[str]:
-    """Load banned users from file."""
-    banned_file = "banned_users.json"
-    if os.path.exists(banned_file):
-        try:
-            with open(banned_file, "r") as f:
-                data = json.load(f)
-                return set(data.get("banned_users", []))
-        except (json.JSONDecodeError, IOError) as e:
-            logging.error(f"Error loading banned users: {e}")
-    return set()
+    """Load banned users from the shared ban store."""
+    return set(get_ban_store().users())
 
 
 def save_banned_users(banned_users: Set[str]) -> None:
-    """Save banned users to file."""
-    banned_file = "banned_users.json"
-    try:
-        with open(banned_file, "w") as f:
-            json.dump({"banned_users": list(banned_users)}, f, indent=2)
-    except IOError as e:
-        logging.error(f"Error saving banned users: {e}")
+    """Save banned users through the shared ban store."""
+    get_ban_store().replace(banned_users)
 
 
 def execute(config: ModuleType, message: str) -> str:
@@ -38,15 +25,8 @@ def execute(config: ModuleType, message: str) -> str:
     if not username:
         return "Please provide a valid username to unban."
 
-    # Load current banned users
-    banned_users = load_banned_users()
-
-    if username not in banned_users:
+    if not get_ban_store().remove(username):
         return f"User {username} is not currently banned."
 
-    # Remove user from banned list
-    banned_users.remove(username)
-    save_banned_users(banned_users)
-
     logging.info(f"User {username} has been unbanned.")
     return f"User {username} has been unbanned from the chat."
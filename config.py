@@ -1,4 +1,5 @@
 import os
+from typing import Any, Dict, List, Optional
 
 # IMPORTANT: Set this to the video ID of your YouTube live stream
 VIDEO_ID = ""
@@ -11,6 +12,17 @@ SCHEDULED_MESSAGES = [
     "Siga-nos nas redes sociais para mais conteúdo!",
 ]
 
+# More scheduled messages, each on its own schedule. A job repeats every
+# "interval_minutes", or at the times of a "cron" expression ("minute hour
+# day month weekday", local time). "jitter_seconds" delays each run by a
+# random amount up to that, and "active_within_minutes" skips runs when
+# nobody chatted that recently. A stream in STREAMS can set its own
+# SCHEDULED_JOBS. Example:
+#     {"name": "discord", "messages": ["Join our Discord!"], "interval_minutes": 20,
+#      "jitter_seconds": 120, "active_within_minutes": 10},
+#     {"name": "top of the hour", "messages": ["Hydrate!"], "cron": "0 * * * *"},
+SCHEDULED_JOBS: List[Dict[str, Any]] = []
+
 # Chat commands and their responses
 # IMPORTANT: Replace the placeholder links with your actual links!
 CHAT_COMMANDS = {
@@ -33,6 +45,18 @@ USER_MESSAGE_COOLDOWN_SECONDS = 5
 # Cooldown period in seconds for global commands
 GLOBAL_COMMAND_COOLDOWN_SECONDS = 2
 
+# Finer command cooldowns. Each is a token bucket: up to "burst" uses back to
+# back, then one more every "seconds". "global" covers all commands (and
+# replaces GLOBAL_COMMAND_COOLDOWN_SECONDS, which has a burst of 1), "user"
+# covers each user across commands, and a command name covers that command
+# for everyone, with "user_seconds" and "user_burst" for each user of it. A
+# command runs only if none of its buckets is empty. Moderators (MODERATORS
+# and chat moderators) and the owner are never on cooldown. Example:
+#     "global": {"seconds": 1, "burst": 5},
+#     "user": {"seconds": 10, "burst": 3},
+#     "!link": {"seconds": 30, "user_seconds": 120},
+COMMAND_COOLDOWNS: Dict[str, Dict[str, float]] = {}
+
 # List of moderators (user channel IDs)
 MODERATORS = [
     "UC...",  # Replace with the channel ID of a moderator
@@ -47,3 +71,190 @@ COMMAND_PERMISSIONS = {
     "!unload": ["moderator"],
     "!reload": ["moderator"],
 }
+
+# File where the ban list is persisted
+BANNED_USERS_FILE = "banned_users.json"
+
+# How often (in seconds) to check the ban list file for external edits
+BAN_LIST_RELOAD_SECONDS = 5
+
+# Chat engine: "sync" runs the classic poll/sleep loop, "async" runs polling,
+# command processing, sends and scheduled messages as independent asyncio tasks
+ENGINE_MODE = "sync"
+
+# Bounded queue sizes used by the async engine
+ASYNC_INBOUND_QUEUE_SIZE = 10  # pages of chat messages
+ASYNC_OUTBOUND_QUEUE_SIZE = 100  # messages waiting to be sent
+
+# Outbound messages are sent within a budget derived from the YouTube Data API
+# quota: DAILY_QUOTA_UNITS * SEND_QUOTA_SHARE units spread over
+# STREAM_DURATION_HOURS, at SEND_COST_UNITS per liveChatMessages.insert call
+DAILY_QUOTA_UNITS = 10000
+STREAM_DURATION_HOURS = 4
+SEND_QUOTA_SHARE = 0.5
+SEND_COST_UNITS = 50
+OUTBOUND_BURST = 10  # messages that can be sent back to back
+OUTBOUND_LOW_PRIORITY_RESERVE = 3  # sends kept for command responses
+OUTBOUND_MAX_DEFER_SECONDS = 60  # queued messages older than this are dropped
+OUTBOUND_DEDUP_WINDOW_SECONDS = 30  # identical messages within this are dropped
+
+# Quota accounting: every API call is charged its unit cost against
+# DAILY_QUOTA_UNITS over a rolling 24 hours. If the spending over the last
+# QUOTA_FORECAST_WINDOW_SECONDS would use up the quota before
+# STREAM_DURATION_HOURS have passed, polls are spaced out (up to
+# QUOTA_MAX_POLL_INTERVAL_SECONDS apart) and welcomes and scheduled messages
+# are dropped until the forecast fits again.
+QUOTA_TRACKING = True
+QUOTA_FORECAST_WINDOW_SECONDS = 600
+QUOTA_MAX_POLL_INTERVAL_SECONDS = 60
+
+# Welcomes within this window are merged into one message, e.g.
+# "Seja bem-vindo(a) ao chat, Ana, Bruno e Carla!"
+WELCOME_COALESCE_WINDOW_SECONDS = 3
+WELCOME_COALESCE_MAX_NAMES = 5
+WELCOME_NAMES_SEPARATOR = ", "
+WELCOME_NAMES_LAST_SEPARATOR = " e "
+
+# Adaptive polling. The server's pollingIntervalMillis is always the minimum.
+POLL_BUSY_MESSAGES = 20  # pages with this many messages poll at the minimum
+POLL_IDLE_BACKOFF_FACTOR = 1.5  # empty pages stretch the interval by this factor
+POLL_MAX_INTERVAL_SECONDS = 30
+POLL_ERROR_BACKOFF_SECONDS = 1  # first retry delay after a failed poll
+POLL_MAX_ERROR_BACKOFF_SECONDS = 60
+POLL_MAX_CONSECUTIVE_ERRORS = 10  # give up after this many failed polls in a row
+
+# Alternative names for commands (alias: command), e.g. {"!canal": "!link"}
+COMMAND_ALIASES: Dict[str, str] = {}
+
+# Per-user state is bounded so long streams don't grow memory without limit.
+# At most this many users are tracked for cooldowns and (in "exact" mode) for
+# welcomes; the least recently active are forgotten first.
+USER_STATE_MAX_USERS = 100000
+
+# "exact" remembers welcomed users in a bounded set. "bloom" uses a Bloom filter:
+# far less memory per user, at the cost of rarely skipping a welcome.
+SEEN_USERS_MODE = "exact"
+SEEN_USERS_BLOOM_CAPACITY = 1000000
+SEEN_USERS_BLOOM_ERROR_RATE = 0.001
+
+# SQLite file remembering welcomed users across restarts ("" keeps them in memory only)
+WELCOMED_USERS_DB = "welcomed_users.db"
+
+# "stream": welcome each user once per stream (VIDEO_ID)
+# "lifetime": welcome each user only the first time they ever chat
+WELCOME_POLICY = "stream"
+
+# Serve several live chats from one process. Each entry needs a "video_id" and
+# may override any setting above for that stream, for example:
+# STREAMS = [
+#     {"video_id": "abc123"},
+#     {"video_id": "def456", "WELCOME_MESSAGE": "Welcome, {username}!"},
+# ]
+# When STREAMS is empty, the bot serves VIDEO_ID only.
+STREAMS: List[Dict[str, Any]] = []
+
+# Worker threads shared by all streams in multi-stream mode
+MULTI_STREAM_WORKERS = 8
+
+# File recording the last page token and message ID per live chat, so a
+# restart resumes exactly where the bot stopped ("" disables resuming)
+CHECKPOINT_FILE = "checkpoint.json"
+CHECKPOINT_FSYNC_SECONDS = 5
+
+# Number of recent message IDs remembered to drop duplicates across pages,
+# retries and resumes
+DEDUP_WINDOW_SIZE = 10000
+
+# Commands run on a pool of this many worker threads, so a slow command
+# doesn't stall the bot (0 runs them inline on the polling thread)
+COMMAND_WORKERS = 4
+
+# Seconds a command may run before it is abandoned, with per-command overrides
+COMMAND_TIMEOUT_SECONDS = 10
+COMMAND_TIMEOUTS: Dict[str, float] = {}
+
+# Maximum simultaneous runs per command (default: COMMAND_WORKERS)
+COMMAND_CONCURRENCY_LIMITS: Dict[str, int] = {
+    "!load": 1,
+    "!unload": 1,
+    "!reload": 1,
+}
+
+# Send API requests to another server, such as fake_youtube_server.py for
+# offline load tests. No OAuth is done when this is set.
+YOUTUBE_API_ENDPOINT: Optional[str] = None
+
+# Metrics (message, command, send, API latency and poll lag counters).
+# When enabled they are served on http://METRICS_HOST:METRICS_PORT/metrics
+# (set METRICS_PORT = 0 to disable the endpoint) and, if
+# METRICS_DUMP_SECONDS > 0, logged at that interval.
+METRICS_ENABLED = False
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9100
+METRICS_DUMP_SECONDS = 0
+
+# Logging: root level, per-module overrides, "text" or "json" output, and
+# whether records are written by a background thread (LOG_ASYNC) so log I/O
+# stays off the polling loop
+LOG_LEVEL = "INFO"
+LOG_LEVELS: Dict[str, str] = {"googleapiclient.discovery_cache": "ERROR"}
+LOG_FORMAT = "text"
+LOG_ASYNC = True
+
+# Log only one of every N "Chat from ..." lines (1 logs them all)
+LOG_CHAT_SAMPLE_EVERY = 1
+
+# YouTube API transport: socket timeout, and how many times requests are
+# retried with exponential backoff on 5xx, 429 and rate-limit errors. Sends
+# are not retried by default because a retried insert can post twice.
+API_TIMEOUT_SECONDS = 15
+API_NUM_RETRIES = 3
+API_SEND_RETRIES = 0
+
+# Fast start: load command modules on first use, and reuse the bot's channel
+# name and each video's live chat ID from STARTUP_CACHE_FILE (entries expire
+# after STARTUP_CACHE_TTL_HOURS) instead of looking them up on every start
+FAST_START = False
+STARTUP_CACHE_FILE = "startup_cache.json"
+STARTUP_CACHE_TTL_HOURS = 12
+
+# OAuth token file (JSON, shared by every bot process on this host) and how
+# long before expiry the token is refreshed in the background
+CREDENTIALS_FILE = "token.json"
+CREDENTIALS_REFRESH_MARGIN_SECONDS = 300
+
+# Reload config.py when it changes on disk, checking every N seconds (0
+# disables). Moderators, permissions, cooldowns, scheduled and welcome
+# messages and command responses apply immediately; other settings are
+# applied on the next restart.
+CONFIG_RELOAD_SECONDS = 2
+
+# Banned phrases. Each rule lists phrases, matched case-insensitively as
+# whole words ("whole_word": False matches inside words too, e.g. for link
+# patterns), and the action to take: "ignore" drops the message, "warn" also
+# sends MODERATION_WARN_MESSAGE, "timeout" bans the author for "duration"
+# seconds and "ban" bans them permanently. Chat owners and moderators are
+# exempt. Example:
+#     {"phrases": ["bit.ly/", "discord.gg/"], "action": "ignore", "whole_word": False},
+#     {"phrases": ["some slur"], "action": "timeout", "duration": 300},
+MODERATION_RULES: List[Dict[str, Any]] = []
+MODERATION_WARN_MESSAGE = "@{username}, please keep the chat friendly."
+
+# Spam detection. A user sending more than SPAM_FLOOD_MAX_MESSAGES messages
+# within SPAM_FLOOD_WINDOW_SECONDS is flooding. A message is copy-paste spam
+# once SPAM_DUPLICATE_MIN_USERS different users sent the same or nearly the
+# same text (differing in at most SPAM_DUPLICATE_MAX_DISTANCE of 64
+# fingerprint bits) within SPAM_DUPLICATE_WINDOW_SECONDS. Messages shorter
+# than SPAM_DUPLICATE_MIN_LENGTH characters are never duplicates, so "hi" and
+# "lol" are fine. The last SPAM_INDEX_SIZE messages are compared. Spam gets
+# SPAM_ACTION ("ignore", "warn", "timeout" for SPAM_TIMEOUT_SECONDS, or
+# "ban"); chat owners and moderators are exempt. 0 turns a check off.
+SPAM_FLOOD_MAX_MESSAGES = 5
+SPAM_FLOOD_WINDOW_SECONDS = 10
+SPAM_DUPLICATE_MIN_USERS = 3
+SPAM_DUPLICATE_WINDOW_SECONDS = 60
+SPAM_DUPLICATE_MAX_DISTANCE = 3
+SPAM_DUPLICATE_MIN_LENGTH = 16
+SPAM_INDEX_SIZE = 10000
+SPAM_ACTION = "ignore"
+SPAM_TIMEOUT_SECONDS = 300
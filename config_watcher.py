@@ -0,0 +1,238 @@
+# config_watcher.py
+"""
+Reloads config.py while the bot runs.
+
+A reload executes the file into a fresh, frozen snapshot and validates it
+against the settings the bot started with. A snapshot that fails is
+dropped, and the previous config keeps being used. Subscribers receive the
+new snapshot and swap it in with a single reference assignment, so readers
+on the hot path never take a lock. A reader sees either the old config or
+the new one, never a mix of the two.
+
+Only HOT_RELOADABLE settings take effect on reload. The others are read once
+when the bot builds its components, so changes to them are logged and kept
+for the next restart.
+"""
+
+import logging
+import os
+import threading
+from types import MappingProxyType, ModuleType
+from typing import Any, Callable, Dict, FrozenSet, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Settings read on every use (through pipeline, session, engine or
+# dispatcher .config), so a new value applies as soon as it is swapped in
+HOT_RELOADABLE: FrozenSet[str] = frozenset(
+    {
+        "CHAT_COMMANDS",
+        "COMMAND_ALIASES",
+        "COMMAND_COOLDOWNS",
+        "COMMAND_PERMISSIONS",
+        "GLOBAL_COMMAND_COOLDOWN_SECONDS",
+        "MESSAGE_INTERVAL_MINUTES",
+        "MODERATION_RULES",
+        "MODERATION_WARN_MESSAGE",
+        "MODERATORS",
+        "OUTBOUND_DEDUP_WINDOW_SECONDS",
+        "OUTBOUND_LOW_PRIORITY_RESERVE",
+        "OUTBOUND_MAX_DEFER_SECONDS",
+        "SCHEDULED_JOBS",
+        "SCHEDULED_MESSAGES",
+        "SPAM_ACTION",
+        "SPAM_DUPLICATE_MIN_LENGTH",
+        "SPAM_DUPLICATE_MIN_USERS",
+        "SPAM_DUPLICATE_WINDOW_SECONDS",
+        "SPAM_FLOOD_WINDOW_SECONDS",
+        "SPAM_TIMEOUT_SECONDS",
+        "USER_MESSAGE_COOLDOWN_SECONDS",
+        "WELCOME_COALESCE_MAX_NAMES",
+        "WELCOME_COALESCE_WINDOW_SECONDS",
+        "WELCOME_MESSAGE",
+        "WELCOME_NAMES_LAST_SEPARATOR",
+        "WELCOME_NAMES_SEPARATOR",
+    }
+)
+
+
+class ConfigError(Exception):
+    """Raised when a reloaded config.py cannot be used."""
+
+
+class ConfigSnapshot(ModuleType):
+    """A read-only stand-in for the config module."""
+
+    def __init__(self, name: str, settings: Dict[str, Any]) -> None:
+        super().__init__(name)
+        self.__dict__.update({key: freeze(value) for key, value in settings.items()})
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"config snapshot is read-only (setting {name})")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"config snapshot is read-only (deleting {name})")
+
+
+def freeze(value: Any) -> Any:
+    """Returns value with lists, sets and dicts replaced by immutable versions."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+def settings_of(module: ModuleType) -> Dict[str, Any]:
+    """Returns the module's UPPER_CASE attributes."""
+    return {
+        name: value
+        for name, value in vars(module).items()
+        if name.isupper() and not name.startswith("_")
+    }
+
+
+def _compatible(old: Any, new: Any) -> bool:
+    if old is None or new is None or type(old) is type(new):
+        return True
+    numbers = (int, float)
+    return (
+        isinstance(old, numbers)
+        and isinstance(new, numbers)
+        and not isinstance(old, bool)
+        and not isinstance(new, bool)
+    )
+
+
+def read_settings(path: str) -> Dict[str, Any]:
+    """Executes a config file and returns its settings."""
+    try:
+        with open(path, "r") as f:
+            source = f.read()
+        namespace: Dict[str, Any] = {"__name__": "config", "__file__": path}
+        exec(compile(source, path, "exec"), namespace)
+    except Exception as e:
+        raise ConfigError(f"could not load {path}: {e}") from e
+    return {
+        name: value
+        for name, value in namespace.items()
+        if name.isupper() and not name.startswith("_")
+    }
+
+
+def validate(current: Dict[str, Any], new: Dict[str, Any]) -> None:
+    """Checks that new still defines every setting with a compatible type."""
+    missing = sorted(set(current) - set(new))
+    if missing:
+        raise ConfigError(f"missing settings: {', '.join(missing)}")
+    for name, value in current.items():
+        if not _compatible(value, new[name]):
+            raise ConfigError(
+                f"{name} must be {type(value).__name__}, "
+                f"got {type(new[name]).__name__}"
+            )
+
+
+class ConfigWatcher:
+    """
+    Polls the config file's mtime every reload_interval seconds on a daemon
+    thread and publishes a new ConfigSnapshot to subscribers when it changes.
+    """
+
+    def __init__(self, module: ModuleType, reload_interval: float = 2.0) -> None:
+        self.path = str(module.__file__)
+        self.reload_interval = reload_interval
+        self._base = settings_of(module)
+        self.snapshot = ConfigSnapshot(module.__name__, self._base)
+        self._subscribers: List[Callable[[ModuleType], None]] = []
+        self._validators: List[Callable[[ModuleType], None]] = []
+        self._mtime_ns = self._stat_mtime()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, callback: Callable[[ModuleType], None]) -> None:
+        """
+        Calls callback(snapshot) on every reload. If it raises, the reload
+        fails and the watcher keeps the previous snapshot.
+        """
+        self._subscribers.append(callback)
+
+    def add_validator(self, check: Callable[[ModuleType], None]) -> None:
+        """
+        Calls check(snapshot) before publishing a reload. A ValueError from it
+        rejects the reload, so no subscriber sees the bad config.
+        """
+        self._validators.append(check)
+
+    def _stat_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def check(self) -> bool:
+        """Reloads the file if it changed on disk. Returns True if it was reloaded."""
+        mtime_ns = self._stat_mtime()
+        if mtime_ns is None or mtime_ns == self._mtime_ns:
+            return False
+        self._mtime_ns = mtime_ns
+        return self.reload()
+
+    def reload(self) -> bool:
+        """Loads, validates and publishes the config file. Returns True on success."""
+        try:
+            new = read_settings(self.path)
+            validate(self._base, new)
+        except ConfigError as e:
+            logger.error("Ignoring config change: %s", e)
+            return False
+
+        current = settings_of(self.snapshot)
+        changed = sorted(
+            name for name, value in new.items() if freeze(value) != current.get(name)
+        )
+        hot = [name for name in changed if name in HOT_RELOADABLE]
+        cold = [name for name in changed if name not in HOT_RELOADABLE]
+        if cold:
+            logger.warning(
+                "Config changes to %s take effect after a restart.", ", ".join(cold)
+            )
+        if not hot:
+            return False
+
+        settings = dict(current)
+        settings.update((name, new[name]) for name in hot)
+        snapshot = ConfigSnapshot(self.snapshot.__name__, settings)
+        for check in self._validators:
+            try:
+                check(snapshot)
+            except ValueError as e:
+                logger.error("Ignoring config change: %s", e)
+                return False
+        for callback in self._subscribers:
+            try:
+                callback(snapshot)
+            except Exception:
+                logger.exception("Error applying reloaded config")
+                return False
+        # Published only once applied, so it always describes the running config
+        self.snapshot = snapshot
+        logger.info("Reloaded config: %s changed.", ", ".join(hot))
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.reload_interval):
+            self.check()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="config-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,161 @@
+# cooldowns.py
+"""
+Token-bucket command cooldowns at four levels: all commands together, each
+command, each user, and each user for each command. A command runs only if
+every bucket that applies has a token, and then takes one from each. Every
+stream has its own buckets, so a busy chat never blocks commands in another.
+
+A bucket is stored as a single float, its "theoretical arrival time" (as in
+GCRA): the time at which it would be full again. Taking a token pushes it
+back by one interval, and the bucket is empty once it is more than burst
+intervals ahead of now. A bucket whose time has passed is full, which is the
+same as not being stored at all, so such entries are expired and the tables
+hold only users and commands that are actually cooling down.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from types import ModuleType
+from typing import Any, Dict, FrozenSet, Hashable, List, Mapping, Optional, Tuple
+
+from chat_message import EXEMPT_ROLES
+
+GLOBAL = "global"
+USER = "user"
+
+# (seconds between commands, burst); a limit of None means no cooldown
+Limit = Optional[Tuple[float, float]]
+
+
+def _limit(setting: Mapping[str, Any], prefix: str = "") -> Limit:
+    seconds = float(setting.get(f"{prefix}seconds", 0))
+    if seconds <= 0:
+        return None
+    return (seconds, float(setting.get(f"{prefix}burst", 1)))
+
+
+class CooldownLimits:
+    """
+    The limits from GLOBAL_COMMAND_COOLDOWN_SECONDS and COMMAND_COOLDOWNS.
+    Built once per config, alongside the command dispatch table.
+    """
+
+    def __init__(self, config: ModuleType) -> None:
+        settings: Dict[str, Mapping[str, Any]] = dict(
+            getattr(config, "COMMAND_COOLDOWNS", {})
+        )
+        global_seconds = getattr(config, "GLOBAL_COMMAND_COOLDOWN_SECONDS", 0)
+        self.global_limit = _limit(settings.pop(GLOBAL, {"seconds": global_seconds}))
+        self.user_limit = _limit(settings.pop(USER, {}))
+        self.command_limits = {name: _limit(s) for name, s in settings.items()}
+        self.user_command_limits = {
+            name: _limit(s, "user_") for name, s in settings.items()
+        }
+        # With no limits at all, commands skip the engine and its lock
+        self.enabled = bool(
+            self.global_limit
+            or self.user_limit
+            or any(self.command_limits.values())
+            or any(self.user_command_limits.values())
+        )
+
+
+class _BucketTable:
+    """Bucket times by key, in last-touched order so full buckets expire first."""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.times: "OrderedDict[Hashable, float]" = OrderedDict()
+
+    def available(self, key: Hashable, limit: Limit, now: float) -> bool:
+        if limit is None:
+            return True
+        interval, burst = limit
+        full_at = self.times.get(key, now)
+        return max(full_at, now) + interval - now <= burst * interval
+
+    def take(self, key: Hashable, limit: Limit, now: float) -> None:
+        if limit is None:
+            return
+        times = self.times
+        times[key] = max(times.get(key, now), now) + limit[0]
+        times.move_to_end(key)
+        while times:
+            oldest, full_at = next(iter(times.items()))
+            if full_at > now and len(times) <= self.max_size:
+                break
+            del times[oldest]
+
+    def memory_usage(self) -> int:
+        return sys.getsizeof(self.times) + sum(
+            sys.getsizeof(k) + sys.getsizeof(v) for k, v in self.times.items()
+        )
+
+
+class CooldownEngine:
+    """Thread-safe command cooldowns. Limits come from CooldownLimits."""
+
+    def __init__(self, max_size: int = 100000) -> None:
+        self._global = _BucketTable(max_size)
+        self._commands = _BucketTable(max_size)
+        self._users = _BucketTable(max_size)
+        self._user_commands = _BucketTable(max_size)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(table.times) for table in self._tables())
+
+    def _tables(self) -> List[_BucketTable]:
+        return [self._global, self._commands, self._users, self._user_commands]
+
+    def try_acquire(
+        self,
+        limits: CooldownLimits,
+        user_id: str,
+        command: str,
+        now: float,
+        stream: Hashable = None,
+    ) -> Optional[str]:
+        """
+        Takes a token for the command from every bucket of stream that
+        applies. Returns None if it may run, else the level that is cooling
+        down and takes nothing.
+        """
+        command_limit = limits.command_limits.get(command)
+        user_command_limit = limits.user_command_limits.get(command)
+        checks = (
+            (GLOBAL, self._global, stream, limits.global_limit),
+            ("command", self._commands, (stream, command), command_limit),
+            (USER, self._users, (stream, user_id), limits.user_limit),
+            (
+                "user_command",
+                self._user_commands,
+                (stream, user_id, command),
+                user_command_limit,
+            ),
+        )
+        with self._lock:
+            for level, table, key, limit in checks:
+                if not table.available(key, limit, now):
+                    return level
+            for _, table, key, limit in checks:
+                table.take(key, limit, now)
+        return None
+
+    def reset(self) -> None:
+        with self._lock:
+            for table in self._tables():
+                table.times.clear()
+
+    def memory_usage(self) -> int:
+        with self._lock:
+            return sum(table.memory_usage() for table in self._tables())
+
+
+def is_exempt(user_id: str, roles: FrozenSet[str], moderators: FrozenSet[str]) -> bool:
+    """
+    Moderators and the chat owner are never on cooldown, nor moderated by
+    banned phrases or spam checks.
+    """
+    return user_id in moderators or bool(roles & EXEMPT_ROLES)
@@ -0,0 +1,227 @@
+# credentials.py
+"""
+OAuth token storage shared by every bot process on the host.
+
+Tokens are kept as JSON (owner-only permissions) rather than a pickle, and
+every read, write and refresh happens under an exclusive lock on a sidecar
+.lock file. A refresh first re-reads the file, so when several processes
+share one token only the first one to get the lock refreshes it and the
+others adopt the result. CredentialRefresher renews the token in the
+background shortly before it expires, so API calls don't stall on it.
+"""
+
+import datetime
+import json
+import logging
+import os
+import pickle
+import sys
+import threading
+from contextlib import contextmanager
+from typing import IO, Any, Dict, Iterator, List, Optional
+
+from google.oauth2.credentials import Credentials
+
+from file_utils import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+
+if sys.platform == "win32":
+    import msvcrt
+
+    def _lock_file(f: IO[str]) -> None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _unlock_file(f: IO[str]) -> None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock_file(f: IO[str]) -> None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _unlock_file(f: IO[str]) -> None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _utcnow() -> datetime.datetime:
+    # google-auth keeps expiry as a naive UTC datetime
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+class CredentialStore:
+    """Reads and writes the token file under an inter-process lock."""
+
+    def __init__(self, path: str, scopes: List[str]) -> None:
+        self.path = path
+        self.scopes = scopes
+        self.lock_path = f"{path}.lock"
+        # flock is per open file, so threads also need a lock of their own
+        self._thread_lock = threading.RLock()
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Holds the token file's lock against other threads and processes."""
+        with self._thread_lock:
+            with open(self.lock_path, "a+") as lock_file:
+                _lock_file(lock_file)
+                try:
+                    yield
+                finally:
+                    _unlock_file(lock_file)
+
+    def read_info(self) -> Optional[Dict[str, Any]]:
+        """Returns the stored token fields, or None. Call with the lock held."""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r") as f:
+                info = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.error("Error loading credentials from %s: %s", self.path, e)
+            return None
+        return info if isinstance(info, dict) else None
+
+    def write(self, credentials: Credentials) -> None:
+        """Stores the credentials. Call with the lock held."""
+        # mkstemp creates the file readable by its owner only
+        atomic_write_json(self.path, json.loads(credentials.to_json()))
+
+    def load(self) -> Optional["SharedCredentials"]:
+        """Returns the stored credentials, or None if there are none."""
+        with self.locked():
+            info = self.read_info()
+        if info is None:
+            return None
+        try:
+            return SharedCredentials.from_store(self, info)
+        except ValueError as e:
+            logger.error("Stored credentials in %s are invalid: %s", self.path, e)
+            return None
+
+    def save(self, credentials: Credentials) -> "SharedCredentials":
+        """Stores new credentials and returns them bound to this store."""
+        with self.locked():
+            self.write(credentials)
+        return SharedCredentials.from_store(self, json.loads(credentials.to_json()))
+
+    def migrate_pickle(self, pickle_path: str) -> Optional["SharedCredentials"]:
+        """
+        Converts a legacy token.pickle to the JSON store and deletes it.
+        Returns None if there is nothing to migrate or the pickle is unusable.
+        """
+        if not os.path.exists(pickle_path) or os.path.exists(self.path):
+            return None
+        try:
+            with open(pickle_path, "rb") as token:
+                legacy = pickle.load(token)
+            shared = self.save(legacy)
+        except Exception as e:
+            # Unpickling can raise almost anything; the OAuth flow starts over
+            logger.error("Could not migrate credentials from %s: %s", pickle_path, e)
+            return None
+        os.unlink(pickle_path)
+        logger.info("Moved credentials from %s to %s.", pickle_path, self.path)
+        return shared
+
+
+class SharedCredentials(Credentials):
+    """
+    User credentials whose refreshes go through a CredentialStore. Used as
+    the credentials of the API client, so refreshes triggered by requests and
+    by CredentialRefresher are coordinated with each other and with other
+    processes.
+    """
+
+    store: CredentialStore
+
+    @classmethod
+    def from_store(
+        cls, store: CredentialStore, info: Dict[str, Any]
+    ) -> "SharedCredentials":
+        credentials = cls.from_authorized_user_info(info, store.scopes)
+        credentials.store = store
+        return credentials
+
+    def refresh(self, request: Any) -> None:
+        token = self.token
+        with self.store.locked():
+            if self.token != token:
+                # Another thread refreshed while this one waited for the lock
+                return
+            info = self.store.read_info()
+            if info is not None and info.get("token") != token:
+                latest = Credentials.from_authorized_user_info(info, self.store.scopes)
+                if latest.valid and (
+                    self.expiry is None
+                    or latest.expiry is None
+                    or latest.expiry > self.expiry
+                ):
+                    # Another process already refreshed the shared token
+                    self.token = latest.token
+                    self.expiry = latest.expiry
+                    return
+            super().refresh(request)
+            self.store.write(self)
+        logger.info("Refreshed API credentials, valid until %s UTC.", self.expiry)
+
+
+class CredentialRefresher:
+    """
+    Refreshes credentials on a daemon thread margin seconds before they
+    expire. Failed refreshes are retried every retry_delay seconds.
+    """
+
+    def __init__(
+        self, credentials: Credentials, margin: float, retry_delay: float = 30.0
+    ) -> None:
+        self.credentials = credentials
+        self.margin = margin
+        self.retry_delay = retry_delay
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def seconds_until_due(self) -> Optional[float]:
+        """Seconds until the next refresh, or None if the token never expires."""
+        if self.credentials.token is None:
+            return 0.0
+        expiry = self.credentials.expiry
+        if expiry is None:
+            return None
+        return max(0.0, (expiry - _utcnow()).total_seconds() - self.margin)
+
+    def refresh_now(self) -> bool:
+        """Refreshes the credentials. Returns False if the refresh failed."""
+        # Imported here: the requests transport is slow to import
+        from google.auth.exceptions import GoogleAuthError
+        from google.auth.transport.requests import Request
+
+        try:
+            self.credentials.refresh(Request())
+        except (GoogleAuthError, OSError) as e:
+            logger.warning("Could not refresh API credentials: %s", e)
+            return False
+        return True
+
+    def _run(self) -> None:
+        delay = self.seconds_until_due()
+        while delay is not None and not self._stop.wait(delay):
+            if self.refresh_now():
+                delay = self.seconds_until_due()
+            else:
+                delay = self.retry_delay
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="credential-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
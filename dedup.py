@@ -0,0 +1,35 @@
+# dedup.py
+from typing import List, Optional, Set
+
+
+class RecentIds:
+    """
+    Remembers the last `size` message IDs in a ring buffer backed by a set, so
+    checking for a duplicate is O(1) and memory stays constant.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = max(1, size)
+        self._ring: List[Optional[str]] = [None] * self.size
+        self._ids: Set[str] = set()
+        self._next = 0
+        self.suppressed = 0
+
+    def __contains__(self, message_id: object) -> bool:
+        return message_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def check_and_add(self, message_id: str) -> bool:
+        """Returns True if the ID was seen recently; otherwise records it."""
+        if message_id in self._ids:
+            self.suppressed += 1
+            return True
+        evicted = self._ring[self._next]
+        if evicted is not None:
+            self._ids.discard(evicted)
+        self._ring[self._next] = message_id
+        self._ids.add(message_id)
+        self._next = (self._next + 1) % self.size
+        return False
@@ -0,0 +1,184 @@
+# fake_youtube.py
+"""
+In-memory stand-in for the googleapiclient YouTube Resource.
+
+Implements just enough of videos(), channels() and liveChatMessages() for the
+functions in youtube_api.py, so the bot can be driven in tests and benchmarks
+without network access.
+"""
+
+import itertools
+from collections import defaultdict
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+
+def make_chat_item(
+    message_id: str,
+    author_id: str,
+    author_name: str,
+    text: str,
+    published_at: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Builds a chat item shaped like the ones returned by liveChatMessages().list."""
+    published = time.time() if published_at is None else published_at
+    return {
+        "kind": "youtube#liveChatMessage",
+        "id": message_id,
+        "snippet": {
+            "type": "textMessageEvent",
+            "publishedAt": datetime.fromtimestamp(published, timezone.utc).isoformat(),
+            "displayMessage": text,
+        },
+        "authorDetails": {"channelId": author_id, "displayName": author_name},
+    }
+
+
+def make_http_error(status: int, reason: str) -> HttpError:
+    """Builds an HttpError like the ones raised by googleapiclient."""
+    content = (
+        '{"error": {"code": %d, "errors": [{"reason": "%s"}]}}' % (status, reason)
+    ).encode()
+    return HttpError(httplib2.Response({"status": status}), content)
+
+
+class _Request:
+    def __init__(self, fn: Any) -> None:
+        self._fn = fn
+
+    def execute(self, num_retries: int = 0) -> Dict[str, Any]:
+        return self._fn()
+
+
+class _Videos:
+    def __init__(self, fake: "FakeYouTube") -> None:
+        self._fake = fake
+
+    def list(self, part: str, id: str) -> _Request:
+        def run() -> Dict[str, Any]:
+            self._fake.calls.append("videos.list")
+            if id not in self._fake.live_chat_ids:
+                return {"items": []}
+            details = {"activeLiveChatId": self._fake.live_chat_ids[id]}
+            return {"items": [{"id": id, "liveStreamingDetails": details}]}
+
+        return _Request(run)
+
+
+class _Channels:
+    def __init__(self, fake: "FakeYouTube") -> None:
+        self._fake = fake
+
+    def list(self, part: str, mine: bool) -> _Request:
+        def run() -> Dict[str, Any]:
+            self._fake.calls.append("channels.list")
+            return {"items": [{"snippet": {"title": self._fake.channel_name}}]}
+
+        return _Request(run)
+
+
+class _LiveChatMessages:
+    def __init__(self, fake: "FakeYouTube") -> None:
+        self._fake = fake
+
+    def list(
+        self, liveChatId: str, part: str, pageToken: Optional[str] = None
+    ) -> _Request:
+        return _Request(lambda: self._fake._list_messages(liveChatId, pageToken))
+
+    def insert(self, part: str, body: Dict[str, Any]) -> _Request:
+        return _Request(lambda: self._fake._insert_message(body))
+
+
+class _LiveChatBans:
+    def __init__(self, fake: "FakeYouTube") -> None:
+        self._fake = fake
+
+    def insert(self, part: str, body: Dict[str, Any]) -> _Request:
+        return _Request(lambda: self._fake._insert_ban(body))
+
+
+class FakeYouTube:
+    """
+    Serves pre-queued pages of chat items and records sent messages and bans. pages is
+    served to every live chat; chat_pages gives individual chats their own pages.
+    When the queued pages run out, list() raises a 403 liveChatEnded error,
+    the same way the real API reports the end of a stream.
+    """
+
+    def __init__(
+        self,
+        pages: Optional[List[List[Dict[str, Any]]]] = None,
+        chat_pages: Optional[Dict[str, List[List[Dict[str, Any]]]]] = None,
+        channel_name: str = "Bot Channel",
+        live_chat_ids: Optional[Dict[str, str]] = None,
+        polling_interval_millis: int = 0,
+        list_latency: float = 0.0,
+        insert_latency: float = 0.0,
+    ) -> None:
+        self.pages: List[List[Dict[str, Any]]] = list(pages or [])
+        self.chat_pages = chat_pages or {}
+        self.channel_name = channel_name
+        self.live_chat_ids = live_chat_ids or {"video": "chat"}
+        self.polling_interval_millis = polling_interval_millis
+        self.list_latency = list_latency
+        self.insert_latency = insert_latency
+        self.sent: List[str] = []
+        self.sent_by_chat: Dict[str, List[str]] = defaultdict(list)
+        self.bans: List[Dict[str, Any]] = []
+        self.calls: List[str] = []
+        self._page_index: Dict[str, int] = defaultdict(int)
+        self._tokens = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def videos(self) -> _Videos:
+        return _Videos(self)
+
+    def channels(self) -> _Channels:
+        return _Channels(self)
+
+    def liveChatMessages(self) -> _LiveChatMessages:
+        return _LiveChatMessages(self)
+
+    def liveChatBans(self) -> _LiveChatBans:
+        return _LiveChatBans(self)
+
+    def _list_messages(
+        self, live_chat_id: str, page_token: Optional[str]
+    ) -> Dict[str, Any]:
+        if self.list_latency:
+            time.sleep(self.list_latency)
+        with self._lock:
+            self.calls.append("liveChatMessages.list")
+            pages = self.chat_pages.get(live_chat_id, self.pages)
+            index = self._page_index[live_chat_id]
+            if index >= len(pages):
+                raise make_http_error(403, "liveChatEnded")
+            items = pages[index]
+            self._page_index[live_chat_id] = index + 1
+            return {
+                "items": items,
+                "nextPageToken": f"token{next(self._tokens)}",
+                "pollingIntervalMillis": self.polling_interval_millis,
+            }
+
+    def _insert_message(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        if self.insert_latency:
+            time.sleep(self.insert_latency)
+        with self._lock:
+            self.calls.append("liveChatMessages.insert")
+            text = body["snippet"]["textMessageDetails"]["messageText"]
+            self.sent.append(text)
+            self.sent_by_chat[body["snippet"]["liveChatId"]].append(text)
+        return {"snippet": body["snippet"]}
+
+    def _insert_ban(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self.calls.append("liveChatBans.insert")
+            self.bans.append(body["snippet"])
+        return {"snippet": body["snippet"]}
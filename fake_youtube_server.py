@@ -0,0 +1,404 @@
+# fake_youtube_server.py
+"""
+Local HTTP stand-in for the parts of the YouTube Data API v3 the bot uses:
+videos.list, channels.list, liveChatMessages list/insert and liveChatBans.insert.
+
+Every video ID is treated as live. Its chat produces synthetic messages at a
+configurable rate, paginated with nextPageToken like the real API, and echoes
+the bot's own inserts. Quota errors, stream end and latency can be injected,
+so the bot can be load tested offline.
+
+Run from the project root:
+    python fake_youtube_server.py --port 8080 --rate 10000
+
+and set YOUTUBE_API_ENDPOINT = "http://127.0.0.1:8080" in config.py.
+"""
+
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from quota import QUOTA_COSTS
+
+BOT_CHANNEL_ID = "UCfakebot"
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+class ApiError(Exception):
+    """An error response in the API's JSON error format."""
+
+    def __init__(self, status: int, reason: str, message: str = "") -> None:
+        super().__init__(message or reason)
+        self.status = status
+        self.reason = reason
+
+    def body(self) -> Dict[str, Any]:
+        message = str(self)
+        return {
+            "error": {
+                "code": self.status,
+                "message": message,
+                "errors": [{"reason": self.reason, "message": message}],
+            }
+        }
+
+
+class _ChatStream:
+    """
+    Messages of one live chat. Items are numbered from the start of the
+    stream; page tokens are these positions, and only the last history_size
+    items are kept.
+    """
+
+    def __init__(self, chat_id: str, started: float, history_size: int) -> None:
+        self.chat_id = chat_id
+        self.started = started
+        self.items: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+        self.base = 0
+        self.generated = 0
+
+    @property
+    def end(self) -> int:
+        return self.base + len(self.items)
+
+    def append(self, item: Dict[str, Any]) -> None:
+        if len(self.items) == self.items.maxlen:
+            self.base += 1
+        self.items.append(item)
+
+    def page(self, offset: int, size: int) -> List[Dict[str, Any]]:
+        start = max(offset, self.base) - self.base
+        return [self.items[i] for i in range(start, min(start + size, len(self.items)))]
+
+
+class FakeYouTubeServer:
+    """
+    Serves the fake API on host:port (port 0 picks a free port).
+
+    messages_per_minute: synthetic chat rate per live chat
+    page_size: default maxResults of liveChatMessages.list
+    polling_interval_millis: pollingIntervalMillis returned with every page
+    latency, latency_jitter: seconds added to every response
+    daily_quota: once this many units are used, calls fail with quotaExceeded
+    quota_error_rate: probability of a spurious quotaExceeded on any call
+    duration: seconds after which each chat reports liveChatEnded
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        messages_per_minute: float = 600.0,
+        page_size: int = 500,
+        polling_interval_millis: int = 2000,
+        num_users: int = 1000,
+        command_share: float = 0.1,
+        commands: Optional[List[str]] = None,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        daily_quota: Optional[int] = None,
+        quota_error_rate: float = 0.0,
+        duration: Optional[float] = None,
+        history_size: int = 10_000,
+        channel_name: str = "Fake Bot",
+        seed: Optional[int] = None,
+    ) -> None:
+        self.messages_per_minute = messages_per_minute
+        self.page_size = page_size
+        self.polling_interval_millis = polling_interval_millis
+        self.num_users = num_users
+        self.command_share = command_share
+        self.commands = commands or ["!link", "!discord", "!ping"]
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.daily_quota = daily_quota
+        self.quota_error_rate = quota_error_rate
+        self.duration = duration
+        self.history_size = history_size
+        self.channel_name = channel_name
+        self.quota_used = 0
+        self.calls: Dict[str, int] = {name: 0 for name in QUOTA_COSTS}
+        self.sent: List[Tuple[str, str]] = []
+        self.bans: List[Dict[str, Any]] = []
+        self._chats: Dict[str, _ChatStream] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        setattr(self._httpd, "fake", self)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def start(self) -> "FakeYouTubeServer":
+        """Serves requests on a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeYouTubeServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    # API methods. Each returns the response body or raises ApiError.
+
+    def handle(
+        self, method: str, params: Dict[str, str], body: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        delay = self.latency + self._rng.uniform(0, self.latency_jitter)
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            self.calls[method] += 1
+            self._charge(method)
+            if method == "videos.list":
+                return self._videos_list(params)
+            if method == "channels.list":
+                return self._channels_list()
+            if method == "liveChatMessages.list":
+                return self._messages_list(params)
+            if method == "liveChatBans.insert":
+                return self._bans_insert(body or {})
+            return self._messages_insert(body or {})
+
+    def _charge(self, method: str) -> None:
+        # Called with the lock held
+        cost = QUOTA_COSTS[method]
+        if self.daily_quota is not None and self.quota_used + cost > self.daily_quota:
+            raise ApiError(403, "quotaExceeded", "The request cannot be completed.")
+        if self.quota_error_rate and self._rng.random() < self.quota_error_rate:
+            raise ApiError(403, "quotaExceeded", "Injected quota error.")
+        self.quota_used += cost
+
+    def _chat(self, chat_id: str) -> _ChatStream:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = _ChatStream(chat_id, time.time(), self.history_size)
+            self._chats[chat_id] = chat
+        return chat
+
+    def _videos_list(self, params: Dict[str, str]) -> Dict[str, Any]:
+        items = []
+        for video_id in filter(None, params.get("id", "").split(",")):
+            chat_id = f"live-chat-{video_id}"
+            self._chat(chat_id)
+            items.append(
+                {
+                    "kind": "youtube#video",
+                    "id": video_id,
+                    "liveStreamingDetails": {"activeLiveChatId": chat_id},
+                }
+            )
+        return {"kind": "youtube#videoListResponse", "items": items}
+
+    def _channels_list(self) -> Dict[str, Any]:
+        return {
+            "kind": "youtube#channelListResponse",
+            "items": [{"id": BOT_CHANNEL_ID, "snippet": {"title": self.channel_name}}],
+        }
+
+    def _generate(self, chat: _ChatStream, now: float) -> None:
+        # Catch the chat up with the configured message rate
+        per_second = self.messages_per_minute / 60
+        target = int((now - chat.started) * per_second)
+        # Items older than the history would be dropped right away
+        chat.generated = max(chat.generated, target - self.history_size)
+        while chat.generated < target:
+            user = self._rng.randrange(self.num_users)
+            if self._rng.random() < self.command_share:
+                text = self._rng.choice(self.commands)
+            else:
+                text = f"message {chat.generated}"
+            chat.append(
+                self._make_item(
+                    f"{chat.chat_id}.{chat.generated}",
+                    f"UC{user:06d}",
+                    f"User {user}",
+                    text,
+                    chat.started + chat.generated / per_second,
+                )
+            )
+            chat.generated += 1
+
+    def _make_item(
+        self, item_id: str, author_id: str, author_name: str, text: str, at: float
+    ) -> Dict[str, Any]:
+        return {
+            "kind": "youtube#liveChatMessage",
+            "id": item_id,
+            "snippet": {
+                "type": "textMessageEvent",
+                "publishedAt": _iso(at),
+                "displayMessage": text,
+            },
+            "authorDetails": {"channelId": author_id, "displayName": author_name},
+        }
+
+    def _live_chat(self, chat_id: str, now: float) -> _ChatStream:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            raise ApiError(404, "liveChatNotFound", "The live chat was not found.")
+        if self.duration is not None and now - chat.started >= self.duration:
+            raise ApiError(403, "liveChatEnded", "The live chat has ended.")
+        return chat
+
+    def _messages_list(self, params: Dict[str, str]) -> Dict[str, Any]:
+        now = time.time()
+        chat = self._live_chat(params.get("liveChatId", ""), now)
+        self._generate(chat, now)
+        token = params.get("pageToken")
+        offset = int(token) if token and token.isdigit() else chat.end
+        size = int(params.get("maxResults", self.page_size))
+        items = chat.page(offset, size)
+        next_offset = max(offset, chat.base) + len(items)
+        return {
+            "kind": "youtube#liveChatMessageListResponse",
+            "nextPageToken": str(next_offset),
+            "pollingIntervalMillis": self.polling_interval_millis,
+            "pageInfo": {"totalResults": len(items), "resultsPerPage": size},
+            "items": items,
+        }
+
+    def _bans_insert(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        snippet = body.get("snippet", {})
+        self._live_chat(snippet.get("liveChatId", ""), time.time())
+        self.bans.append(snippet)
+        return {
+            "kind": "youtube#liveChatBan",
+            "id": f"ban{len(self.bans)}",
+            "snippet": snippet,
+        }
+
+    def _messages_insert(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        snippet = body.get("snippet", {})
+        now = time.time()
+        chat = self._live_chat(snippet.get("liveChatId", ""), now)
+        text = snippet.get("textMessageDetails", {}).get("messageText", "")
+        self.sent.append((chat.chat_id, text))
+        item = self._make_item(
+            f"{chat.chat_id}.bot{len(self.sent)}",
+            BOT_CHANNEL_ID,
+            self.channel_name,
+            text,
+            now,
+        )
+        chat.append(item)
+        return item
+
+
+# Paths of the supported methods, as in the API's discovery document
+_ROUTES = {
+    ("GET", "/youtube/v3/videos"): "videos.list",
+    ("GET", "/youtube/v3/channels"): "channels.list",
+    ("GET", "/youtube/v3/liveChat/messages"): "liveChatMessages.list",
+    ("POST", "/youtube/v3/liveChat/messages"): "liveChatMessages.insert",
+    ("POST", "/youtube/v3/liveChat/bans"): "liveChatBans.insert",
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately: without TCP_NODELAY, kept-alive
+    # connections stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def _dispatch(self, http_method: str) -> None:
+        fake: FakeYouTubeServer = getattr(self.server, "fake")
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+        method = _ROUTES.get((http_method, url.path))
+        try:
+            if method is None:
+                raise ApiError(404, "notFound", f"Unknown method {url.path}")
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            body = json.loads(raw_body) if raw_body else None
+            self._reply(200, fake.handle(method, params, body))
+        except ApiError as e:
+            self._reply(e.status, e.body())
+
+    def _reply(self, status: int, data: Dict[str, Any]) -> None:
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logging.debug("fake YouTube: " + format, *args)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--rate", type=float, default=600, help="messages/minute")
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--polling-interval-millis", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--daily-quota", type=int)
+    parser.add_argument("--quota-error-rate", type=float, default=0.0)
+    parser.add_argument("--duration", type=float, help="seconds until chats end")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = FakeYouTubeServer(
+        args.host,
+        args.port,
+        messages_per_minute=args.rate,
+        page_size=args.page_size,
+        polling_interval_millis=args.polling_interval_millis,
+        num_users=args.users,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        daily_quota=args.daily_quota,
+        quota_error_rate=args.quota_error_rate,
+        duration=args.duration,
+    )
+    logging.info(f"Fake YouTube API listening on {server.endpoint}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logging.info(
+            f"Used {server.quota_used} quota units, {len(server.sent)} messages sent."
+        )
+
+
+if __name__ == "__main__":
+    main()
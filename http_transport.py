@@ -0,0 +1,59 @@
+# http_transport.py
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+
+
+class ThreadLocalHttp:
+    """
+    Stands in for the httplib2.Http object a googleapiclient service sends
+    requests through. httplib2.Http is not thread-safe, so every thread gets
+    its own client (authorized with the shared credentials, if any). Each
+    client keeps its connection open between requests, so a thread that
+    polls or sends repeatedly reuses one keep-alive connection.
+    """
+
+    def __init__(self, credentials: Any = None, timeout: Optional[float] = None):
+        self.credentials = credentials
+        self.timeout = timeout
+        self._local = threading.local()
+        self._clients: List[Any] = []
+        self._lock = threading.Lock()
+
+    def _client(self) -> Any:
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = httplib2.Http(timeout=self.timeout)
+            if self.credentials is not None:
+                client = AuthorizedHttp(self.credentials, http=client)
+            self._local.client = client
+            with self._lock:
+                self._clients.append(client)
+        return client
+
+    def request(
+        self,
+        uri: str,
+        method: str = "GET",
+        body: Optional[Any] = None,
+        headers: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> Tuple[Any, bytes]:
+        return self._client().request(
+            uri, method=method, body=body, headers=headers, **kwargs
+        )
+
+    def connection_count(self) -> int:
+        """Number of per-thread clients created so far."""
+        with self._lock:
+            return len(self._clients)
+
+    def close(self) -> None:
+        """Closes the open connections of every thread's client."""
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            client.close()
+        self._local = threading.local()
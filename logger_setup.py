@@ -1,23 +1,109 @@
 # logger_setup.py
+import atexit
+import itertools
+import json
 import logging
+import logging.handlers
+import queue
+from typing import Any, Dict, Optional
+
+import config
+
+# chat_pipeline's logger for the per-message "Chat from ..." lines
+CHAT_LOGGER_NAME = "chat_pipeline.chat"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Lets through one of every `every` records."""
+
+    def __init__(self, every: int) -> None:
+        super().__init__()
+        self.every = every
+        self._counter = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return next(self._counter) % self.every == 0
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    A QueueHandler that leaves formatting to the listener thread. The stock
+    prepare() formats every record on the calling thread; records here stay
+    in-process, so they can be queued as they are. Log arguments must not be
+    mutated after the logging call.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
 
 
 def setup_logger() -> None:
     """Sets up the root logger for the application."""
+    global _listener
     # Get the root logger
     logger = logging.getLogger()
-    logger.setLevel(logging.INFO)  # Set the lowest level of messages to handle
+    logger.setLevel(config.LOG_LEVEL)  # Set the lowest level of messages to handle
+
+    # Per-module overrides, e.g. {"chat_pipeline": "WARNING"}
+    for name, level in config.LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(level)
+
+    if config.LOG_CHAT_SAMPLE_EVERY > 1:
+        logging.getLogger(CHAT_LOGGER_NAME).addFilter(
+            SamplingFilter(config.LOG_CHAT_SAMPLE_EVERY)
+        )
+
+    # Check if handlers are already present to avoid duplication
+    if logger.handlers:
+        return
 
     # Create a console handler
     console_handler = logging.StreamHandler()
 
     # Create a formatter and set it for the handler
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
+    formatter: logging.Formatter
+    if config.LOG_FORMAT == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        )
     console_handler.setFormatter(formatter)
 
-    # Add the handler to the logger
-    # Check if handlers are already present to avoid duplication
-    if not logger.handlers:
+    if not config.LOG_ASYNC:
         logger.addHandler(console_handler)
+        return
+
+    # Log calls only enqueue the record; a background thread formats and writes
+    records: "queue.Queue[logging.LogRecord]" = queue.Queue()
+    _listener = logging.handlers.QueueListener(
+        records, console_handler, respect_handler_level=True
+    )
+    _listener.start()
+    logger.addHandler(DeferredQueueHandler(records))
+    atexit.register(stop_logger)
+
+
+def stop_logger() -> None:
+    """Writes out queued records and stops the background log thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,57 +1,206 @@
 import time
+
+# Taken before the other imports so the startup breakdown includes them
+STARTED_AT = time.perf_counter()
+
 import threading
-import random
 import logging
-from typing import Set, Optional, Dict
+from concurrent.futures import ThreadPoolExecutor
+from types import ModuleType
+from typing import Callable, Dict, List, Optional, Tuple
 
 import config
-from logger_setup import setup_logger
-from command_handler import load_commands, handle_command
+from logger_setup import setup_logger, stop_logger
+from command_handler import load_commands
+from chat_pipeline import ChatPipeline
 from youtube_api import (
     get_youtube_service,
     get_live_chat_id,
-    get_chat_messages,
     send_chat_message,
     get_own_channel_name,
+    stop_credential_refresher,
 )
+from outbound import OutboundDispatcher
 from googleapiclient.discovery import Resource
-from commands.ban_command import load_banned_users
+from checkpoint import CheckpointStore
+from metrics import enable_metrics
+from quota import QuotaMeter, configure_quota
+from moderation import ModerationActions, validate_moderation
+from command_executor import CommandExecutor
+from config_watcher import ConfigWatcher
+from multi_stream import MultiStreamRunner
+from stream_session import StreamSession
+from scheduler import Scheduler, message_jobs, validate_message_jobs
+from startup import StartupCache, StartupTimer
+from welcome_store import open_welcome_store
+
+
+def log_pipeline_stats(pipeline: ChatPipeline) -> None:
+    """Logs the end-to-end message latency and per-user state memory."""
+    stats = pipeline.latency.snapshot()
+    logging.info(
+        f"Handled {int(stats['count'])} messages. Latency from publishedAt: "
+        f"p50={stats['p50']:.2f}s p99={stats['p99']:.2f}s max={stats['max']:.2f}s, "
+        f"{pipeline.recent_ids.suppressed} duplicates suppressed"
+    )
+    memory = pipeline.memory_usage()
+    logging.info(
+        f"User state: {len(pipeline.seen_users)} welcomed users "
+        f"({memory['seen_users'] // 1024} KiB), {len(pipeline.cooldowns)} cooldowns "
+        f"({memory['cooldowns'] // 1024} KiB)"
+    )
 
-# A flag to signal the message scheduler thread to stop
-stop_scheduler = threading.Event()
 
+def log_executor_stats(executor: CommandExecutor) -> None:
+    """Logs per-command execution counts and timings."""
+    for command, stats in executor.stats().items():
+        logging.info(
+            f"Command {command}: {int(stats['executed'])} runs, "
+            f"{int(stats['timeouts'])} timeouts, mean {stats['mean_time'] * 1000:.1f}ms, "
+            f"max {stats['max_time'] * 1000:.1f}ms"
+        )
 
-def message_scheduler(youtube: Resource, live_chat_id: str) -> None:
-    """Sends a random scheduled message every X minutes."""
-    while not stop_scheduler.is_set():
-        try:
-            # Wait for the specified interval, but check for the stop signal every second
-            for _ in range(config.MESSAGE_INTERVAL_MINUTES * 60):
-                if stop_scheduler.is_set():
-                    return
-                time.sleep(1)
 
-            message = random.choice(config.SCHEDULED_MESSAGES)
-            logging.info(f"Sending scheduled message: {message}")
-            send_chat_message(youtube, live_chat_id, message)
+def log_quota_stats(quota: QuotaMeter) -> None:
+    """Logs API quota usage and the forecast."""
+    stats = quota.snapshot()
+    logging.info(
+        f"API quota: {stats['used']:.0f} units used in the last 24h, "
+        f"{stats['remaining']:.0f} left, {stats['rate_per_hour']:.0f} units/h, "
+        f"{stats['hours_to_exhaustion']:.1f}h to exhaustion"
+    )
+
 
-        except Exception as e:
-            logging.error(f"An error occurred in the message scheduler: {e}")
-            # Continue running even if one attempt fails
-            time.sleep(60)  # Wait a minute before retrying
+def watch_config(apply: Callable[[ModuleType], None]) -> Optional[ConfigWatcher]:
+    """Starts reloading config.py on change, if CONFIG_RELOAD_SECONDS is set."""
+    if not config.CONFIG_RELOAD_SECONDS:
+        return None
+    watcher = ConfigWatcher(config, config.CONFIG_RELOAD_SECONDS)
+    watcher.add_validator(validate_message_jobs)
+    watcher.add_validator(validate_moderation)
+    watcher.subscribe(apply)
+    watcher.start()
+    logging.info(f"Watching {watcher.path} for changes.")
+    return watcher
+
+
+def shutdown(
+    pipeline: ChatPipeline,
+    checkpoints: Optional[CheckpointStore],
+    executor: Optional[CommandExecutor],
+) -> None:
+    """Logs final statistics and closes everything that holds files or threads."""
+    log_pipeline_stats(pipeline)
+    if executor is not None:
+        log_executor_stats(executor)
+        executor.shutdown()
+    if pipeline.welcome_store is not None:
+        pipeline.welcome_store.close()
+    if checkpoints is not None:
+        checkpoints.close()
+    logging.info("Bot stopped.")
 
 
 def main() -> None:
     """Main function for the YouTube bot."""
     setup_logger()
-    load_commands()
-
-    youtube = get_youtube_service()
+    stop_metrics = enable_metrics(config)
+    quota = configure_quota(config)
+    try:
+        run_bot()
+    finally:
+        if quota is not None:
+            log_quota_stats(quota)
+        stop_credential_refresher()
+        stop_metrics()
+        stop_logger()
+
+
+def resolve_startup_lookups(
+    youtube: Resource,
+    video_ids: List[str],
+    cache: Optional[StartupCache],
+    timer: StartupTimer,
+) -> Tuple[Optional[str], Dict[str, Optional[str]]]:
+    """
+    Returns the bot's channel name and the live chat ID of each video. Cached
+    values are used as they are; everything else is fetched concurrently.
+    """
+    bot_channel_name = cache.channel_name() if cache else None
+    live_chat_ids: Dict[str, Optional[str]] = {
+        video_id: cache.live_chat_id(video_id) if cache else None
+        for video_id in video_ids
+    }
+    missing = [video_id for video_id, chat_id in live_chat_ids.items() if not chat_id]
+    cached = (bot_channel_name is not None) + len(video_ids) - len(missing)
+
+    with ThreadPoolExecutor(max_workers=1 + len(missing)) as pool:
+        name_future = (
+            pool.submit(get_own_channel_name, youtube)
+            if bot_channel_name is None
+            else None
+        )
+        chat_futures = {
+            video_id: pool.submit(get_live_chat_id, youtube, video_id)
+            for video_id in missing
+        }
+        if name_future is not None:
+            bot_channel_name = name_future.result()
+            if cache and bot_channel_name:
+                cache.set_channel_name(bot_channel_name)
+        for video_id, future in chat_futures.items():
+            live_chat_ids[video_id] = future.result()
+            chat_id = live_chat_ids[video_id]
+            if cache and chat_id:
+                cache.set_live_chat_id(video_id, chat_id)
+
+    timer.mark("lookups", f"{cached} cached" if cached else "")
+    return bot_channel_name, live_chat_ids
+
+
+def recheck_channel_name(
+    youtube: Resource,
+    cache: StartupCache,
+    cached_name: Optional[str],
+    on_change: Callable[[str], None],
+) -> None:
+    """Fetches the channel name in the background and fixes a stale cached one."""
+
+    def run() -> None:
+        name = get_own_channel_name(youtube)
+        if name and name != cached_name:
+            logging.warning(f"Cached channel name was stale. Now running as: {name}")
+            cache.set_channel_name(name)
+            on_change(name)
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def run_bot() -> None:
+    """Connects to the configured stream(s) and runs until the chat ends."""
+    timer = StartupTimer(STARTED_AT)
+    timer.mark("imports")
+    load_commands(lazy=config.FAST_START)
+    timer.mark("commands", "lazy" if config.FAST_START else "")
+
+    youtube = get_youtube_service(config.YOUTUBE_API_ENDPOINT)
     if not youtube:
         logging.critical("Failed to initialize YouTube service. Exiting.")
         return
+    timer.mark("service")
 
-    bot_channel_name = get_own_channel_name(youtube)
+    cache = (
+        StartupCache(config.STARTUP_CACHE_FILE, config.STARTUP_CACHE_TTL_HOURS * 3600)
+        if config.FAST_START and config.STARTUP_CACHE_FILE
+        else None
+    )
+    video_ids = [stream["video_id"] for stream in config.STREAMS] or (
+        [config.VIDEO_ID] if config.VIDEO_ID else []
+    )
+    channel_name_cached = cache is not None and cache.channel_name() is not None
+    bot_channel_name, live_chat_ids = resolve_startup_lookups(
+        youtube, video_ids, cache, timer
+    )
     if bot_channel_name:
         logging.info(f"Bot is running as channel: {bot_channel_name}")
     else:
@@ -59,132 +208,182 @@ def main() -> None:
             "Could not determine bot's channel name. The bot might respond to its own messages."
         )
 
+    checkpoints = (
+        CheckpointStore(config.CHECKPOINT_FILE, config.CHECKPOINT_FSYNC_SECONDS)
+        if config.CHECKPOINT_FILE
+        else None
+    )
+
+    executor = CommandExecutor(config) if config.COMMAND_WORKERS > 0 else None
+
+    if config.STREAMS:
+        run_multi_stream(
+            youtube,
+            bot_channel_name,
+            live_chat_ids,
+            checkpoints,
+            executor,
+            timer,
+            cache,
+            channel_name_cached,
+        )
+        return
+
     if not config.VIDEO_ID:
         logging.critical(
             "VIDEO_ID is not set in config.py. Please set it to your YouTube Live Stream Video ID."
         )
         return
 
-    live_chat_id = get_live_chat_id(youtube, config.VIDEO_ID)
+    live_chat_id = live_chat_ids[config.VIDEO_ID]
 
     if not live_chat_id:
         return
 
     logging.info(f"Successfully connected to live chat. Chat ID: {live_chat_id}")
 
-    scheduler_thread = threading.Thread(
-        target=message_scheduler, args=(youtube, live_chat_id)
+    dispatcher = OutboundDispatcher(
+        lambda text: send_chat_message(youtube, live_chat_id, text), config
     )
-    scheduler_thread.daemon = True
-    scheduler_thread.start()
-    logging.info(
-        f"Message scheduler started. Will send a message every {config.MESSAGE_INTERVAL_MINUTES} minutes."
+    pipeline = ChatPipeline(
+        config,
+        bot_channel_name,
+        welcome_store=open_welcome_store(config, config.VIDEO_ID),
+        executor=executor,
+        respond=dispatcher.submit,
+        moderate=ModerationActions(youtube, live_chat_id, executor),
     )
+    if cache is not None and channel_name_cached:
+        recheck_channel_name(
+            youtube,
+            cache,
+            bot_channel_name,
+            lambda name: setattr(pipeline, "bot_channel_name", name),
+        )
+
+    if config.ENGINE_MODE == "async":
+        # asyncio is only imported when the async engine is used
+        import asyncio
+        from async_engine import AsyncChatEngine
+
+        logging.info("Running the asyncio chat engine.")
+        engine = AsyncChatEngine(
+            youtube, live_chat_id, pipeline, config, dispatcher, checkpoints
+        )
+        watcher = watch_config(engine.apply_config)
+        timer.mark("setup")
+        logging.info(f"Startup: {timer.summary()}")
+        try:
+            asyncio.run(engine.run())
+        except KeyboardInterrupt:
+            logging.info("\nStopping bot...")
+        if watcher is not None:
+            watcher.stop()
+        # An ended chat's ID must not be reused on the next start
+        if engine.finished and cache is not None:
+            cache.forget_live_chat_id(config.VIDEO_ID)
+        shutdown(pipeline, checkpoints, executor)
+        return
+
+    scheduler = Scheduler()
+    scheduler.replace(
+        message_jobs(config, dispatcher.submit, lambda: pipeline.last_activity_at)
+    )
+    scheduler.start()
+    logging.info(f"Message scheduler started with {len(scheduler)} jobs.")
 
     logging.info(
         "Starting to fetch chat messages, listen for commands, and welcome new users..."
     )
-    next_page_token: Optional[str] = None
-    seen_users: Set[str] = set()
-    user_last_message_time: Dict[str, float] = {}
+    logging.info("Skipping existing chat history to avoid reprocessing old messages...")
+
+    session = StreamSession(
+        youtube,
+        config.VIDEO_ID,
+        live_chat_id,
+        config,
+        pipeline,
+        dispatcher,
+        checkpoints,
+    )
 
-    # Record startup time to avoid processing old messages
-    startup_time = time.time()
-    is_first_fetch = True
+    def apply_config(new_config: ModuleType) -> None:
+        # Built first, so bad jobs leave the session on the old config
+        jobs = message_jobs(
+            new_config, dispatcher.submit, lambda: pipeline.last_activity_at
+        )
+        session.apply_config(new_config)
+        scheduler.replace(jobs)
 
-    logging.info("Skipping existing chat history to avoid reprocessing old messages...")
+    watcher = watch_config(apply_config)
+    timer.mark("setup")
+    logging.info(f"Startup: {timer.summary()}")
 
     try:
         while True:
-            chat_response = get_chat_messages(youtube, live_chat_id, next_page_token)
-            if not chat_response:
-                logging.warning(
-                    "Could not retrieve chat messages. The stream might have ended."
-                )
+            delay = session.poll()
+            if delay is None:
                 break
+            # Send queued messages while waiting for the next poll
+            dispatcher.serve_until(time.monotonic() + delay)
 
-            for item in chat_response["items"]:
-                author_details = item["authorDetails"]
-                author_id = author_details["channelId"]
-                author_name = author_details["displayName"]
-                message = item["snippet"]["displayMessage"].strip()
-
-                # Get message timestamp
-                message_time_str = item["snippet"]["publishedAt"]
-                # Convert ISO 8601 timestamp to Unix timestamp
-                from datetime import datetime
-
-                message_time = datetime.fromisoformat(
-                    message_time_str.replace("Z", "+00:00")
-                ).timestamp()
-
-                # Skip old messages on first fetch to avoid reprocessing chat history
-                if is_first_fetch and message_time < startup_time:
-                    logging.debug(f"Skipping old message from {author_name}: {message}")
-                    continue
-
-                logging.info(f"Chat from {author_name}: {message}")
-
-                # Ignore messages from the bot itself
-                if bot_channel_name and author_name == bot_channel_name:
-                    continue
-
-                # Check if user is banned
-                banned_users = load_banned_users()
-                if author_name in banned_users:
-                    logging.info(f"Ignoring message from banned user: {author_name}")
-                    continue
-
-                # Rate limiting
-                current_time = time.time()
-                if author_id in user_last_message_time:
-                    last_message_time = user_last_message_time[author_id]
-                    if (
-                        current_time - last_message_time
-                        < config.USER_MESSAGE_COOLDOWN_SECONDS
-                    ):
-                        logging.info(
-                            f"User {author_name} is on cooldown. Ignoring message."
-                        )
-                        continue
-
-                user_last_message_time[author_id] = current_time
-
-                # Welcome new users (but only for new messages, not old ones)
-                if author_id not in seen_users:
-                    seen_users.add(author_id)
-                    welcome_message = config.WELCOME_MESSAGE.format(
-                        username=author_name
-                    )
-                    logging.info(f"Welcoming new user: {author_name}")
-                    send_chat_message(youtube, live_chat_id, welcome_message)
-                    # This welcome message should also be subject to cooldown, so we continue
-                    continue
-
-                response = handle_command(message, config, author_id, message)
-                if response:
-                    logging.info(
-                        f"Responding to command '{message}' from {author_name} with: {response}"
-                    )
-                    send_chat_message(youtube, live_chat_id, response)
-
-            # After first fetch, we can process all subsequent messages
-            if is_first_fetch:
-                is_first_fetch = False
-                logging.info(
-                    "Finished skipping old messages. Now processing new messages in real-time."
-                )
-
-            next_page_token = chat_response.get("nextPageToken")
-            polling_interval = chat_response.get("pollingIntervalMillis", 10000) / 1000
-
-            time.sleep(polling_interval)
+    except KeyboardInterrupt:
+        logging.info("\nStopping bot...")
+    finally:
+        scheduler.stop()
+        if watcher is not None:
+            watcher.stop()
+        if session.finished and cache is not None:
+            cache.forget_live_chat_id(config.VIDEO_ID)
+        shutdown(pipeline, checkpoints, executor)
+
+
+def run_multi_stream(
+    youtube: Resource,
+    bot_channel_name: Optional[str],
+    live_chat_ids: Dict[str, Optional[str]],
+    checkpoints: Optional[CheckpointStore],
+    executor: Optional[CommandExecutor],
+    timer: StartupTimer,
+    cache: Optional[StartupCache],
+    channel_name_cached: bool,
+) -> None:
+    """Serves every live chat listed in config.STREAMS from this process."""
+    runner = MultiStreamRunner(
+        youtube, config.STREAMS, config, bot_channel_name, checkpoints, executor
+    )
+    if not runner.connect(live_chat_ids):
+        logging.critical("Could not connect to any of the configured streams.")
+        return
+    if cache is not None and channel_name_cached:
 
+        def set_channel_name(name: str) -> None:
+            for session in runner.sessions:
+                session.pipeline.bot_channel_name = name
+
+        recheck_channel_name(youtube, cache, bot_channel_name, set_channel_name)
+    logging.info(f"Serving {len(runner.sessions)} live chats.")
+    watcher = watch_config(runner.apply_config)
+    timer.mark("setup")
+    logging.info(f"Startup: {timer.summary()}")
+    try:
+        runner.run()
     except KeyboardInterrupt:
         logging.info("\nStopping bot...")
+        runner.stop()
     finally:
-        stop_scheduler.set()
-        scheduler_thread.join()
+        if watcher is not None:
+            watcher.stop()
+        for video_id, stats in runner.stream_stats().items():
+            logging.info(f"Stream {video_id}: {stats}")
+        if cache is not None:
+            for session in runner.sessions:
+                if session.finished:
+                    cache.forget_live_chat_id(session.video_id)
+        runner.close()
+        if executor is not None:
+            log_executor_stats(executor)
+            executor.shutdown()
         logging.info("Bot stopped.")
 
 
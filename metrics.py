@@ -0,0 +1,274 @@
+# metrics.py
+"""
+Counters and histograms for the chat hot path, rendered in the Prometheus
+text exposition format. Metrics are disabled until enable_metrics() is
+called; while disabled every update returns after a single flag check.
+"""
+
+import bisect
+import logging
+from abc import ABC, abstractmethod
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Upper bounds (seconds) for latency histograms
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MetricsRegistry:
+    """Holds every metric and renders them for scraping."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._metrics: List["_Metric"] = []
+
+    def counter(self, name: str, help: str, label: str = "") -> "Counter":
+        counter = Counter(self, name, help, label)
+        self._metrics.append(counter)
+        return counter
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        label: str = "",
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> "Histogram":
+        histogram = Histogram(self, name, help, label, buckets)
+        self._metrics.append(histogram)
+        return histogram
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text format."""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        for metric in self._metrics:
+            metric.reset()
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(
+        self, registry: MetricsRegistry, name: str, help: str, label: str
+    ) -> None:
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.label = label
+        self._lock = threading.Lock()
+
+    def _labels(self, value: str, extra: str = "") -> str:
+        pairs = [f'{self.label}="{value}"'] if self.label else []
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        """Returns the metric's lines in the Prometheus text format."""
+
+    @abstractmethod
+    def reset(self) -> None:
+        """Clears every recorded value."""
+
+
+class Counter(_Metric):
+    """A monotonically increasing count, optionally split by one label."""
+
+    kind = "counter"
+
+    def __init__(
+        self, registry: MetricsRegistry, name: str, help: str, label: str
+    ) -> None:
+        super().__init__(registry, name, help, label)
+        self._values: Dict[str, float] = {}
+
+    def inc(self, label_value: str = "", amount: float = 1) -> None:
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def value(self, label_value: str = "") -> float:
+        return self._values.get(label_value, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = self._header()
+        lines.extend(
+            f"{self.name}{self._labels(label)} {value:g}" for label, value in values
+        )
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(_Metric):
+    """Counts observations into cumulative buckets, optionally per label."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        name: str,
+        help: str,
+        label: str,
+        buckets: Sequence[float],
+    ) -> None:
+        super().__init__(registry, name, help, label)
+        self.buckets = tuple(sorted(buckets))
+        # label value -> (per-bucket counts incl. +Inf, sum)
+        self._series: Dict[str, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, label_value: str = "") -> None:
+        if not self.registry.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0])
+                self._series[label_value] = series
+            series[0][index] += 1
+            series[1][0] += value
+
+    @contextmanager
+    def time(self, label_value: str = "") -> Iterator[None]:
+        """Observes the duration of the with block."""
+        if not self.registry.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, label_value)
+
+    def count(self, label_value: str = "") -> int:
+        series = self._series.get(label_value)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted(
+                (label, list(counts), total[0])
+                for label, (counts, total) in self._series.items()
+            )
+        lines = self._header()
+        for label, counts, total in series:
+            cumulative = 0
+            bounds = [f"{bound:g}" for bound in self.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = self._labels(label, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(label)} {total:g}")
+            lines.append(f"{self.name}_count{self._labels(label)} {cumulative}")
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+MESSAGES_INGESTED = REGISTRY.counter(
+    "bot_messages_ingested_total", "Chat messages received from the API."
+)
+MESSAGES_FILTERED = REGISTRY.counter(
+    "bot_messages_filtered_total", "Chat messages ignored, by reason.", "reason"
+)
+COMMANDS_EXECUTED = REGISTRY.counter(
+    "bot_commands_executed_total", "Commands executed, by name.", "command"
+)
+MESSAGES_SENT = REGISTRY.counter(
+    "bot_messages_sent_total", "Outbound chat messages, by result.", "result"
+)
+API_LATENCY = REGISTRY.histogram(
+    "bot_api_request_seconds", "YouTube API request latency.", "endpoint"
+)
+QUOTA_UNITS = REGISTRY.counter(
+    "bot_api_quota_units_total",
+    "YouTube API quota units spent, by endpoint.",
+    "endpoint",
+)
+POLL_LAG = REGISTRY.histogram(
+    "bot_poll_lag_seconds", "How late each poll started compared to its schedule."
+)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        payload = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def _dump_periodically(interval: float, stop: threading.Event) -> None:
+    while not stop.wait(interval):
+        logging.info("Metrics:\n%s", REGISTRY.render())
+
+
+def enable_metrics(config: ModuleType) -> Callable[[], None]:
+    """
+    Turns metrics on if config.METRICS_ENABLED is set, serving them on
+    http://METRICS_HOST:METRICS_PORT/metrics and/or logging them every
+    METRICS_DUMP_SECONDS. Returns a function that stops both.
+    """
+    if not config.METRICS_ENABLED:
+        return lambda: None
+    REGISTRY.enabled = True
+    server: Optional[ThreadingHTTPServer] = None
+    stop = threading.Event()
+
+    if config.METRICS_PORT:
+        server = ThreadingHTTPServer(
+            (config.METRICS_HOST, config.METRICS_PORT), _MetricsHandler
+        )
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        logging.info(
+            f"Serving metrics on http://{config.METRICS_HOST}:{config.METRICS_PORT}/metrics"
+        )
+    if config.METRICS_DUMP_SECONDS:
+        threading.Thread(
+            target=_dump_periodically,
+            args=(config.METRICS_DUMP_SECONDS, stop),
+            daemon=True,
+        ).start()
+
+    def stop_metrics() -> None:
+        stop.set()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        if config.METRICS_DUMP_SECONDS:
+            logging.info("Metrics:\n%s", REGISTRY.render())
+
+    return stop_metrics
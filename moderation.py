@@ -0,0 +1,251 @@
+# moderation.py
+"""
+Banned-phrase moderation.
+
+Every phrase in config.MODERATION_RULES goes into one Aho-Corasick
+automaton, so a message is scanned once, in time linear in its length, no
+matter how many phrases there are. The automaton is built once per rules
+list and shared by every config snapshot that carries the same list. A
+reload that changes the rules builds a new one and swaps it in.
+"""
+
+import logging
+import weakref
+from collections import deque
+from types import ModuleType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+from googleapiclient.discovery import Resource
+
+from chat_message import ChatMessage
+from command_executor import CommandExecutor
+from youtube_api import ban_chat_user
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+IGNORE = "ignore"
+WARN = "warn"
+TIMEOUT = "timeout"
+BAN = "ban"
+# When a message matches several rules, the most severe action wins
+SEVERITY = {IGNORE: 0, WARN: 1, TIMEOUT: 2, BAN: 3}
+
+
+class PhraseAutomaton(Generic[T]):
+    """
+    An Aho-Corasick automaton over case-folded phrases. Each phrase carries a
+    value that is reported with its matches.
+    """
+
+    def __init__(self, phrases: Iterable[Tuple[str, T]]) -> None:
+        # Node 0 is the root; goto[n] maps a character to the next node
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Phrases ending at a node, including those reached through fail links
+        self._out: List[Tuple[Tuple[int, T], ...]] = [()]
+        self.size = 0
+        for phrase, value in phrases:
+            self._insert(phrase.casefold(), value)
+        self._link()
+
+    @property
+    def states(self) -> int:
+        return len(self._goto)
+
+    def _insert(self, phrase: str, value: T) -> None:
+        if not phrase:
+            return
+        node = 0
+        for char in phrase:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = next_node
+        self._out[node] += ((len(phrase), value),)
+        self.size += 1
+
+    def _link(self) -> None:
+        """Computes fail links breadth-first, merging outputs along them."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] += self._out[self._fail[child]]
+
+    def matches(self, text: str) -> Iterator[Tuple[int, int, T]]:
+        """
+        Yields (start, end, value) for every phrase occurring in text, which
+        must already be case-folded.
+        """
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        node = 0
+        for end, char in enumerate(text, 1):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                for length, value in out[node]:
+                    yield end - length, end, value
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class ModerationRule:
+    """An action to take when a message contains one of the rule's phrases."""
+
+    __slots__ = ("action", "duration", "whole_word", "severity")
+
+    def __init__(self, action: str, duration: int = 0, whole_word: bool = True):
+        if action not in SEVERITY:
+            raise ValueError(f"unknown moderation action: {action}")
+        if action == TIMEOUT and duration <= 0:
+            # ban_chat_user would make a timeout without a duration permanent
+            raise ValueError("a timeout needs a duration in seconds")
+        self.action = action
+        self.duration = duration
+        self.whole_word = whole_word
+        self.severity = SEVERITY[action]
+
+    @classmethod
+    def from_config(cls, rule: Mapping[str, Any]) -> "ModerationRule":
+        return cls(
+            rule.get("action", IGNORE),
+            int(rule.get("duration", 0)),
+            bool(rule.get("whole_word", True)),
+        )
+
+    def __repr__(self) -> str:
+        return f"ModerationRule({self.action!r}, duration={self.duration})"
+
+
+class ModerationFilter:
+    """Finds the most severe rule a message breaks."""
+
+    def __init__(self, rules: Sequence[Mapping[str, Any]]) -> None:
+        self.rules = rules
+        entries: List[Tuple[str, ModerationRule]] = []
+        for rule_config in rules:
+            rule = ModerationRule.from_config(rule_config)
+            entries.extend((phrase, rule) for phrase in rule_config.get("phrases", ()))
+        self.automaton: PhraseAutomaton[ModerationRule] = PhraseAutomaton(entries)
+
+    def check(self, text: str) -> Optional[Tuple[ModerationRule, str]]:
+        """Returns the most severe matching rule and the phrase that matched."""
+        folded = text.casefold()
+        found: Optional[Tuple[ModerationRule, str]] = None
+        for start, end, rule in self.automaton.matches(folded):
+            if rule.whole_word and (
+                (start > 0 and _is_word_char(folded[start - 1]))
+                or (end < len(folded) and _is_word_char(folded[end]))
+            ):
+                continue
+            if found is None or rule.severity > found[0].severity:
+                found = (rule, folded[start:end])
+                if rule.action == BAN:
+                    break
+        return found
+
+
+# One filter per config object, like command_handler's dispatch tables
+_filters: "weakref.WeakKeyDictionary[ModuleType, ModerationFilter]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_moderation_filter(config: ModuleType) -> Optional[ModerationFilter]:
+    """
+    Returns the filter for config.MODERATION_RULES, or None if there are no
+    rules. A new config whose rules equal those of a config still in use
+    (e.g. after a reload that changed other settings) shares its filter.
+    """
+    rules = config.MODERATION_RULES
+    if not rules:
+        return None
+    cached = _filters.get(config)
+    if cached is not None and cached.rules is rules:
+        return cached
+    for existing in list(_filters.values()):
+        if existing.rules is rules or existing.rules == rules:
+            _filters[config] = existing
+            return existing
+    moderation_filter = ModerationFilter(rules)
+    logger.info(
+        "Compiled %d banned phrases into %d automaton states.",
+        moderation_filter.automaton.size,
+        moderation_filter.automaton.states,
+    )
+    _filters[config] = moderation_filter
+    return moderation_filter
+
+
+def validate_moderation(config: ModuleType) -> None:
+    """Raises ValueError if config's moderation or spam rules cannot be built."""
+    ModerationFilter(config.MODERATION_RULES)
+    ModerationRule(config.SPAM_ACTION, config.SPAM_TIMEOUT_SECONDS)
+
+
+ModerationHandler = Callable[[ChatMessage, ModerationRule], Any]
+
+
+class ModerationActions:
+    """
+    Carries out timeouts and bans through the API. Calls run on the command
+    executor when there is one, so the polling thread never waits on them.
+    """
+
+    def __init__(
+        self,
+        youtube: Resource,
+        live_chat_id: str,
+        executor: Optional[CommandExecutor] = None,
+    ) -> None:
+        self.youtube = youtube
+        self.live_chat_id = live_chat_id
+        self.executor = executor
+
+    def __call__(self, message: ChatMessage, rule: ModerationRule) -> None:
+        def run() -> Optional[str]:
+            ban_chat_user(
+                self.youtube,
+                self.live_chat_id,
+                message.author_id,
+                rule.duration if rule.action == TIMEOUT else None,
+            )
+            return None
+
+        if self.executor is None:
+            run()
+        else:
+            self.executor.submit(message.author_id, rule.action, run, _ignore_result)
+
+
+def _ignore_result(response: Optional[str]) -> None:
+    pass
@@ -0,0 +1,246 @@
+# multi_stream.py
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from types import ModuleType
+from typing import Any, Dict, List, Optional
+
+from googleapiclient.discovery import Resource
+
+from chat_pipeline import ChatPipeline
+from checkpoint import CheckpointStore
+from command_executor import CommandExecutor
+from moderation import ModerationActions
+from outbound import OutboundMessage, send_bucket
+from scheduler import Job, Scheduler, message_jobs
+from stream_session import StreamSession
+from welcome_store import open_welcome_store
+from youtube_api import get_live_chat_id
+
+logger = logging.getLogger(__name__)
+
+
+def stream_config(
+    base: ModuleType, video_id: str, overrides: Dict[str, Any]
+) -> ModuleType:
+    """Returns a copy of the config module with per-stream overrides applied."""
+    stream = ModuleType(f"{base.__name__}[{video_id}]")
+    stream.__dict__.update(vars(base))
+    stream.__dict__.update(overrides, VIDEO_ID=video_id)
+    return stream
+
+
+class MultiStreamRunner:
+    """
+    Serves many live chats from one process with one authenticated service and
+    one command registry.
+
+    Each stream gets its own StreamSession. A single scheduling thread picks
+    the sessions whose poll or send deadline has passed, earliest deadline
+    first, and runs them on a bounded thread pool; a session is never run by
+    two workers at once, so its pipeline and dispatcher stay single-threaded.
+    The same thread runs every stream's scheduled-message jobs.
+    """
+
+    def __init__(
+        self,
+        youtube: Resource,
+        streams: List[Dict[str, Any]],
+        config: ModuleType,
+        bot_channel_name: Optional[str],
+        checkpoints: Optional[CheckpointStore] = None,
+        executor: Optional[CommandExecutor] = None,
+    ) -> None:
+        self.youtube = youtube
+        self.streams = streams
+        self.config = config
+        self.bot_channel_name = bot_channel_name
+        self.checkpoints = checkpoints
+        self.executor = executor
+        self.sessions: List[StreamSession] = []
+        self.next_poll_at: Dict[str, float] = {}
+        self.last_run_at: Dict[str, float] = {}
+        self.busy: Dict[str, bool] = {}
+        self.stopped = threading.Event()
+        self._wakeup = threading.Event()
+        self.scheduler = Scheduler()
+        self.scheduler.notify = self._wakeup.set
+        # The API quota is per project: every stream sends from one budget
+        self.send_bucket = send_bucket(config, time.monotonic())
+
+    def connect(self, live_chat_ids: Optional[Dict[str, Optional[str]]] = None) -> int:
+        """
+        Resolves the live chat of every stream, unless it is already given in
+        live_chat_ids. Returns the number connected.
+        """
+        live_chat_ids = live_chat_ids or {}
+        for stream in self.streams:
+            overrides = dict(stream)
+            video_id = overrides.pop("video_id")
+            live_chat_id = live_chat_ids.get(video_id) or get_live_chat_id(
+                self.youtube, video_id
+            )
+            if not live_chat_id:
+                continue
+            config = stream_config(self.config, video_id, overrides)
+            pipeline = ChatPipeline(
+                config,
+                self.bot_channel_name,
+                welcome_store=open_welcome_store(config, video_id),
+                executor=self.executor,
+                moderate=ModerationActions(self.youtube, live_chat_id, self.executor),
+            )
+            session = StreamSession(
+                self.youtube,
+                video_id,
+                live_chat_id,
+                config,
+                pipeline,
+                checkpoints=self.checkpoints,
+                send_bucket=self.send_bucket,
+            )
+            pipeline.respond = functools.partial(self._respond, session)
+            self.add_session(session)
+            logger.info("Connected to live chat of %s: %s", video_id, live_chat_id)
+        return len(self.sessions)
+
+    def apply_config(self, config: ModuleType) -> None:
+        """
+        Re-derives every stream's config from a reloaded config snapshot.
+        Every stream's jobs are built first, so a bad one leaves all streams
+        on the old config.
+        """
+        overrides = {stream["video_id"]: stream for stream in self.streams}
+        updates = []
+        for session in self.sessions:
+            stream = dict(overrides.get(session.video_id, {}))
+            stream.pop("video_id", None)
+            session_config = stream_config(config, session.video_id, stream)
+            jobs = None
+            if not session.finished:
+                jobs = self._message_jobs(session, session_config)
+            updates.append((session, session_config, jobs))
+
+        self.config = config
+        for session, session_config, jobs in updates:
+            session.apply_config(session_config)
+            if jobs is not None:
+                self.scheduler.replace(jobs, session.video_id)
+
+    def add_session(self, session: StreamSession) -> None:
+        self.sessions.append(session)
+        self.next_poll_at[session.video_id] = time.monotonic()
+        self.last_run_at[session.video_id] = 0.0
+        self.busy[session.video_id] = False
+        self._schedule_messages(session)
+
+    def _schedule_messages(self, session: StreamSession) -> None:
+        self.scheduler.replace(
+            self._message_jobs(session, session.config), session.video_id
+        )
+
+    def _message_jobs(self, session: StreamSession, config: ModuleType) -> List[Job]:
+        return message_jobs(
+            config,
+            functools.partial(self._respond, session),
+            lambda: session.pipeline.last_activity_at,
+            session.video_id,
+        )
+
+    def _respond(self, session: StreamSession, message: OutboundMessage) -> None:
+        """Queues a command response finished by the executor and wakes the scheduler."""
+        session.dispatcher.submit(message)
+        self._wakeup.set()
+
+    def _deadline(self, session: StreamSession) -> float:
+        deadline = self.next_poll_at[session.video_id]
+        send_due = session.dispatcher.time_until_due()
+        if send_due is not None:
+            deadline = min(deadline, time.monotonic() + send_due)
+        return deadline
+
+    def _step(self, session: StreamSession) -> None:
+        """Runs on a worker: polls if due, then sends whatever is due."""
+        now = time.monotonic()
+        if now >= self.next_poll_at[session.video_id]:
+            delay = session.poll()
+            if delay is not None:
+                self.next_poll_at[session.video_id] = time.monotonic() + delay
+        session.dispatcher.flush()
+
+    def _done(self, session: StreamSession, future: "Future[None]") -> None:
+        error = future.exception()
+        if error is not None:
+            logger.error("Error while serving %s: %s", session.video_id, error)
+            # Back off like a failed poll, or the page is re-polled at once
+            session.stats["poll_errors"] += 1
+            retry_delay = session.poller.on_error()
+            if retry_delay is None:
+                logger.warning(
+                    "Giving up on %s after repeated errors.", session.video_id
+                )
+                session.finished = True
+            else:
+                self.next_poll_at[session.video_id] = time.monotonic() + retry_delay
+        if session.finished:
+            self.scheduler.remove_stream(session.video_id)
+        self.busy[session.video_id] = False
+        self._wakeup.set()
+
+    def run(self) -> None:
+        """Serves every connected stream until all have ended or stop() is called."""
+        with ThreadPoolExecutor(
+            max_workers=self.config.MULTI_STREAM_WORKERS,
+            thread_name_prefix="stream",
+        ) as pool:
+            while not self.stopped.is_set():
+                active = [s for s in self.sessions if not s.finished]
+                if not active:
+                    break
+                scheduled_in = self.scheduler.run_pending()
+                now = time.monotonic()
+                in_flight = sum(self.busy[s.video_id] for s in active)
+                idle = [s for s in active if not self.busy[s.video_id]]
+                deadlines = {s.video_id: self._deadline(s) for s in idle}
+                # Earliest deadline first; ties go to the stream served longest ago
+                due = sorted(
+                    (s for s in idle if deadlines[s.video_id] <= now),
+                    key=lambda s: (deadlines[s.video_id], self.last_run_at[s.video_id]),
+                )
+                for session in due[: self.config.MULTI_STREAM_WORKERS - in_flight]:
+                    self.busy[session.video_id] = True
+                    self.last_run_at[session.video_id] = now
+                    future = pool.submit(self._step, session)
+                    future.add_done_callback(functools.partial(self._done, session))
+
+                upcoming = [d - now for d in deadlines.values() if d > now]
+                if scheduled_in is not None:
+                    upcoming.append(scheduled_in)
+                wait = min(upcoming) if upcoming else 1.0
+                self._wakeup.wait(min(wait, 1.0))
+                self._wakeup.clear()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self._wakeup.set()
+
+    def stream_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stream counters for polls, messages, replies and latency."""
+        result: Dict[str, Dict[str, Any]] = {}
+        for session in self.sessions:
+            stats: Dict[str, Any] = dict(session.stats)
+            stats["sent"] = session.dispatcher.stats["sent"]
+            stats["latency_p99"] = session.pipeline.latency.percentile(0.99)
+            stats["duplicates"] = session.pipeline.recent_ids.suppressed
+            stats["finished"] = session.finished
+            result[session.video_id] = stats
+        return result
+
+    def close(self) -> None:
+        if self.checkpoints is not None:
+            self.checkpoints.close()
+        for session in self.sessions:
+            if session.pipeline.welcome_store is not None:
+                session.pipeline.welcome_store.close()
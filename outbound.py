@@ -0,0 +1,345 @@
+# outbound.py
+import logging
+import threading
+import time
+from collections import deque
+from types import ModuleType
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from metrics import MESSAGES_SENT
+from quota import QUOTA, QuotaMeter
+
+logger = logging.getLogger(__name__)
+
+# Lower values are sent first and are the last to be deferred or dropped
+PRIORITY_COMMAND = 0
+PRIORITY_WELCOME = 1
+PRIORITY_SCHEDULED = 2
+
+KIND_PRIORITIES = {
+    "command": PRIORITY_COMMAND,
+    "welcome": PRIORITY_WELCOME,
+    "scheduled": PRIORITY_SCHEDULED,
+}
+
+
+class OutboundMessage:
+    """A message waiting to be sent. For welcomes, text holds the username."""
+
+    __slots__ = ("kind", "text", "created")
+
+    def __init__(self, kind: str, text: str, created: float = 0.0) -> None:
+        self.kind = kind
+        self.text = text
+        self.created = created
+
+    @classmethod
+    def command(cls, text: str) -> "OutboundMessage":
+        return cls("command", text)
+
+    @classmethod
+    def welcome(cls, username: str) -> "OutboundMessage":
+        return cls("welcome", username)
+
+    @classmethod
+    def scheduled(cls, text: str) -> "OutboundMessage":
+        return cls("scheduled", text)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, OutboundMessage):
+            return NotImplemented
+        return self.kind == other.kind and self.text == other.text
+
+    def __repr__(self) -> str:
+        return f"OutboundMessage({self.kind!r}, {self.text!r})"
+
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to capacity tokens, refilled at rate per
+    second. Thread-safe, so several dispatchers can share one.
+    """
+
+    def __init__(self, capacity: float, rate: float, now: float = 0.0) -> None:
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.last = now
+        self._lock = threading.RLock()
+
+    def refill(self, now: float) -> float:
+        with self._lock:
+            if now > self.last:
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.last) * self.rate
+                )
+                self.last = now
+            return self.tokens
+
+    def try_consume(
+        self, now: float, amount: float = 1.0, reserve: float = 0.0
+    ) -> bool:
+        """Takes amount tokens if that leaves at least reserve tokens in the bucket."""
+        with self._lock:
+            if self.refill(now) - amount >= reserve:
+                self.tokens -= amount
+                return True
+            return False
+
+    def time_until(self, now: float, tokens: float) -> float:
+        """Seconds until the bucket holds the given number of tokens."""
+        missing = tokens - self.refill(now)
+        if missing <= 0:
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return missing / self.rate
+
+
+def send_rate_from_quota(config: ModuleType) -> float:
+    """Messages per second the configured quota share allows for sends."""
+    units_per_second = (
+        config.DAILY_QUOTA_UNITS
+        * config.SEND_QUOTA_SHARE
+        / (config.STREAM_DURATION_HOURS * 3600)
+    )
+    return float(units_per_second / config.SEND_COST_UNITS)
+
+
+def send_bucket(config: ModuleType, now: float) -> TokenBucket:
+    """A bucket holding the send budget of the whole project."""
+    return TokenBucket(config.OUTBOUND_BURST, send_rate_from_quota(config), now)
+
+
+def join_names(names: List[str], config: ModuleType) -> str:
+    """Joins names as "A, B e C" using the configured separators."""
+    if len(names) == 1:
+        return names[0]
+    head = config.WELCOME_NAMES_SEPARATOR.join(names[:-1])
+    return f"{head}{config.WELCOME_NAMES_LAST_SEPARATOR}{names[-1]}"
+
+
+class OutboundDispatcher:
+    """
+    Queues outgoing chat messages and sends them within the API quota.
+
+    - Welcomes that arrive within WELCOME_COALESCE_WINDOW_SECONDS are merged
+      into a single message.
+    - Identical texts already queued, or sent within
+      OUTBOUND_DEDUP_WINDOW_SECONDS, are dropped.
+    - Sends draw from a token bucket derived from the configured quota. The
+      quota is per project, so dispatchers for several chats share one bucket.
+      Welcomes and scheduled messages are only sent while more than
+      OUTBOUND_LOW_PRIORITY_RESERVE tokens remain, so command responses keep
+      priority, and anything deferred for longer than OUTBOUND_MAX_DEFER_SECONDS
+      is dropped.
+    - While the API quota is forecast to run out before the stream ends,
+      welcomes and scheduled messages are dropped.
+
+    submit() is thread-safe; flush() and serve_until() should be driven from a
+    single thread so messages go out in order.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str], Any],
+        config: ModuleType,
+        clock: Callable[[], float] = time.monotonic,
+        quota: QuotaMeter = QUOTA,
+        bucket: Optional[TokenBucket] = None,
+    ) -> None:
+        self.send = send
+        self.config = config
+        self.clock = clock
+        self.quota = quota
+        self.bucket = bucket or send_bucket(config, clock())
+        self._queues: Tuple[Deque[OutboundMessage], ...] = (deque(), deque(), deque())
+        self._pending_texts: Dict[str, int] = {}
+        self._recently_sent: Dict[str, float] = {}
+        self._welcome_names: List[str] = []
+        self._welcome_started = 0.0
+        self._generation = 0
+        self._condition = threading.Condition()
+        self.stats: Dict[str, int] = {
+            "submitted": 0,
+            "sent": 0,
+            "failed": 0,
+            "coalesced": 0,
+            "duplicates": 0,
+            "expired": 0,
+            "suppressed": 0,
+        }
+
+    def submit(self, message: OutboundMessage) -> bool:
+        """
+        Queues a message. Returns False if it was dropped as a duplicate or
+        to save quota.
+        """
+        now = self.clock()
+        with self._condition:
+            self._generation += 1
+            self.stats["submitted"] += 1
+            if message.kind != "command" and self.quota.degraded:
+                self.stats["suppressed"] += 1
+                logger.info("Saving quota, dropping %s message.", message.kind)
+                return False
+            if message.kind == "welcome":
+                if not self._welcome_names:
+                    self._welcome_started = now
+                self._welcome_names.append(message.text)
+                if len(self._welcome_names) >= self.config.WELCOME_COALESCE_MAX_NAMES:
+                    self._close_welcome_batch()
+                self._condition.notify()
+                return True
+            return self._enqueue(message.kind, message.text, now)
+
+    def _enqueue(self, kind: str, text: str, now: float) -> bool:
+        # Called with the lock held
+        sent_at = self._recently_sent.get(text)
+        if text in self._pending_texts or (
+            sent_at is not None
+            and now - sent_at < self.config.OUTBOUND_DEDUP_WINDOW_SECONDS
+        ):
+            self.stats["duplicates"] += 1
+            logger.info("Dropping duplicate outbound message: %s", text)
+            return False
+        self._pending_texts[text] = self._pending_texts.get(text, 0) + 1
+        self._queues[KIND_PRIORITIES[kind]].append(OutboundMessage(kind, text, now))
+        self._condition.notify()
+        return True
+
+    def _close_welcome_batch(self) -> None:
+        # Called with the lock held
+        names = self._welcome_names
+        self._welcome_names = []
+        if len(names) > 1:
+            self.stats["coalesced"] += len(names) - 1
+        text = self.config.WELCOME_MESSAGE.format(
+            username=join_names(names, self.config)
+        )
+        self._enqueue("welcome", text, self._welcome_started)
+
+    def pending(self) -> int:
+        """Number of messages (and pending welcome names) not yet sent."""
+        with self._condition:
+            return sum(len(q) for q in self._queues) + len(self._welcome_names)
+
+    def _next_ready(self, now: float, force: bool) -> Optional[OutboundMessage]:
+        # Called with the lock held
+        if self._welcome_names and (
+            force
+            or now - self._welcome_started
+            >= self.config.WELCOME_COALESCE_WINDOW_SECONDS
+        ):
+            self._close_welcome_batch()
+
+        for priority, queue in enumerate(self._queues):
+            while queue and (
+                now - queue[0].created > self.config.OUTBOUND_MAX_DEFER_SECONDS
+            ):
+                expired = queue.popleft()
+                self._forget_pending(expired.text)
+                self.stats["expired"] += 1
+                logger.info("Dropping stale %s message: %s", expired.kind, expired.text)
+            if not queue:
+                continue
+            reserve = (
+                0.0
+                if priority == PRIORITY_COMMAND
+                else float(self.config.OUTBOUND_LOW_PRIORITY_RESERVE)
+            )
+            if self.bucket.try_consume(now, reserve=reserve):
+                message = queue.popleft()
+                self._forget_pending(message.text)
+                return message
+            # Lower priorities need even more tokens, so stop here
+            return None
+        return None
+
+    def _forget_pending(self, text: str) -> None:
+        count = self._pending_texts.get(text, 0) - 1
+        if count > 0:
+            self._pending_texts[text] = count
+        else:
+            self._pending_texts.pop(text, None)
+
+    def flush(self, force: bool = False) -> int:
+        """
+        Sends every message that is due and within budget. With force=True,
+        pending welcomes are sent without waiting for the coalescing window.
+        Returns the number of messages sent.
+        """
+        sent = 0
+        while True:
+            now = self.clock()
+            with self._condition:
+                message = self._next_ready(now, force)
+                if message is None:
+                    break
+                self._recently_sent[message.text] = now
+            if self.send(message.text) is None:
+                self.stats["failed"] += 1
+                MESSAGES_SENT.inc("failure")
+            else:
+                self.stats["sent"] += 1
+                MESSAGES_SENT.inc("success")
+                sent += 1
+        self._prune_recently_sent(self.clock())
+        return sent
+
+    def _prune_recently_sent(self, now: float) -> None:
+        window = self.config.OUTBOUND_DEDUP_WINDOW_SECONDS
+        with self._condition:
+            if len(self._recently_sent) > 256:
+                self._recently_sent = {
+                    text: sent_at
+                    for text, sent_at in self._recently_sent.items()
+                    if now - sent_at < window
+                }
+
+    def time_until_due(self) -> Optional[float]:
+        """Seconds until flush() could send something, or None if nothing is queued."""
+        now = self.clock()
+        with self._condition:
+            candidates: List[float] = []
+            if self._welcome_names:
+                window_left = self.config.WELCOME_COALESCE_WINDOW_SECONDS - (
+                    now - self._welcome_started
+                )
+                candidates.append(
+                    max(
+                        window_left,
+                        self.bucket.time_until(
+                            now, self.config.OUTBOUND_LOW_PRIORITY_RESERVE + 1
+                        ),
+                    )
+                )
+            for priority, queue in enumerate(self._queues):
+                if queue:
+                    reserve = (
+                        0
+                        if priority == PRIORITY_COMMAND
+                        else self.config.OUTBOUND_LOW_PRIORITY_RESERVE
+                    )
+                    candidates.append(self.bucket.time_until(now, reserve + 1))
+            if not candidates:
+                return None
+            return max(0.0, min(candidates))
+
+    def serve_until(self, deadline: float) -> None:
+        """Sends messages as they become due until the given clock() deadline."""
+        while True:
+            with self._condition:
+                generation = self._generation
+            self.flush()
+            now = self.clock()
+            if now >= deadline:
+                return
+            wait = deadline - now
+            due = self.time_until_due()
+            if due is not None:
+                wait = min(wait, max(due, 0.001))
+            with self._condition:
+                # Don't sleep through a message submitted while we were sending
+                if self._generation == generation:
+                    self._condition.wait(wait)
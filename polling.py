@@ -0,0 +1,118 @@
+# polling.py
+import random
+import threading
+from collections import deque
+from types import ModuleType
+from typing import Callable, Deque, Dict, Optional
+
+from quota import QUOTA, QuotaMeter
+
+
+class LatencyStats:
+    """
+    Tracks end-to-end message latency (publishedAt -> handled) in seconds.
+    Keeps running totals plus a bounded window of recent samples for percentiles.
+    """
+
+    def __init__(self, window: int = 1000) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+            self._recent.append(seconds)
+
+    def percentile(self, fraction: float) -> float:
+        """Returns the given percentile (0-1) of the recent samples."""
+        with self._lock:
+            samples = sorted(self._recent)
+        if not samples:
+            return 0.0
+        index = min(len(samples) - 1, int(fraction * len(samples)))
+        return samples[index]
+
+    def snapshot(self) -> Dict[str, float]:
+        mean = self.total / self.count if self.count else 0.0
+        return {
+            "count": float(self.count),
+            "mean": mean,
+            "p50": self.percentile(0.5),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+
+class PollScheduler:
+    """
+    Decides how long to wait before the next liveChatMessages().list call.
+
+    - Never polls faster than the server's pollingIntervalMillis.
+    - Busy pages (POLL_BUSY_MESSAGES or more items) drop straight back to the
+      server minimum; empty pages stretch the interval by
+      POLL_IDLE_BACKOFF_FACTOR up to POLL_MAX_INTERVAL_SECONDS.
+    - Time already spent fetching and processing the page is subtracted.
+    - While the API quota is forecast to run out before the stream ends,
+      polls are spaced out until polling fits the quota left, up to
+      QUOTA_MAX_POLL_INTERVAL_SECONDS.
+    - Errors back off exponentially with jitter, and the caller gives up after
+      POLL_MAX_CONSECUTIVE_ERRORS failures in a row.
+    """
+
+    def __init__(
+        self,
+        config: ModuleType,
+        rng: Callable[[], float] = random.random,
+        quota: QuotaMeter = QUOTA,
+    ) -> None:
+        self.config = config
+        self.rng = rng
+        self.quota = quota
+        self.interval: Optional[float] = None
+        self.consecutive_errors = 0
+
+    def next_delay(
+        self,
+        server_interval_millis: Optional[int],
+        elapsed: float,
+        message_count: int,
+    ) -> float:
+        """Returns the delay after a successful poll that took elapsed seconds."""
+        self.consecutive_errors = 0
+        server_min = (
+            server_interval_millis if server_interval_millis is not None else 10000
+        ) / 1000
+        interval = self.interval if self.interval is not None else server_min
+
+        if message_count >= self.config.POLL_BUSY_MESSAGES:
+            interval = server_min
+        elif message_count == 0:
+            interval = min(
+                self.config.POLL_MAX_INTERVAL_SECONDS,
+                interval * self.config.POLL_IDLE_BACKOFF_FACTOR,
+            )
+        else:
+            # Some activity: drift back towards the server minimum
+            interval = interval / self.config.POLL_IDLE_BACKOFF_FACTOR
+
+        self.interval = max(server_min, interval)
+        delay = max(self.interval, self.quota.min_poll_interval(self))
+        return max(0.0, delay - elapsed)
+
+    def on_error(self) -> Optional[float]:
+        """Returns the delay before retrying a failed poll, or None to give up."""
+        self.consecutive_errors += 1
+        if self.consecutive_errors > self.config.POLL_MAX_CONSECUTIVE_ERRORS:
+            return None
+        backoff = min(
+            self.config.POLL_MAX_ERROR_BACKOFF_SECONDS,
+            self.config.POLL_ERROR_BACKOFF_SECONDS * 2 ** (self.consecutive_errors - 1),
+        )
+        # "Equal jitter": keep half the backoff, randomise the other half
+        return float(backoff / 2 + self.rng() * backoff / 2)
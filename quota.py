@@ -0,0 +1,222 @@
+# quota.py
+"""
+YouTube Data API quota accounting.
+
+Every API request, retries included, is charged its unit cost against
+DAILY_QUOTA_UNITS over a rolling 24 hours, kept as per-minute totals (at
+most 1440 of them). The spending rate over the last
+QUOTA_FORECAST_WINDOW_SECONDS gives a forecast of when the quota runs out.
+If that comes before the planned end of the stream (STREAM_DURATION_HOURS
+after startup), the bot is degraded:
+
+- polls are spaced out so polling fits what is left of the budget, up to
+  QUOTA_MAX_POLL_INTERVAL_SECONDS (see PollScheduler);
+- welcomes and scheduled messages are dropped, so what quota is left goes
+  to reading chat and answering commands (see OutboundDispatcher).
+
+Like metrics, accounting is off until configure() turns it on, and every
+charge then returns after a single flag check.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from types import ModuleType
+from typing import Callable, Deque, Dict, Hashable, List, Optional
+
+from metrics import QUOTA_UNITS
+
+logger = logging.getLogger(__name__)
+
+# Units per call, from the YouTube Data API quota calculator
+QUOTA_COSTS: Dict[str, int] = {
+    "videos.list": 1,
+    "channels.list": 1,
+    "liveChatMessages.list": 5,
+    "liveChatMessages.insert": 50,
+    "liveChatBans.insert": 50,
+}
+POLL_ENDPOINT = "liveChatMessages.list"
+
+DAY = 24 * 3600
+RECOVERY_SLACK = 1.25
+
+
+class QuotaMeter:
+    """Rolling daily quota usage, forecasting and the degradation decision."""
+
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        self.enabled = False
+        self.clock = clock
+        self.budget = 10000
+        self.window = 600.0
+        self.max_poll_interval = 60.0
+        self.started = clock()
+        self.planned_end = self.started
+        # [minute, units, poll units], oldest first
+        self._minutes: Deque[List[float]] = deque()
+        self._used = 0.0
+        self._exhausted = False
+        self.degraded = False
+        # Last time each poller asked for its interval
+        self._pollers: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, config: ModuleType) -> None:
+        """Turns accounting on if config.QUOTA_TRACKING is set."""
+        self.enabled = config.QUOTA_TRACKING
+        self.budget = config.DAILY_QUOTA_UNITS
+        self.window = config.QUOTA_FORECAST_WINDOW_SECONDS
+        self.max_poll_interval = config.QUOTA_MAX_POLL_INTERVAL_SECONDS
+        self.started = self.clock()
+        self.planned_end = self.started + config.STREAM_DURATION_HOURS * 3600
+
+    def reset(self) -> None:
+        with self._lock:
+            self._minutes.clear()
+            self._pollers.clear()
+            self._used = 0.0
+            self._exhausted = False
+            self.degraded = False
+
+    def charge(self, endpoint: str) -> None:
+        """Records one call to endpoint."""
+        if not self.enabled:
+            return
+        cost = QUOTA_COSTS.get(endpoint, 1)
+        QUOTA_UNITS.inc(endpoint, cost)
+        now = self.clock()
+        minute = now // 60 * 60
+        with self._lock:
+            minutes = self._minutes
+            if not minutes or minutes[-1][0] != minute:
+                minutes.append([minute, 0.0, 0.0])
+            minutes[-1][1] += cost
+            if endpoint == POLL_ENDPOINT:
+                minutes[-1][2] += cost
+            self._used += cost
+            self._expire(now)
+        self._update(now)
+
+    def exhausted(self, exhausted: bool = True) -> None:
+        """
+        Records that the API reported quotaExceeded (or, with False, that a
+        call succeeded again).
+        """
+        if not self.enabled or self._exhausted == exhausted:
+            return
+        self._exhausted = exhausted
+        if exhausted:
+            logger.error("The API quota is exhausted.")
+        self._update(self.clock())
+
+    def _expire(self, now: float) -> None:
+        # Called with the lock held
+        while self._minutes and self._minutes[0][0] <= now - DAY:
+            self._used -= self._minutes.popleft()[1]
+
+    def used(self) -> float:
+        """Units spent in the last 24 hours."""
+        with self._lock:
+            self._expire(self.clock())
+            return self._used
+
+    def remaining(self) -> float:
+        if self._exhausted:
+            return 0.0
+        return max(0.0, self.budget - self.used())
+
+    def _rates(self, now: float) -> List[float]:
+        """Units per second over the forecast window: [all calls, polls]."""
+        since = now - self.window
+        totals = [0.0, 0.0]
+        with self._lock:
+            for minute, units, poll_units in reversed(self._minutes):
+                if minute + 60 <= since:
+                    break
+                totals[0] += units
+                totals[1] += poll_units
+        # Early on, spread what was spent over the time actually elapsed
+        elapsed = max(60.0, min(self.window, now - self.started))
+        return [total / elapsed for total in totals]
+
+    def rate(self) -> float:
+        """Recent spending, in units per second."""
+        return self._rates(self.clock())[0]
+
+    def time_to_exhaustion(self) -> float:
+        """Seconds until the quota runs out at the recent rate (inf if idle)."""
+        rate = self.rate()
+        return self.remaining() / rate if rate > 0 else float("inf")
+
+    def _horizon(self, now: float) -> float:
+        # Past the planned end, budget for one more forecast window at a time
+        return max(self.planned_end - now, self.window)
+
+    def _update(self, now: float) -> None:
+        # Once degraded, stay so until the forecast has some slack, or the
+        # bot would flip back and forth as stretched polling brings it in line
+        slack = RECOVERY_SLACK if self.degraded else 1.0
+        degraded = self.enabled and (
+            self._exhausted or self.time_to_exhaustion() < self._horizon(now) * slack
+        )
+        if degraded == self.degraded:
+            return
+        self.degraded = degraded
+        if degraded:
+            logger.warning(
+                "API quota would run out in %.0f minutes, before the planned end "
+                "of the stream. Polling less often and pausing welcomes and "
+                "scheduled messages.",
+                self.time_to_exhaustion() / 60,
+            )
+        else:
+            logger.info("API quota is on track again. Resuming normal operation.")
+
+    def min_poll_interval(self, poller: Hashable) -> float:
+        """
+        Seconds each poller must wait between polls for polling to fit what is
+        left of the quota after everything else the bot spends, or 0 while
+        not degraded. Every poller that asked within the forecast window gets
+        an equal share.
+        """
+        if not self.enabled:
+            return 0.0
+        now = self.clock()
+        with self._lock:
+            pollers = self._pollers
+            pollers[poller] = now
+            pollers.move_to_end(poller)
+            while next(iter(pollers.values())) < now - self.window:
+                pollers.popitem(last=False)
+            active = len(pollers)
+        if not self.degraded:
+            return 0.0
+        total_rate, poll_rate = self._rates(now)
+        affordable = self.remaining() / self._horizon(now)
+        poll_budget = affordable - (total_rate - poll_rate)
+        if poll_budget <= 0:
+            return self.max_poll_interval
+        interval = QUOTA_COSTS[POLL_ENDPOINT] * active / poll_budget
+        return min(interval, self.max_poll_interval)
+
+    def snapshot(self) -> Dict[str, float]:
+        now = self.clock()
+        return {
+            "used": self.used(),
+            "remaining": self.remaining(),
+            "rate_per_hour": self.rate() * 3600,
+            "hours_to_exhaustion": self.time_to_exhaustion() / 3600,
+            "hours_left": max(0.0, self.planned_end - now) / 3600,
+            "degraded": float(self.degraded),
+        }
+
+
+QUOTA = QuotaMeter()
+
+
+def configure_quota(config: ModuleType) -> Optional[QuotaMeter]:
+    """Starts quota accounting if config.QUOTA_TRACKING is set."""
+    QUOTA.configure(config)
+    return QUOTA if QUOTA.enabled else None
@@ -0,0 +1,238 @@
+# replay.py
+"""
+Replays recorded or synthetic liveChatMessages().list pages through the same
+StreamSession, ChatPipeline and OutboundDispatcher that main() uses, against
+a FakeYouTube service, and reports throughput figures.
+
+Pages are stored as JSONL: one list response (or bare list of items) per line.
+
+Run from the project root:
+    python replay.py pages.jsonl
+    python replay.py --generate 50 --items 2000 --save pages.jsonl --memory
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from types import ModuleType
+from typing import Any, Dict, Iterable, List, Optional
+
+import command_handler
+import config as default_config
+from ban_store import BanStore
+from chat_pipeline import ChatPipeline
+from fake_youtube import FakeYouTube, make_chat_item
+from outbound import OutboundDispatcher
+from polling import LatencyStats
+from stream_session import StreamSession
+from youtube_api import send_chat_message
+
+Page = List[Dict[str, Any]]
+
+REPLAY_VIDEO_ID = "replay"
+REPLAY_CHAT_ID = "replay-chat"
+
+
+def load_pages(path: str) -> List[Page]:
+    """Reads pages from a JSONL file of list responses or item lists."""
+    pages: List[Page] = []
+    with open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            pages.append(record["items"] if isinstance(record, dict) else record)
+    return pages
+
+
+def save_pages(path: str, pages: Iterable[Page]) -> None:
+    """Writes pages as JSONL list responses, the format load_pages() reads."""
+    with open(path, "w") as f:
+        for items in pages:
+            f.write(json.dumps({"items": items}) + "\n")
+
+
+def generate_pages(
+    num_pages: int,
+    items_per_page: int,
+    num_users: int = 1000,
+    command_share: float = 0.2,
+    seed: int = 0,
+) -> List[Page]:
+    """
+    Generates synthetic pages: num_users chatters, command_share of whose
+    messages are commands from config.CHAT_COMMANDS or !ping.
+    """
+    rng = random.Random(seed)
+    commands = list(default_config.CHAT_COMMANDS) + ["!ping"]
+    published = time.time()
+    pages: List[Page] = []
+    for page_number in range(num_pages):
+        items: Page = []
+        for i in range(items_per_page):
+            user = rng.randrange(num_users)
+            if rng.random() < command_share:
+                text = rng.choice(commands)
+            else:
+                text = f"message {rng.randrange(1_000_000)}"
+            published += 0.001
+            items.append(
+                make_chat_item(
+                    f"msg-{page_number}-{i}",
+                    f"UC{user:06d}",
+                    f"User {user}",
+                    text,
+                    published,
+                )
+            )
+        pages.append(items)
+    return pages
+
+
+class ReplayResult:
+    """Figures collected by replay()."""
+
+    def __init__(
+        self,
+        pages: int,
+        messages: int,
+        elapsed: float,
+        latency: LatencyStats,
+        sends: int,
+        peak_memory: Optional[int],
+    ) -> None:
+        self.pages = pages
+        self.messages = messages
+        self.elapsed = elapsed
+        self.latency = latency
+        self.sends = sends
+        self.peak_memory = peak_memory
+
+    @property
+    def messages_per_second(self) -> float:
+        return self.messages / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def sends_per_page(self) -> float:
+        return self.sends / self.pages if self.pages else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        stats = self.latency.snapshot()
+        result = {
+            "pages": float(self.pages),
+            "messages": float(self.messages),
+            "messages_per_second": self.messages_per_second,
+            "handle_p50_us": stats["p50"] * 1e6,
+            "handle_p99_us": stats["p99"] * 1e6,
+            "sends_per_page": self.sends_per_page,
+        }
+        if self.peak_memory is not None:
+            result["peak_memory_kib"] = self.peak_memory / 1024
+        return result
+
+    def summary(self) -> str:
+        return "\n".join(
+            f"{key:22} {value:14.2f}" for key, value in self.as_dict().items()
+        )
+
+
+def replay(
+    pages: List[Page],
+    config: ModuleType = default_config,
+    poll_interval: float = 2.0,
+    trace_memory: bool = False,
+) -> ReplayResult:
+    """
+    Feeds pages through a StreamSession as fast as possible. The dispatcher
+    runs on a virtual clock that advances poll_interval seconds per page, so
+    send budgets behave as in a live stream without any sleeping.
+    """
+    if not command_handler.commands:
+        command_handler.load_commands()
+    command_handler.cooldowns.reset()
+
+    youtube = FakeYouTube(pages, live_chat_ids={REPLAY_VIDEO_ID: REPLAY_CHAT_ID})
+    virtual_now = [0.0]
+    dispatcher = OutboundDispatcher(
+        lambda text: send_chat_message(youtube, REPLAY_CHAT_ID, text),
+        config,
+        clock=lambda: virtual_now[0],
+    )
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        pipeline = ChatPipeline(
+            config,
+            youtube.channel_name,
+            ban_store=BanStore(os.path.join(tmpdir, "banned_users.json")),
+        )
+        # Synthetic and recorded timestamps are in the past: handle everything
+        pipeline.is_first_fetch = False
+        session = StreamSession(
+            youtube, REPLAY_VIDEO_ID, REPLAY_CHAT_ID, config, pipeline, dispatcher
+        )
+
+        latency = LatencyStats(max(1, sum(len(items) for items in pages)))
+        handle = pipeline.process_message
+
+        def timed_process_message(message: Any) -> Any:
+            started = time.perf_counter()
+            outgoing = handle(message)
+            latency.observe(time.perf_counter() - started)
+            return outgoing
+
+        pipeline.process_message = timed_process_message  # type: ignore[method-assign]
+
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        while session.poll() is not None:
+            virtual_now[0] += poll_interval
+            dispatcher.flush()
+        elapsed = time.perf_counter() - started
+        peak_memory = None
+        if trace_memory:
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    return ReplayResult(
+        session.stats["polls"],
+        session.stats["messages"],
+        elapsed,
+        latency,
+        len(youtube.sent),
+        peak_memory,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("pages", nargs="?", help="JSONL file of pages to replay")
+    parser.add_argument(
+        "--generate", type=int, metavar="PAGES", help="synthesize pages"
+    )
+    parser.add_argument("--items", type=int, default=1000, help="items per page")
+    parser.add_argument("--users", type=int, default=1000, help="distinct chatters")
+    parser.add_argument("--save", metavar="PATH", help="write the pages as JSONL")
+    parser.add_argument("--memory", action="store_true", help="trace peak memory")
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = load_pages(args.pages)
+    elif args.generate:
+        pages = generate_pages(args.generate, args.items, args.users)
+    else:
+        parser.error("pass a JSONL file or --generate")
+    if args.save:
+        save_pages(args.save, pages)
+
+    logging.basicConfig(level=logging.ERROR)
+    print(replay(pages, trace_memory=args.memory).summary())
+
+
+if __name__ == "__main__":
+    main()
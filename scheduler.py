@@ -0,0 +1,419 @@
+# scheduler.py
+"""
+Runs scheduled jobs (repeating chat messages, mostly) from a heap of
+deadlines.
+
+The driver sleeps until the earliest deadline or until the job set changes,
+so it never wakes up between deadlines. A job repeats on an interval or a
+cron expression, can be delayed by random jitter, and can be skipped when
+its condition (e.g. "chat was active recently") does not hold. Jobs may be
+tagged with a stream, so every stream's jobs can be replaced or removed
+together.
+"""
+
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from types import ModuleType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from config_watcher import freeze
+from outbound import OutboundMessage
+
+logger = logging.getLogger(__name__)
+
+
+class IntervalSchedule:
+    """Every seconds seconds."""
+
+    def __init__(self, seconds: float) -> None:
+        if seconds <= 0:
+            raise ValueError(f"interval must be positive, got {seconds}")
+        self.seconds = seconds
+
+    def next_after(self, t: float) -> float:
+        return t + self.seconds
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, IntervalSchedule) and other.seconds == self.seconds
+
+    def __repr__(self) -> str:
+        return f"IntervalSchedule({self.seconds})"
+
+
+# (name, lowest, highest) of the five cron fields
+_CRON_FIELDS = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    # 0 and 7 are both Sunday
+    ("weekday", 0, 7),
+)
+
+
+def _parse_cron_field(field: str, name: str, low: int, high: int) -> FrozenSet[int]:
+    values: Set[int] = set()
+    for part in field.split(","):
+        value_range, _, step_text = part.partition("/")
+        step = int(step_text) if step_text else 1
+        if value_range == "*":
+            start, end = low, high
+        elif "-" in value_range:
+            start_text, end_text = value_range.split("-", 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = int(value_range)
+            end = high if step_text else start
+        if step < 1 or not low <= start <= end <= high:
+            raise ValueError(f"bad cron {name} field: {field}")
+        values.update(range(start, end + 1, step))
+    if name == "weekday" and 7 in values:
+        values.discard(7)
+        values.add(0)
+    return frozenset(values)
+
+
+class CronSchedule:
+    """
+    A "minute hour day month weekday" cron expression in local time, with
+    *, lists, ranges and steps (e.g. "*/15 9-17 * * 1-5"). As in cron, when
+    both day and weekday are restricted, a time matching either one counts.
+    """
+
+    def __init__(self, expression: str) -> None:
+        fields = expression.split()
+        if len(fields) != len(_CRON_FIELDS):
+            raise ValueError(f"cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            _parse_cron_field(field, name, low, high)
+            for field, (name, low, high) in zip(fields, _CRON_FIELDS)
+        )
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+        # Reject an expression that never matches (e.g. "0 0 30 2 *") now,
+        # not when the scheduler first asks for its next run
+        self.next_after(time.time())
+
+    def _day_matches(self, dt: datetime) -> bool:
+        day = dt.day in self.days
+        # datetime counts weekdays from Monday, cron from Sunday
+        weekday = (dt.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, t: float) -> float:
+        dt = datetime.fromtimestamp(t).replace(second=0, microsecond=0)
+        dt += timedelta(minutes=1)
+        # Skips whole months, days and hours that cannot match, so this takes
+        # at most a few hundred steps even for a yearly schedule
+        limit = dt + timedelta(days=366 * 4)
+        while dt < limit:
+            if dt.month not in self.months:
+                month = dt.month % 12 + 1
+                dt = dt.replace(
+                    year=dt.year + (month == 1), month=month, day=1, hour=0, minute=0
+                )
+            elif not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+            elif dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt.timestamp()
+        raise ValueError(f"cron expression never matches: {self.expression!r}")
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, CronSchedule) and other.expression == self.expression
+
+    def __repr__(self) -> str:
+        return f"CronSchedule({self.expression!r})"
+
+
+Schedule = Union[IntervalSchedule, CronSchedule]
+
+
+class Job:
+    """A repeating action. spec identifies the job's settings across reloads."""
+
+    __slots__ = (
+        "name",
+        "schedule",
+        "action",
+        "jitter",
+        "condition",
+        "stream",
+        "spec",
+        "base",
+        "due",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        schedule: Schedule,
+        action: Callable[[], Any],
+        jitter: float = 0.0,
+        condition: Optional[Callable[[], bool]] = None,
+        stream: Optional[str] = None,
+        spec: Any = None,
+    ) -> None:
+        self.name = name
+        self.schedule = schedule
+        self.action = action
+        self.jitter = jitter
+        self.condition = condition
+        self.stream = stream
+        self.spec = spec
+        # The unjittered time of the current run, so jitter does not drift
+        self.base = 0.0
+        self.due = 0.0
+
+    @property
+    def key(self) -> Tuple[Optional[str], str]:
+        return (self.stream, self.name)
+
+    def plan(self, now: float, after: Optional[float] = None) -> None:
+        """Sets the next run to the first occurrence after `after` (or now)."""
+        base = self.schedule.next_after(now if after is None else after)
+        if base <= now:
+            base = self.schedule.next_after(now)
+        self.base = base
+        self.due = base + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def __repr__(self) -> str:
+        return f"Job({self.name!r}, {self.schedule!r}, stream={self.stream!r})"
+
+
+class Scheduler:
+    """
+    A heap of job deadlines. run_pending() runs whatever is due and returns
+    the time until the next deadline, so any loop can drive it; start() runs
+    it on its own thread. Changes to the job set call notify() so a sleeping
+    driver re-reads the next deadline.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        self.clock = clock
+        self._heap: List[Tuple[float, int, Job]] = []
+        self._jobs: Dict[Tuple[Optional[str], str], Job] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.notify: Callable[[], Any] = self._wakeup.set
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.due)
+
+    def _is_current(self, entry: Tuple[float, int, Job]) -> bool:
+        due, _, job = entry
+        return self._jobs.get(job.key) is job and due == job.due
+
+    def _push(self, job: Job) -> None:
+        heapq.heappush(self._heap, (job.due, next(self._counter), job))
+
+    def _compact(self) -> None:
+        # Removed and replaced jobs stay in the heap until popped; rebuild it
+        # once they outnumber the live ones
+        if len(self._heap) > 2 * len(self._jobs) + 16:
+            self._heap = [entry for entry in self._heap if self._is_current(entry)]
+            heapq.heapify(self._heap)
+
+    def add(self, job: Job) -> None:
+        """Adds a job, replacing any job with the same name and stream."""
+        self.replace([job], job.stream, keep_others=True)
+
+    def remove_stream(self, stream: Optional[str]) -> None:
+        """Removes every job tagged with stream."""
+        self.replace([], stream)
+
+    def replace(
+        self,
+        jobs: Iterable[Job],
+        stream: Optional[str] = None,
+        keep_others: bool = False,
+    ) -> None:
+        """
+        Makes jobs the stream's job set. A job whose spec is unchanged keeps
+        its next run time, so a config reload does not restart every timer.
+        """
+        now = self.clock()
+        with self._lock:
+            new = {job.key: job for job in jobs}
+            if not keep_others:
+                for key in [key for key in self._jobs if key[0] == stream]:
+                    if key not in new:
+                        del self._jobs[key]
+            for key, job in new.items():
+                old = self._jobs.get(key)
+                if old is not None and old.spec is not None and old.spec == job.spec:
+                    job.base, job.due = old.base, old.due
+                else:
+                    job.plan(now)
+                self._jobs[key] = job
+                self._push(job)
+            self._compact()
+        self.notify()
+
+    def time_until_due(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until the next job is due, or None if there are no jobs."""
+        with self._lock:
+            while self._heap and not self._is_current(self._heap[0]):
+                heapq.heappop(self._heap)
+            if not self._heap:
+                return None
+            due = self._heap[0][0]
+        return max(0.0, due - (self.clock() if now is None else now))
+
+    def run_pending(self, now: Optional[float] = None) -> Optional[float]:
+        """Runs every due job. Returns the seconds until the next one is due."""
+        now = self.clock() if now is None else now
+        while True:
+            with self._lock:
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                entry = heapq.heappop(self._heap)
+                if not self._is_current(entry):
+                    continue
+                job = entry[2]
+                job.plan(now, after=job.base)
+                self._push(job)
+            self._run(job)
+        return self.time_until_due(now)
+
+    def _run(self, job: Job) -> None:
+        try:
+            if job.condition is not None and not job.condition():
+                logger.debug("Skipping scheduled job %s: condition not met", job.name)
+                return
+            job.action()
+        except Exception:
+            # The job just runs again at its next occurrence
+            logger.exception("Error in scheduled job %s", job.name)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self._wakeup.clear()
+            delay = self.run_pending()
+            self._wakeup.wait(delay)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._loop, name="scheduler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def message_jobs(
+    config: ModuleType,
+    send: Callable[[OutboundMessage], Any],
+    last_activity: Callable[[], float],
+    stream: Optional[str] = None,
+) -> List[Job]:
+    """
+    Builds the scheduled-message jobs of a config: SCHEDULED_MESSAGES every
+    MESSAGE_INTERVAL_MINUTES, plus one job per SCHEDULED_JOBS entry.
+    """
+    specs: List[Mapping[str, Any]] = []
+    if config.SCHEDULED_MESSAGES and config.MESSAGE_INTERVAL_MINUTES > 0:
+        specs.append(
+            {
+                "name": "scheduled",
+                "messages": config.SCHEDULED_MESSAGES,
+                "interval_minutes": config.MESSAGE_INTERVAL_MINUTES,
+            }
+        )
+    specs.extend(config.SCHEDULED_JOBS)
+
+    jobs = []
+    for index, spec in enumerate(specs):
+        name = spec.get("name", f"job{index}")
+        messages = list(spec.get("messages", ()))
+        if not messages:
+            raise ValueError(f"scheduled job {name} has no messages")
+        if "cron" in spec:
+            schedule: Schedule = CronSchedule(spec["cron"])
+        elif "interval_minutes" in spec:
+            schedule = IntervalSchedule(spec["interval_minutes"] * 60)
+        else:
+            raise ValueError(f"scheduled job {name} needs cron or interval_minutes")
+        jobs.append(
+            Job(
+                name,
+                schedule,
+                _sender(name, messages, send, stream),
+                jitter=spec.get("jitter_seconds", 0),
+                condition=_active_within(
+                    spec.get("active_within_minutes", 0) * 60, last_activity
+                ),
+                stream=stream,
+                # Frozen, so the raw config and its reloaded snapshots compare equal
+                spec=freeze(dict(spec)),
+            )
+        )
+    return jobs
+
+
+def validate_message_jobs(config: ModuleType) -> None:
+    """Raises ValueError if config's scheduled jobs cannot be built."""
+    message_jobs(config, _discard, lambda: 0.0)
+
+
+def _discard(message: OutboundMessage) -> None:
+    pass
+
+
+def _sender(
+    name: str,
+    messages: List[str],
+    send: Callable[[OutboundMessage], Any],
+    stream: Optional[str],
+) -> Callable[[], None]:
+    def run() -> None:
+        message = random.choice(messages)
+        if stream is None:
+            logger.info("Sending scheduled message: %s", message)
+        else:
+            logger.info("Sending scheduled message to %s: %s", stream, message)
+        send(OutboundMessage.scheduled(message))
+
+    return run
+
+
+def _active_within(
+    seconds: float, last_activity: Callable[[], float]
+) -> Optional[Callable[[], bool]]:
+    if not seconds:
+        return None
+    return lambda: time.time() - last_activity() <= seconds
@@ -0,0 +1,249 @@
+# spam.py
+"""
+Flood and copy-paste spam detection.
+
+Both checks cost O(1) amortized time per message and use bounded memory:
+
+- Flood: each user keeps the times of their last SPAM_FLOOD_MAX_MESSAGES
+  messages. A message that would make more than that within
+  SPAM_FLOOD_WINDOW_SECONDS is flooding. At most USER_STATE_MAX_USERS users
+  are tracked, least recently active first out.
+- Copy-paste: every message of at least SPAM_DUPLICATE_MIN_LENGTH characters
+  gets a 64-bit SimHash of its normalized words. Case, punctuation and
+  stretched letters ("freeeee") do not change it, and small edits flip only
+  some of its bits. Recent fingerprints are indexed by band: a fingerprint is split
+  into SPAM_DUPLICATE_MAX_DISTANCE + 1 bands, and any fingerprint within
+  that many bits of another shares at least one band with it exactly, so
+  only the few entries in matching buckets are compared. A message is spam
+  once SPAM_DUPLICATE_MIN_USERS different users sent a near-duplicate within
+  SPAM_DUPLICATE_WINDOW_SECONDS.
+"""
+
+import re
+import sys
+from collections import OrderedDict, deque
+from functools import lru_cache
+from types import ModuleType
+from typing import Deque, Dict, List, Optional, Set
+
+from chat_message import ChatMessage
+from moderation import ModerationRule
+
+FLOOD = "flood"
+DUPLICATE = "duplicate"
+
+_WORD = re.compile(r"\w+")
+# "freeeee" and "free" are the same word to a spammer. Runs are cut to two
+# letters, not one, so that real double letters survive
+_REPEATS = re.compile(r"(.)\1{2,}")
+
+_MASK64 = (1 << 64) - 1
+# _SPREAD[b] places bit j of the byte b at bit 16 * j, so adding spread
+# hashes counts the set bits of every position in its own 16-bit lane
+_SPREAD = [sum(((byte >> j) & 1) << (16 * j) for j in range(8)) for byte in range(256)]
+_LANE_ONES = sum(1 << (16 * j) for j in range(64))
+_BITS_TO_DIGITS = bytes.maketrans(b"\x00\x01", b"01")
+
+
+def normalize(text: str) -> List[str]:
+    """Returns the case-folded words of text with stretched letters cut short."""
+    return _WORD.findall(_REPEATS.sub(r"\1\1", text.casefold()))
+
+
+@lru_cache(maxsize=4096)
+def simhash(text: str) -> int:
+    """
+    64-bit SimHash over the normalized words and word pairs of text. Cached,
+    since copy-paste spam repeats itself.
+    """
+    words = normalize(text)
+    if not words:
+        # Emoji or punctuation only: with no features every such text would
+        # hash to 0, so hash the whole text and only copies match
+        words = ["".join(_REPEATS.sub(r"\1\1", text.casefold()).split())]
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    spread = _SPREAD
+    counts = 0
+    for feature in features:
+        h = hash(feature) & _MASK64
+        counts += (
+            spread[h & 255]
+            | spread[(h >> 8) & 255] << 128
+            | spread[(h >> 16) & 255] << 256
+            | spread[(h >> 24) & 255] << 384
+            | spread[(h >> 32) & 255] << 512
+            | spread[(h >> 40) & 255] << 640
+            | spread[(h >> 48) & 255] << 768
+            | spread[h >> 56] << 896
+        )
+    # A bit is set when more than half the features set it: bias every lane
+    # so that exactly those lanes reach bit 15, then gather the bit 15s
+    counts += ((1 << 15) - len(features) // 2 - 1) * _LANE_ONES
+    lanes = ((counts >> 15) & _LANE_ONES).to_bytes(128, "little")[::2]
+    return int(lanes.translate(_BITS_TO_DIGITS)[::-1], 2)
+
+
+class FloodTracker:
+    """Per-user sliding windows of recent message times."""
+
+    def __init__(self, max_messages: int, window: float, max_users: int) -> None:
+        self.max_messages = max_messages
+        self.window = window
+        self.max_users = max_users
+        # Short lists rather than deques, which take 600 bytes each however
+        # few items they hold
+        self._times: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    def is_flooding(self, user_id: str, now: float) -> bool:
+        """Records a message and returns True if it exceeds the user's rate."""
+        times = self._times.get(user_id)
+        if times is None:
+            times = []
+            self._times[user_id] = times
+            if len(self._times) > self.max_users:
+                self._times.popitem(last=False)
+        else:
+            self._times.move_to_end(user_id)
+        flooding = len(times) >= self.max_messages and now - times[0] < self.window
+        times.append(now)
+        if len(times) > self.max_messages:
+            del times[0]
+        return flooding
+
+    def memory_usage(self) -> int:
+        return sys.getsizeof(self._times) + sum(
+            sys.getsizeof(k) + sys.getsizeof(v) + len(v) * sys.getsizeof(0.0)
+            for k, v in self._times.items()
+        )
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "author_id", "at")
+
+    def __init__(self, fingerprint: int, author_id: str, at: float) -> None:
+        self.fingerprint = fingerprint
+        self.author_id = author_id
+        self.at = at
+
+
+class NearDuplicateIndex:
+    """
+    Recent fingerprints, banded for near-duplicate lookups. Holds at most
+    max_size entries no older than window seconds, and at most bucket_size
+    per band value.
+    """
+
+    def __init__(
+        self,
+        max_distance: int,
+        window: float,
+        max_size: int,
+        bucket_size: int = 64,
+    ) -> None:
+        self.max_distance = max_distance
+        self.window = window
+        self.max_size = max_size
+        self.bucket_size = bucket_size
+        bands = max_distance + 1
+        width = 64 // bands
+        # (shift, mask) of each band; the last one takes the leftover bits
+        self._bands = [
+            (i * width, (1 << (width if i < bands - 1 else 64 - i * width)) - 1)
+            for i in range(bands)
+        ]
+        self._buckets: List[Dict[int, Deque[_Entry]]] = [{} for _ in range(bands)]
+        self._entries: Deque[_Entry] = deque()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict_oldest(self) -> None:
+        entry = self._entries.popleft()
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            key = (entry.fingerprint >> shift) & mask
+            bucket = buckets.get(key)
+            # Entries are added in time order, so the oldest is at the front
+            if bucket and bucket[0] is entry:
+                bucket.popleft()
+                if not bucket:
+                    del buckets[key]
+
+    def add(self, fingerprint: int, author_id: str, now: float, enough: int) -> int:
+        """
+        Indexes a message and returns how many other users sent a
+        near-duplicate within the window, counting up to enough.
+        """
+        while self._entries and (
+            now - self._entries[0].at > self.window
+            or len(self._entries) >= self.max_size
+        ):
+            self._evict_oldest()
+
+        authors: Set[str] = set()
+        entry = _Entry(fingerprint, author_id, now)
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            key = (fingerprint >> shift) & mask
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = deque(maxlen=self.bucket_size)
+                buckets[key] = bucket
+            elif len(authors) < enough:
+                for other in bucket:
+                    if (
+                        other.author_id != author_id
+                        and (other.fingerprint ^ fingerprint).bit_count()
+                        <= self.max_distance
+                    ):
+                        authors.add(other.author_id)
+            bucket.append(entry)
+        self._entries.append(entry)
+        return len(authors)
+
+
+class SpamDetector:
+    """Returns FLOOD or DUPLICATE for spam messages, per config."""
+
+    def __init__(self, config: ModuleType) -> None:
+        self.flood = FloodTracker(
+            config.SPAM_FLOOD_MAX_MESSAGES,
+            config.SPAM_FLOOD_WINDOW_SECONDS,
+            config.USER_STATE_MAX_USERS,
+        )
+        self.duplicates = NearDuplicateIndex(
+            config.SPAM_DUPLICATE_MAX_DISTANCE,
+            config.SPAM_DUPLICATE_WINDOW_SECONDS,
+            config.SPAM_INDEX_SIZE,
+        )
+        self.configure(config)
+
+    def configure(self, config: ModuleType) -> None:
+        """Applies the settings that can change while the bot runs."""
+        # Built first, so a bad action leaves every setting as it was
+        rule = ModerationRule(config.SPAM_ACTION, config.SPAM_TIMEOUT_SECONDS)
+        self.flood_enabled = config.SPAM_FLOOD_MAX_MESSAGES > 0
+        self.flood.window = config.SPAM_FLOOD_WINDOW_SECONDS
+        self.min_users = config.SPAM_DUPLICATE_MIN_USERS
+        self.min_length = config.SPAM_DUPLICATE_MIN_LENGTH
+        self.duplicates.window = config.SPAM_DUPLICATE_WINDOW_SECONDS
+        self.rule = rule
+
+    def check(self, message: ChatMessage, now: float) -> Optional[str]:
+        """Records the message and returns the kind of spam it is, if any."""
+        verdict = None
+        if self.flood_enabled and self.flood.is_flooding(message.author_id, now):
+            verdict = FLOOD
+        if self.min_users and len(message.text) >= self.min_length:
+            others = self.duplicates.add(
+                simhash(message.text), message.author_id, now, self.min_users - 1
+            )
+            if verdict is None and others >= self.min_users - 1:
+                verdict = DUPLICATE
+        return verdict
+
+    def memory_usage(self) -> int:
+        return self.flood.memory_usage() + len(self.duplicates) * sys.getsizeof(
+            _Entry(0, "", 0.0)
+        )
@@ -0,0 +1,107 @@
+# startup.py
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from file_utils import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+
+class StartupCache:
+    """
+    Remembers the bot's channel name and the live chat ID of each video
+    between runs, so a restart can poll without first waiting on
+    channels.list and videos.list.
+
+    Entries older than ttl seconds are ignored. A video's live chat ID does
+    not change while the stream is live, so a cached ID is checked by the
+    first poll itself and should be forgotten once that chat has ended. The
+    channel name is tied to the credentials rather than the stream, so
+    callers re-check it in the background.
+    """
+
+    def __init__(self, path: str, ttl: float) -> None:
+        self.path = path
+        self.ttl = ttl
+        self._data: Dict[str, Any] = {"channel_name": None, "live_chat_ids": {}}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                self._data.update(json.load(f))
+        except (json.JSONDecodeError, IOError) as e:
+            logger.error("Error loading startup cache %s: %s", self.path, e)
+
+    def _fresh(self, entry: Optional[Dict[str, Any]]) -> Optional[str]:
+        if not entry or time.time() - entry.get("cached_at", 0) > self.ttl:
+            return None
+        value = entry.get("value")
+        return str(value) if value else None
+
+    def channel_name(self) -> Optional[str]:
+        with self._lock:
+            return self._fresh(self._data["channel_name"])
+
+    def set_channel_name(self, name: str) -> None:
+        with self._lock:
+            self._data["channel_name"] = {"value": name, "cached_at": time.time()}
+        self.save()
+
+    def live_chat_id(self, video_id: str) -> Optional[str]:
+        with self._lock:
+            return self._fresh(self._data["live_chat_ids"].get(video_id))
+
+    def set_live_chat_id(self, video_id: str, live_chat_id: str) -> None:
+        with self._lock:
+            self._data["live_chat_ids"][video_id] = {
+                "value": live_chat_id,
+                "cached_at": time.time(),
+            }
+        self.save()
+
+    def forget_live_chat_id(self, video_id: str) -> None:
+        with self._lock:
+            if self._data["live_chat_ids"].pop(video_id, None) is None:
+                return
+        self.save()
+
+    def save(self) -> None:
+        with self._lock:
+            data = json.loads(json.dumps(self._data))
+        try:
+            atomic_write_json(self.path, data, fsync=False)
+        except OSError as e:
+            logger.error("Error saving startup cache %s: %s", self.path, e)
+
+
+class StartupTimer:
+    """Records how long each startup phase took, for a one-line breakdown."""
+
+    def __init__(self, started: float) -> None:
+        self.started = started
+        self._last = started
+        self.phases: List[Tuple[str, float, str]] = []
+
+    def mark(self, phase: str, note: str = "") -> None:
+        """Ends a phase that started at the previous mark."""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last, note))
+        self._last = now
+
+    def total(self) -> float:
+        return self._last - self.started
+
+    def summary(self) -> str:
+        parts = [
+            f"{phase} {seconds * 1000:.0f}ms" + (f" ({note})" if note else "")
+            for phase, seconds, note in self.phases
+        ]
+        return ", ".join(parts) + f"; total {self.total() * 1000:.0f}ms"
@@ -0,0 +1,136 @@
+# stream_session.py
+import logging
+import time
+from types import ModuleType
+from typing import Dict, Optional
+
+from googleapiclient.discovery import Resource
+
+from chat_pipeline import ChatPipeline
+from checkpoint import CheckpointStore
+from metrics import POLL_LAG
+from outbound import OutboundDispatcher, TokenBucket
+from polling import PollScheduler
+from youtube_api import (
+    LiveChatEndedError,
+    PageTokenInvalidError,
+    get_chat_messages,
+    send_chat_message,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class StreamSession:
+    """
+    Polling state for one live chat: page token, poll scheduling, the
+    pipeline that processes pages and the dispatcher that sends replies.
+    poll() performs one poll and returns how long to wait before the next.
+    """
+
+    def __init__(
+        self,
+        youtube: Resource,
+        video_id: str,
+        live_chat_id: str,
+        config: ModuleType,
+        pipeline: ChatPipeline,
+        dispatcher: Optional[OutboundDispatcher] = None,
+        checkpoints: Optional[CheckpointStore] = None,
+        send_bucket: Optional[TokenBucket] = None,
+    ) -> None:
+        self.youtube = youtube
+        self.video_id = video_id
+        self.live_chat_id = live_chat_id
+        self.config = config
+        self.pipeline = pipeline
+        self.dispatcher = dispatcher or OutboundDispatcher(
+            lambda text: send_chat_message(youtube, live_chat_id, text),
+            config,
+            bucket=send_bucket,
+        )
+        self.poller = PollScheduler(config)
+        self.next_page_token: Optional[str] = None
+        self.checkpoints = checkpoints
+        self.finished = False
+        self._poll_due_at: Optional[float] = None
+        self.stats: Dict[str, int] = {
+            "polls": 0,
+            "poll_errors": 0,
+            "messages": 0,
+            "responses": 0,
+        }
+        checkpoint = checkpoints.get(live_chat_id) if checkpoints else None
+        if checkpoint and checkpoint.get("page_token"):
+            logger.info("Resuming live chat %s from the last checkpoint.", live_chat_id)
+            self.next_page_token = checkpoint["page_token"]
+            pipeline.resume_after(checkpoint.get("last_message_id"))
+
+    def apply_config(self, config: ModuleType) -> None:
+        """Switches the session and its pipeline to a reloaded config snapshot."""
+        self.pipeline.apply_config(config)
+        self.dispatcher.config = config
+        self.config = config
+
+    def poll(self) -> Optional[float]:
+        """Fetches and processes one page. Returns the delay before the next poll,
+        or None once the chat has ended."""
+        poll_started = time.monotonic()
+        if self._poll_due_at is not None:
+            POLL_LAG.observe(max(0.0, poll_started - self._poll_due_at))
+        delay = self._poll(poll_started)
+        self._poll_due_at = None if delay is None else time.monotonic() + delay
+        return delay
+
+    def _poll(self, poll_started: float) -> Optional[float]:
+        try:
+            chat_response = get_chat_messages(
+                self.youtube, self.live_chat_id, self.next_page_token
+            )
+        except LiveChatEndedError as e:
+            logger.warning("The live chat for %s has ended (%s).", self.video_id, e)
+            self.finished = True
+            if self.checkpoints is not None:
+                self.checkpoints.clear(self.live_chat_id)
+            return None
+        except PageTokenInvalidError as e:
+            # The saved page token has expired: start over from the live edge.
+            # Other errors keep the token and retry, so the backlog is not lost.
+            logger.warning(
+                "Could not resume from the page token (%s). Starting fresh.", e
+            )
+            self.next_page_token = None
+            self.pipeline.start_fresh()
+            return 0.0
+
+        if not chat_response:
+            self.stats["poll_errors"] += 1
+            retry_delay = self.poller.on_error()
+            if retry_delay is None:
+                logger.warning(
+                    "Could not retrieve chat messages. The stream might have ended."
+                )
+                self.finished = True
+                return None
+            logger.warning(
+                "Could not retrieve chat messages. Retrying in %.1fs.", retry_delay
+            )
+            return retry_delay
+
+        items = chat_response.get("items", [])
+        self.stats["polls"] += 1
+        self.stats["messages"] += len(items)
+        for outgoing in self.pipeline.process_page(chat_response):
+            self.stats["responses"] += 1
+            self.dispatcher.submit(outgoing)
+
+        self.next_page_token = chat_response.get("nextPageToken")
+        if self.checkpoints is not None and items:
+            self.checkpoints.update(
+                self.live_chat_id, self.next_page_token, self.pipeline.last_message_id
+            )
+        return self.poller.next_delay(
+            chat_response.get("pollingIntervalMillis"),
+            time.monotonic() - poll_started,
+            len(items),
+        )
@@ -0,0 +1,86 @@
+# tests/test_async_engine.py
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import config
+import command_handler
+from async_engine import AsyncChatEngine
+from ban_store import BanStore
+from chat_pipeline import ChatPipeline
+from fake_youtube import FakeYouTube, make_chat_item
+from outbound import OutboundMessage
+
+
+class TestAsyncChatEngine(unittest.TestCase):
+
+    def setUp(self) -> None:
+        command_handler.load_commands()
+        command_handler.cooldowns.reset()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        ban_store = BanStore(os.path.join(self.tmpdir.name, "banned.json"))
+        self.pipeline = ChatPipeline(
+            config, "Bot Channel", ban_store=ban_store, startup_time=0
+        )
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    @patch.object(config, "WELCOME_COALESCE_WINDOW_SECONDS", 0)
+    def test_slow_sends_do_not_delay_polling(self) -> None:
+        """Tests that every page is fetched while the first send is still in flight."""
+        youtube = FakeYouTube(
+            pages=[
+                [
+                    make_chat_item("m1", "UC1", "Alice", "hi"),
+                    make_chat_item("m2", "UC2", "Bob", "hi"),
+                ],
+                [make_chat_item("m3", "UC3", "Carol", "hi")],
+            ],
+            insert_latency=0.1,
+        )
+        engine = AsyncChatEngine(youtube, "chat", self.pipeline, config)
+        asyncio.run(engine.run())
+
+        self.assertEqual(
+            youtube.sent,
+            [
+                config.WELCOME_MESSAGE.format(username=n)
+                for n in ("Alice", "Bob", "Carol")
+            ],
+        )
+        self.assertEqual(youtube.calls[:3], ["liveChatMessages.list"] * 3)
+
+    def test_outbound_queue_overflow_drops_messages(self) -> None:
+        """Tests that a full outbound queue drops messages instead of blocking."""
+
+        async def fill() -> AsyncChatEngine:
+            engine = AsyncChatEngine(FakeYouTube(), "chat", self.pipeline, config)
+            for i in range(config.ASYNC_OUTBOUND_QUEUE_SIZE + 1):
+                engine.enqueue_outbound(OutboundMessage.command(f"message {i}"))
+            return engine
+
+        engine = asyncio.run(fill())
+        self.assertEqual(engine.dropped_messages, 1)
+
+    def test_welcomes_are_coalesced(self) -> None:
+        """Tests that welcomes queued close together go out as one message."""
+        youtube = FakeYouTube(
+            pages=[
+                [
+                    make_chat_item("m1", "UC1", "Alice", "hi"),
+                    make_chat_item("m2", "UC2", "Bob", "hi"),
+                ],
+                [make_chat_item("m3", "UC3", "Carol", "hi")],
+            ]
+        )
+        asyncio.run(AsyncChatEngine(youtube, "chat", self.pipeline, config).run())
+        self.assertEqual(
+            youtube.sent, [config.WELCOME_MESSAGE.format(username="Alice, Bob e Carol")]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
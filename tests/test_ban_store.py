@@ -0,0 +1,71 @@
+# tests/test_ban_store.py
+import json
+import os
+import tempfile
+import unittest
+
+from ban_store import BanStore
+
+
+class TestBanStore(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "banned_users.json")
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_missing_file_is_empty(self) -> None:
+        """Tests that a missing ban file results in an empty ban list."""
+        store = BanStore(self.path)
+        self.assertNotIn("someone", store)
+        self.assertEqual(len(store), 0)
+
+    def test_add_and_remove_write_through(self) -> None:
+        """Tests that bans and unbans are persisted immediately."""
+        store = BanStore(self.path)
+        self.assertTrue(store.add("spammer"))
+        self.assertFalse(store.add("spammer"))
+        self.assertIn("spammer", store)
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), {"banned_users": ["spammer"]})
+
+        self.assertTrue(store.remove("spammer"))
+        self.assertFalse(store.remove("spammer"))
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), {"banned_users": []})
+
+    def test_maybe_reload_picks_up_external_edits(self) -> None:
+        """Tests that external edits are noticed once the reload interval passes."""
+        store = BanStore(self.path, reload_interval=10)
+        store.load()
+        with open(self.path, "w") as f:
+            json.dump({"banned_users": ["troll"]}, f)
+
+        # Within the interval the file is not even stat'ed
+        self.assertFalse(store.maybe_reload(now=0))
+        self.assertNotIn("troll", store)
+
+        self.assertTrue(store.maybe_reload(now=1e12))
+        self.assertIn("troll", store)
+
+    def test_own_writes_do_not_trigger_reload(self) -> None:
+        """Tests that the store does not reload a file it just wrote itself."""
+        store = BanStore(self.path, reload_interval=0)
+        store.add("spammer")
+        self.assertFalse(store.maybe_reload())
+
+    def test_corrupt_file_keeps_previous_list(self) -> None:
+        """Tests that a corrupt file does not silently unban everyone."""
+        store = BanStore(self.path, reload_interval=0)
+        store.add("spammer")
+        with open(self.path, "w") as f:
+            f.write("{not json")
+        os.utime(self.path, ns=(0, 0))
+        store.maybe_reload()
+        self.assertIn("spammer", store)
+
+
+if __name__ == "__main__":
+    unittest.main()
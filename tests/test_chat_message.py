@@ -0,0 +1,48 @@
+# tests/test_chat_message.py
+import unittest
+
+from chat_message import ChatMessage, parse_timestamp
+from fake_youtube import make_chat_item
+
+
+class TestParseTimestamp(unittest.TestCase):
+
+    def test_offset_and_zulu_agree(self) -> None:
+        """Tests that "+00:00" and "Z" suffixes parse to the same instant."""
+        self.assertEqual(
+            parse_timestamp("2024-05-01T12:34:56.789+00:00"),
+            parse_timestamp("2024-05-01T12:34:56.789Z"),
+        )
+        self.assertEqual(parse_timestamp("1970-01-01T00:00:10Z"), 10.0)
+
+    def test_non_utc_offset(self) -> None:
+        """Tests that other offsets are honoured."""
+        self.assertEqual(parse_timestamp("1970-01-01T01:00:10+01:00"), 10.0)
+
+
+class TestChatMessage(unittest.TestCase):
+
+    def test_from_item(self) -> None:
+        """Tests that a chat item is normalized into a ChatMessage."""
+        item = make_chat_item("m1", "UC1", "Alice", "  !hello  ", 1_700_000_000.5)
+        message = ChatMessage.from_item(item)
+        self.assertEqual(message.id, "m1")
+        self.assertEqual(message.author_id, "UC1")
+        self.assertEqual(message.author_name, "Alice")
+        self.assertEqual(message.text, "!hello")
+        self.assertEqual(message.published_ms, 1_700_000_000_500)
+        self.assertEqual(message.roles, frozenset())
+        self.assertFalse(hasattr(message, "__dict__"))
+
+    def test_roles(self) -> None:
+        """Tests that authorDetails flags become shared role sets."""
+        item = make_chat_item("m1", "UC1", "Mod", "hi")
+        item["authorDetails"].update(isChatModerator=True, isChatOwner=False)
+        first = ChatMessage.from_item(item)
+        second = ChatMessage.from_item(item)
+        self.assertEqual(first.roles, frozenset({"moderator"}))
+        self.assertIs(first.roles, second.roles)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+# tests/test_chat_pipeline.py
+import os
+import queue
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import config
+import command_handler
+from ban_store import BanStore
+from chat_pipeline import ChatPipeline
+from command_executor import CommandExecutor
+from fake_youtube import make_chat_item
+from outbound import OutboundMessage
+
+
+class TestChatPipeline(unittest.TestCase):
+
+    def setUp(self) -> None:
+        command_handler.load_commands()
+        command_handler.cooldowns.reset()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.ban_store = BanStore(os.path.join(self.tmpdir.name, "banned.json"))
+        self.pipeline = ChatPipeline(
+            config, "Bot Channel", ban_store=self.ban_store, startup_time=0
+        )
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_welcomes_new_user_once(self) -> None:
+        """Tests that a new user is welcomed and the welcome counts as their message."""
+        page = {"items": [make_chat_item("m1", "UC1", "Alice", "hello")]}
+        self.assertEqual(
+            self.pipeline.process_page(page),
+            [OutboundMessage.welcome("Alice")],
+        )
+        self.assertIn("UC1", self.pipeline.seen_users)
+
+    def test_skips_history_on_first_fetch(self) -> None:
+        """Tests that messages older than startup are ignored on the first page only."""
+        pipeline = ChatPipeline(
+            config, "Bot Channel", ban_store=self.ban_store, startup_time=2000.0
+        )
+        old = make_chat_item("m1", "UC1", "Alice", "hello", published_at=1000.0)
+        self.assertEqual(pipeline.process_page({"items": [old]}), [])
+        self.assertFalse(pipeline.is_first_fetch)
+        later = make_chat_item("m2", "UC1", "Alice", "hello", published_at=1000.0)
+        self.assertEqual(len(pipeline.process_page({"items": [later]})), 1)
+
+    def test_ignores_own_and_banned_messages(self) -> None:
+        """Tests that the bot's own messages and banned users are ignored."""
+        self.ban_store.add("Mallory")
+        page = {
+            "items": [
+                make_chat_item("m1", "UCbot", "Bot Channel", "!link"),
+                make_chat_item("m2", "UC2", "Mallory", "!link"),
+            ]
+        }
+        self.assertEqual(self.pipeline.process_page(page), [])
+
+    def test_user_cooldown_and_commands(self) -> None:
+        """Tests that commands are answered and per-user cooldown is enforced."""
+        self.pipeline.seen_users.add("UC1")
+        page = {
+            "items": [
+                make_chat_item("m1", "UC1", "Alice", "!link"),
+                make_chat_item("m2", "UC1", "Alice", "!discord"),
+            ]
+        }
+        self.assertEqual(
+            self.pipeline.process_page(page),
+            [OutboundMessage.command(config.CHAT_COMMANDS["!link"])],
+        )
+
+    def test_commands_run_on_executor(self) -> None:
+        """Tests that with an executor, command responses arrive through respond()."""
+        responses: "queue.Queue[OutboundMessage]" = queue.Queue()
+        executor = CommandExecutor(config)
+        self.pipeline.executor = executor
+        self.pipeline.respond = responses.put
+        self.pipeline.seen_users.add("UC1")
+        try:
+            page = {"items": [make_chat_item("m1", "UC1", "Alice", "!link")]}
+            self.assertEqual(self.pipeline.process_page(page), [])
+            self.assertEqual(
+                responses.get(timeout=5),
+                OutboundMessage.command(config.CHAT_COMMANDS["!link"]),
+            )
+        finally:
+            executor.shutdown(wait=True)
+
+    @patch.object(config, "COMMAND_ALIASES", {"!canal": "!link"})
+    def test_executor_gets_resolved_commands_only(self) -> None:
+        """Tests that aliases reach the executor as their command and junk never does."""
+        executor = MagicMock(spec=CommandExecutor)
+        self.pipeline.executor = executor
+        items = [make_chat_item("m0", "UC0", "Alice", "!canal")]
+        for i in range(1, 50):
+            self.pipeline.seen_users.add(f"UC{i}")
+            items.append(make_chat_item(f"m{i}", f"UC{i}", "Bob", f"!junk{i}"))
+        self.pipeline.seen_users.add("UC0")
+        self.pipeline.process_page({"items": items})
+        self.assertEqual(
+            [call.args[:2] for call in executor.submit.call_args_list],
+            [("UC0", "!link")],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
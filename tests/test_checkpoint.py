@@ -0,0 +1,142 @@
+# tests/test_checkpoint.py
+import json
+import os
+import tempfile
+import unittest
+from typing import Any, Dict, List, Optional, Tuple
+from unittest.mock import patch
+
+import config
+import command_handler
+from ban_store import BanStore
+from chat_pipeline import ChatPipeline
+from checkpoint import CheckpointStore
+from fake_youtube import FakeYouTube, make_chat_item, make_http_error
+from stream_session import StreamSession
+
+
+class TestCheckpointStore(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "checkpoint.json")
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_round_trip(self) -> None:
+        """Tests that progress written by one store is read by the next."""
+        store = CheckpointStore(self.path)
+        store.update("chat1", "token5", "m42")
+        store.close()
+
+        self.assertEqual(
+            CheckpointStore(self.path).get("chat1"),
+            {"page_token": "token5", "last_message_id": "m42"},
+        )
+        self.assertIsNone(CheckpointStore(self.path).get("chat2"))
+
+    def test_clear(self) -> None:
+        """Tests that an ended chat is removed from the checkpoint file."""
+        store = CheckpointStore(self.path)
+        store.update("chat1", "token5", "m42")
+        store.clear("chat1")
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), {"chats": {}})
+
+    def test_corrupt_file_is_ignored(self) -> None:
+        """Tests that a corrupt checkpoint starts fresh instead of crashing."""
+        with open(self.path, "w") as f:
+            f.write("{not json")
+        self.assertIsNone(CheckpointStore(self.path).get("chat1"))
+
+
+class TestResume(unittest.TestCase):
+
+    def setUp(self) -> None:
+        command_handler.load_commands()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.checkpoints = CheckpointStore(
+            os.path.join(self.tmpdir.name, "checkpoint.json")
+        )
+        self.ban_store = BanStore(os.path.join(self.tmpdir.name, "banned.json"))
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    @patch.object(config, "WELCOME_COALESCE_WINDOW_SECONDS", 0)
+    def test_session_resumes_without_reprocessing(self) -> None:
+        """Tests that a restart resumes from the token and skips handled messages."""
+        self.checkpoints.update("chat", "token7", "m1")
+        youtube = FakeYouTube(
+            pages=[
+                [
+                    # Sent before the bot restarted; m1 was already handled
+                    make_chat_item("m1", "UC1", "Alice", "hi", published_at=1.0),
+                    make_chat_item("m2", "UC2", "Bob", "hi", published_at=2.0),
+                ]
+            ]
+        )
+        pipeline = ChatPipeline(config, "Bot Channel", ban_store=self.ban_store)
+        session = StreamSession(
+            youtube, "video", "chat", config, pipeline, checkpoints=self.checkpoints
+        )
+        self.assertEqual(session.next_page_token, "token7")
+
+        session.poll()
+        session.dispatcher.flush()
+        self.assertEqual(youtube.sent, [config.WELCOME_MESSAGE.format(username="Bob")])
+        checkpoint = self.checkpoints.get("chat")
+        assert checkpoint is not None
+        self.assertEqual(checkpoint["last_message_id"], "m2")
+        self.assertEqual(checkpoint["page_token"], session.next_page_token)
+
+        # The chat has ended: its checkpoint is no longer needed
+        self.assertIsNone(session.poll())
+        self.assertIsNone(self.checkpoints.get("chat"))
+
+    def resume_through_error(
+        self, reason: str
+    ) -> Tuple[List[Optional[str]], ChatPipeline]:
+        """
+        Fails the first poll after a resume with reason, then serves a page.
+        Returns the page tokens polled and the pipeline.
+        """
+        self.checkpoints.update("chat", "token7", "m1")
+        youtube = FakeYouTube(
+            pages=[[make_chat_item("m2", "UC2", "Bob", "hi", published_at=2.0)]]
+        )
+        tokens: List[Optional[str]] = []
+        list_messages = youtube._list_messages
+
+        def fail_once(chat_id: str, page_token: Optional[str]) -> Dict[str, Any]:
+            tokens.append(page_token)
+            if len(tokens) == 1:
+                raise make_http_error(400 if "Token" in reason else 500, reason)
+            return list_messages(chat_id, page_token)
+
+        pipeline = ChatPipeline(config, "Bot Channel", ban_store=self.ban_store)
+        session = StreamSession(
+            youtube, "video", "chat", config, pipeline, checkpoints=self.checkpoints
+        )
+        with patch.object(youtube, "_list_messages", side_effect=fail_once):
+            with self.assertLogs(level="WARNING"):
+                self.assertIsNotNone(session.poll())
+            session.poll()
+        return tokens, pipeline
+
+    def test_transient_error_keeps_the_checkpoint(self) -> None:
+        """Tests that a server error while resuming retries the saved token."""
+        tokens, pipeline = self.resume_through_error("backendError")
+        self.assertEqual(tokens, ["token7", "token7"])
+        self.assertFalse(pipeline.is_first_fetch)
+
+    def test_invalid_token_starts_fresh(self) -> None:
+        """Tests that a rejected page token falls back to a fresh start."""
+        tokens, pipeline = self.resume_through_error("pageTokenInvalid")
+        self.assertEqual(tokens, ["token7", None])
+        self.assertIsNone(pipeline._resume_after)
+
+
+if __name__ == "__main__":
+    unittest.main()
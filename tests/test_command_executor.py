@@ -0,0 +1,93 @@
+# tests/test_command_executor.py
+import threading
+import time
+import unittest
+from typing import Callable, List, Optional
+from unittest.mock import patch
+
+import config
+from command_executor import CommandExecutor
+
+
+class TestCommandExecutor(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.executor = CommandExecutor(config)
+        self.results: List[Optional[str]] = []
+        self.done = threading.Semaphore(0)
+
+    def tearDown(self) -> None:
+        self.executor.shutdown(wait=True)
+
+    def record(self, response: Optional[str]) -> None:
+        self.results.append(response)
+        self.done.release()
+
+    def wait_for(self, count: int) -> None:
+        for _ in range(count):
+            self.assertTrue(self.done.acquire(timeout=5))
+
+    @staticmethod
+    def sleeper(seconds: float, response: str) -> Callable[[], str]:
+        def run() -> str:
+            time.sleep(seconds)
+            return response
+
+        return run
+
+    def test_responses_keep_per_user_order(self) -> None:
+        """Tests that a user's commands finish in order while others run in parallel."""
+        self.executor.submit(
+            "alice", "!slow", self.sleeper(0.2, "alice 1"), self.record
+        )
+        self.executor.submit("alice", "!fast", self.sleeper(0, "alice 2"), self.record)
+        self.executor.submit("bob", "!fast", self.sleeper(0, "bob"), self.record)
+        self.wait_for(3)
+        self.assertEqual(self.results, ["bob", "alice 1", "alice 2"])
+
+    @patch.object(config, "COMMAND_TIMEOUTS", {"!hang": 0.05})
+    def test_timed_out_command_is_abandoned(self) -> None:
+        """Tests that a hung command's result is dropped and the user can continue."""
+        self.executor.submit("alice", "!hang", self.sleeper(0.5, "late"), self.record)
+        self.executor.submit("alice", "!fast", self.sleeper(0, "next"), self.record)
+        self.wait_for(1)
+        self.assertEqual(self.results, ["next"])
+        self.assertEqual(self.executor.stats()["!hang"]["timeouts"], 1)
+
+    @patch.object(config, "COMMAND_CONCURRENCY_LIMITS", {"!reload": 1})
+    def test_concurrency_limit(self) -> None:
+        """Tests that a command never runs more often at once than its limit."""
+        running = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def reload() -> str:
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.02)
+            with lock:
+                running -= 1
+            return "reloaded"
+
+        for user in ("alice", "bob", "carol"):
+            self.executor.submit(user, "!reload", reload, self.record)
+        self.wait_for(3)
+        self.assertEqual(peak, 1)
+        self.assertEqual(self.executor.queue_depth(), 0)
+
+    def test_failing_command(self) -> None:
+        """Tests that an exception in a command is counted and yields no response."""
+
+        def fail() -> str:
+            raise RuntimeError("boom")
+
+        self.executor.submit("alice", "!fail", fail, self.record)
+        self.wait_for(1)
+        self.assertEqual(self.results, [None])
+        self.assertEqual(self.executor.stats()["!fail"]["errors"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
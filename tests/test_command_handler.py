@@ -8,6 +8,8 @@ from command_handler import (
     load_command,
     unload_command,
     reload_command,
+    parse_command,
+    get_dispatch_table,
 )
 
 
@@ -89,6 +91,47 @@ class TestCommandHandler(unittest.TestCase):
         result = load_command("nonexistent")
         self.assertFalse(result)
 
+    @patch("command_handler.commands")
+    def test_handle_command_rejects_plain_chat(self, mock_commands: MagicMock) -> None:
+        """Tests that messages without the command prefix never reach the registry."""
+        result = handle_command("hello", MagicMock(), "user_id", "hello there")
+        self.assertIsNone(result)
+        mock_commands.__contains__.assert_not_called()
+
+    @patch("command_handler.time.time")
+    def test_handle_command_alias(self, mock_time: MagicMock) -> None:
+        """Tests that aliases resolve to the command they point to."""
+        mock_time.return_value = 1000.0
+        mock_command_func = MagicMock(return_value="link response")
+        mock_config = MagicMock()
+        mock_config.MODERATORS = []
+        mock_config.COMMAND_PERMISSIONS = {}
+        mock_config.COMMAND_ALIASES = {"!canal": "!link"}
+        mock_config.GLOBAL_COMMAND_COOLDOWN_SECONDS = 0
+
+        with patch.dict("command_handler.commands", {"!link": mock_command_func}):
+            result = handle_command("!canal", mock_config, "user_id", "!canal")
+        self.assertEqual(result, "link response")
+        mock_command_func.assert_called_once_with(mock_config, "!canal")
+
+    def test_dispatch_table_rebuilt_on_config_change(self) -> None:
+        """Tests that the permission table is cached and rebuilt when moderators change."""
+        mock_config = MagicMock()
+        mock_config.MODERATORS = ["mod1"]
+        mock_config.COMMAND_PERMISSIONS = {"!ban": ["moderator"]}
+        table = get_dispatch_table(mock_config)
+        self.assertIs(get_dispatch_table(mock_config), table)
+        self.assertEqual(table.allowed_users["!ban"], frozenset({"mod1"}))
+
+        mock_config.MODERATORS = ["mod2"]
+        self.assertTrue(has_permission("mod2", "!ban", mock_config))
+        self.assertFalse(has_permission("mod1", "!ban", mock_config))
+
+    def test_parse_command(self) -> None:
+        """Tests splitting a message into command name and arguments."""
+        self.assertEqual(parse_command("!ban  someone "), ("!ban", "someone"))
+        self.assertEqual(parse_command("!link"), ("!link", ""))
+
 
 if __name__ == "__main__":
     unittest.main()
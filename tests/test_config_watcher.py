@@ -0,0 +1,148 @@
+# tests/test_config_watcher.py
+import importlib.util
+import os
+import tempfile
+import unittest
+from types import ModuleType
+from typing import List
+
+from command_handler import has_permission
+from config_watcher import ConfigSnapshot, ConfigWatcher
+from moderation import validate_moderation
+
+CONFIG_SOURCE = """
+MODERATORS = ["mod1"]
+COMMAND_PERMISSIONS = {"!ban": ["moderator"]}
+SCHEDULED_MESSAGES = ["Hello"]
+USER_MESSAGE_COOLDOWN_SECONDS = 5
+VIDEO_ID = "video1"
+"""
+
+
+class TestConfigWatcher(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "config.py")
+        self.write(CONFIG_SOURCE)
+        spec = importlib.util.spec_from_file_location("config", self.path)
+        assert spec is not None and spec.loader is not None
+        self.module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.module)
+        self.watcher = ConfigWatcher(self.module, reload_interval=0.01)
+        self.published: List[ModuleType] = []
+        self.watcher.subscribe(self.published.append)
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def write(self, source: str) -> None:
+        with open(self.path, "w") as f:
+            f.write(source)
+        # Make sure the change is visible even on coarse mtime clocks
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def test_reloads_changed_settings(self) -> None:
+        """Tests that a changed file is published as a new frozen snapshot."""
+        self.assertFalse(self.watcher.check())
+        self.write(CONFIG_SOURCE.replace('["mod1"]', '["mod1", "mod2"]'))
+
+        self.assertTrue(self.watcher.check())
+
+        snapshot = self.watcher.snapshot
+        self.assertEqual(self.published, [snapshot])
+        self.assertEqual(snapshot.MODERATORS, ("mod1", "mod2"))
+        self.assertEqual(snapshot.SCHEDULED_MESSAGES, ("Hello",))
+        with self.assertRaises(AttributeError):
+            snapshot.MODERATORS = []
+        with self.assertRaises(TypeError):
+            snapshot.COMMAND_PERMISSIONS["!ban"] = []
+
+    def test_permissions_follow_the_snapshot(self) -> None:
+        """Tests that the permission table is rebuilt for a reloaded config."""
+        self.assertFalse(has_permission("mod2", "!ban", self.watcher.snapshot))
+        self.write(CONFIG_SOURCE.replace('["mod1"]', '["mod1", "mod2"]'))
+        self.watcher.check()
+        self.assertTrue(has_permission("mod2", "!ban", self.watcher.snapshot))
+
+    def test_invalid_files_are_ignored(self) -> None:
+        """Tests that broken, incomplete or mistyped configs are not published."""
+        previous = self.watcher.snapshot
+        for source in (
+            "MODERATORS = [",
+            CONFIG_SOURCE.replace('VIDEO_ID = "video1"', ""),
+            CONFIG_SOURCE.replace('["mod1"]', '"mod1"'),
+        ):
+            self.write(source)
+            with self.assertLogs("config_watcher", level="ERROR"):
+                self.assertFalse(self.watcher.check())
+        self.assertIs(self.watcher.snapshot, previous)
+        self.assertEqual(self.published, [])
+
+    def test_validators_reject_reloads(self) -> None:
+        """Tests that a reload a validator rejects is never published."""
+        previous = self.watcher.snapshot
+
+        def no_empty_moderators(snapshot: ModuleType) -> None:
+            if not snapshot.MODERATORS:
+                raise ValueError("MODERATORS is empty")
+
+        self.watcher.add_validator(no_empty_moderators)
+        self.write(CONFIG_SOURCE.replace('["mod1"]', "[]"))
+        with self.assertLogs("config_watcher", level="ERROR"):
+            self.assertFalse(self.watcher.check())
+        self.assertIs(self.watcher.snapshot, previous)
+        self.assertEqual(self.published, [])
+
+    def test_failed_apply_keeps_the_snapshot(self) -> None:
+        """Tests that a reload a subscriber cannot apply is not kept."""
+        previous = self.watcher.snapshot
+
+        def fail(snapshot: ModuleType) -> None:
+            raise ValueError("cannot apply")
+
+        self.watcher.subscribe(fail)
+        self.write(CONFIG_SOURCE.replace('["mod1"]', '["mod2"]'))
+        with self.assertLogs("config_watcher", level="ERROR"):
+            self.assertFalse(self.watcher.check())
+        self.assertIs(self.watcher.snapshot, previous)
+
+    def test_moderation_rules_are_validated(self) -> None:
+        """Tests that unusable moderation and spam settings are rejected."""
+        self.watcher.add_validator(validate_moderation)
+        moderation = (
+            'SPAM_ACTION = "timeout"\nSPAM_TIMEOUT_SECONDS = 0\nMODERATION_RULES = []\n',
+            'SPAM_ACTION = "warn"\nSPAM_TIMEOUT_SECONDS = 0\n'
+            'MODERATION_RULES = [{"phrases": ["spam"], "action": "kick"}]\n',
+        )
+        for source in moderation:
+            self.write(CONFIG_SOURCE + source)
+            with self.assertLogs("config_watcher", level="ERROR"):
+                self.assertFalse(self.watcher.check())
+        self.assertEqual(self.published, [])
+
+    def test_restart_only_settings_are_kept(self) -> None:
+        """Tests that settings read at startup keep their value until a restart."""
+        self.write(
+            CONFIG_SOURCE.replace('"video1"', '"video2"').replace(
+                "COOLDOWN_SECONDS = 5", "COOLDOWN_SECONDS = 7.5"
+            )
+        )
+        with self.assertLogs("config_watcher", level="WARNING") as logs:
+            self.assertTrue(self.watcher.check())
+        self.assertIn("VIDEO_ID", "\n".join(logs.output))
+        self.assertEqual(self.watcher.snapshot.VIDEO_ID, "video1")
+        self.assertEqual(self.watcher.snapshot.USER_MESSAGE_COOLDOWN_SECONDS, 7.5)
+
+    def test_snapshot_is_a_config_module(self) -> None:
+        """Tests that the initial snapshot copies the module's settings only."""
+        snapshot = self.watcher.snapshot
+        self.assertIsInstance(snapshot, ConfigSnapshot)
+        self.assertEqual(snapshot.__name__, "config")
+        self.assertEqual(snapshot.VIDEO_ID, "video1")
+        self.assertFalse(hasattr(snapshot, "__file__"))
+
+
+if __name__ == "__main__":
+    unittest.main()
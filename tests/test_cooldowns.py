@@ -0,0 +1,152 @@
+# tests/test_cooldowns.py
+import threading
+import unittest
+from types import ModuleType
+from typing import Any, Dict, List, Optional
+from unittest.mock import MagicMock, patch
+
+import config
+import command_handler
+from command_handler import handle_command, load_commands
+from cooldowns import CooldownEngine, CooldownLimits
+from multi_stream import stream_config
+
+
+def make_config(
+    cooldowns: Dict[str, Dict[str, float]], global_seconds: float = 0
+) -> ModuleType:
+    module = ModuleType("config")
+    module.GLOBAL_COMMAND_COOLDOWN_SECONDS = global_seconds  # type: ignore[attr-defined]
+    module.COMMAND_COOLDOWNS = cooldowns  # type: ignore[attr-defined]
+    return module
+
+
+class TestCooldownEngine(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.engine = CooldownEngine()
+
+    def acquire(
+        self, limits: CooldownLimits, user: str, command: str, now: float
+    ) -> Optional[str]:
+        return self.engine.try_acquire(limits, user, command, now)
+
+    def test_global_limit_defaults_to_one_command_per_cooldown(self) -> None:
+        """Tests that GLOBAL_COMMAND_COOLDOWN_SECONDS alone keeps its old meaning."""
+        limits = CooldownLimits(make_config({}, global_seconds=2))
+        self.assertIsNone(self.acquire(limits, "u1", "!link", 1000))
+        self.assertEqual(self.acquire(limits, "u2", "!ban", 1001.9), "global")
+        self.assertIsNone(self.acquire(limits, "u2", "!ban", 1002))
+
+    def test_burst(self) -> None:
+        """Tests that a bucket allows burst uses at once, then refills steadily."""
+        limits = CooldownLimits(make_config({"global": {"seconds": 10, "burst": 3}}))
+        results = [self.acquire(limits, f"u{i}", "!link", 0) for i in range(4)]
+        self.assertEqual(results, [None, None, None, "global"])
+        self.assertEqual(self.acquire(limits, "u5", "!link", 9), "global")
+        self.assertIsNone(self.acquire(limits, "u5", "!link", 10))
+
+    def test_levels_are_independent(self) -> None:
+        """Tests that one command or user cooling down does not block others."""
+        limits = CooldownLimits(
+            make_config(
+                {
+                    "user": {"seconds": 60, "burst": 2},
+                    "!link": {"seconds": 30, "user_seconds": 120},
+                }
+            )
+        )
+        self.assertIsNone(self.acquire(limits, "u1", "!link", 0))
+        self.assertEqual(self.acquire(limits, "u2", "!link", 1), "command")
+        self.assertIsNone(self.acquire(limits, "u2", "!discord", 1))
+        self.assertIsNone(self.acquire(limits, "u1", "!discord", 2))
+        self.assertEqual(self.acquire(limits, "u1", "!discord", 3), "user")
+        self.assertEqual(self.acquire(limits, "u1", "!link", 61), "user_command")
+
+    def test_streams_are_independent(self) -> None:
+        """Tests that a command in one stream does not block another stream."""
+        limits = CooldownLimits(make_config({"user": {"seconds": 60}}, 2))
+        self.assertIsNone(self.engine.try_acquire(limits, "u1", "!link", 0, "v1"))
+        self.assertEqual(
+            self.engine.try_acquire(limits, "u2", "!link", 1, "v1"), "global"
+        )
+        self.assertIsNone(self.engine.try_acquire(limits, "u1", "!link", 1, "v2"))
+
+    def test_rejected_commands_take_no_tokens(self) -> None:
+        """Tests that a command blocked at one level is not charged at the others."""
+        limits = CooldownLimits(
+            make_config(
+                {"global": {"seconds": 10}, "user": {"seconds": 10, "burst": 5}}
+            )
+        )
+        self.assertIsNone(self.acquire(limits, "u1", "!link", 0))
+        for t in range(1, 5):
+            self.assertEqual(self.acquire(limits, "u1", "!link", t), "global")
+        self.assertIsNone(self.acquire(limits, "u1", "!link", 10))
+
+    def test_full_buckets_expire(self) -> None:
+        """Tests that users are only stored while they are cooling down."""
+        limits = CooldownLimits(make_config({"user": {"seconds": 5}}))
+        for i in range(100):
+            self.acquire(limits, f"u{i}", "!link", i)
+        self.assertLessEqual(len(self.engine), 6)
+
+    def test_thread_safe(self) -> None:
+        """Tests that concurrent callers never get more than the burst."""
+        limits = CooldownLimits(make_config({"global": {"seconds": 60, "burst": 10}}))
+        allowed: List[Optional[str]] = []
+
+        def worker() -> None:
+            for _ in range(100):
+                result = self.acquire(limits, "u1", "!link", 0)
+                if result is None:
+                    allowed.append(result)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(allowed), 10)
+
+
+class TestHandleCommandCooldowns(unittest.TestCase):
+
+    def setUp(self) -> None:
+        load_commands()
+        command_handler.cooldowns.reset()
+
+    @patch("command_handler.time.time", return_value=1000.0)
+    def test_per_command_cooldown_does_not_block_other_commands(
+        self, mock_time: MagicMock
+    ) -> None:
+        """Tests that !link cooling down leaves !discord available."""
+        cooldowns: Dict[str, Any] = {"global": {"seconds": 0}, "!link": {"seconds": 30}}
+        with patch.object(config, "COMMAND_COOLDOWNS", cooldowns):
+            self.assertIsNotNone(handle_command("!link", config, "u1", "!link"))
+            self.assertIsNone(handle_command("!link", config, "u2", "!link"))
+            self.assertIsNotNone(handle_command("!discord", config, "u2", "!discord"))
+
+    @patch("command_handler.time.time", return_value=1000.0)
+    def test_streams_cool_down_separately(self, mock_time: MagicMock) -> None:
+        """Tests that a command in one stream's chat leaves other chats alone."""
+        first = stream_config(config, "v1", {})
+        second = stream_config(config, "v2", {})
+        self.assertIsNotNone(handle_command("!link", first, "u1", "!link"))
+        self.assertIsNone(handle_command("!link", first, "u2", "!link"))
+        self.assertIsNotNone(handle_command("!link", second, "u2", "!link"))
+
+    @patch("command_handler.time.time", return_value=1000.0)
+    def test_moderators_bypass_cooldowns(self, mock_time: MagicMock) -> None:
+        """Tests that MODERATORS and chat moderators are never on cooldown."""
+        with patch.object(config, "MODERATORS", ["mod1"]):
+            self.assertIsNotNone(handle_command("!link", config, "u1", "!link"))
+            self.assertIsNone(handle_command("!link", config, "u2", "!link"))
+            self.assertIsNotNone(handle_command("!link", config, "mod1", "!link"))
+            self.assertIsNotNone(
+                handle_command("!link", config, "u3", "!link", frozenset({"moderator"}))
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
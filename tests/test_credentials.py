@@ -0,0 +1,141 @@
+# tests/test_credentials.py
+import datetime
+import os
+import pickle
+import stat
+import tempfile
+import threading
+import time
+import unittest
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+from google.oauth2.credentials import Credentials
+
+from credentials import CredentialRefresher, CredentialStore, SharedCredentials
+
+SCOPES = ["https://www.googleapis.com/auth/youtube.force-ssl"]
+
+
+def make_credentials(token: str, expires_in: float) -> Credentials:
+    return Credentials(
+        token=token,
+        refresh_token="refresh",
+        token_uri="https://oauth2.googleapis.com/token",
+        client_id="client",
+        client_secret="secret",
+        scopes=SCOPES,
+        expiry=datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        + datetime.timedelta(seconds=expires_in),
+    )
+
+
+class TestCredentialStore(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "token.json")
+        self.store = CredentialStore(self.path, SCOPES)
+        self.refreshes = 0
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def fake_refresh(self, credentials: Credentials, request: Any) -> None:
+        time.sleep(0.01)
+        self.refreshes += 1
+        credentials.token = f"refreshed-{self.refreshes}"
+        credentials.expiry = make_credentials("", 3600).expiry
+
+    def test_save_and_load(self) -> None:
+        """Tests that credentials round-trip through an owner-only JSON file."""
+        self.store.save(make_credentials("token1", 3600))
+        loaded = CredentialStore(self.path, SCOPES).load()
+        assert loaded is not None
+        self.assertIsInstance(loaded, SharedCredentials)
+        self.assertEqual(loaded.token, "token1")
+        self.assertTrue(loaded.valid)
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode) & 0o077, 0)
+
+    def test_migrates_pickle(self) -> None:
+        """Tests that a legacy token.pickle is converted and removed."""
+        pickle_path = os.path.join(self.tmpdir.name, "token.pickle")
+        with open(pickle_path, "wb") as f:
+            pickle.dump(make_credentials("legacy", 3600), f)
+
+        migrated = self.store.migrate_pickle(pickle_path)
+
+        assert migrated is not None
+        self.assertEqual(migrated.token, "legacy")
+        self.assertFalse(os.path.exists(pickle_path))
+        self.assertIsNone(self.store.migrate_pickle(pickle_path))
+
+    def test_unreadable_pickle_is_skipped(self) -> None:
+        """Tests that a corrupt token.pickle falls back to a fresh login."""
+        pickle_path = os.path.join(self.tmpdir.name, "token.pickle")
+        with open(pickle_path, "wb") as f:
+            f.write(b"not a pickle")
+
+        with self.assertLogs("credentials", level="ERROR"):
+            self.assertIsNone(self.store.migrate_pickle(pickle_path))
+        self.assertIsNone(self.store.load())
+
+    def test_adopts_token_refreshed_by_another_process(self) -> None:
+        """Tests that a refresh reuses a newer token found in the file."""
+        mine = self.store.save(make_credentials("old", 60))
+        other = CredentialStore(self.path, SCOPES)
+        other.save(make_credentials("new", 3600))
+
+        with patch.object(Credentials, "refresh", autospec=True) as mock_refresh:
+            mine.refresh(MagicMock())
+
+        mock_refresh.assert_not_called()
+        self.assertEqual(mine.token, "new")
+
+    def test_concurrent_refreshes_run_once(self) -> None:
+        """Tests that threads refreshing the same token share one refresh."""
+        shared = self.store.save(make_credentials("old", -60))
+        with patch.object(
+            Credentials, "refresh", autospec=True, side_effect=self.fake_refresh
+        ):
+            threads = [
+                threading.Thread(target=shared.refresh, args=(MagicMock(),))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(self.refreshes, 1)
+        loaded = self.store.load()
+        assert loaded is not None
+        self.assertEqual(loaded.token, "refreshed-1")
+
+
+class TestCredentialRefresher(unittest.TestCase):
+
+    def test_refreshes_before_expiry(self) -> None:
+        """Tests that the refresh is due margin seconds before expiry."""
+        refresher = CredentialRefresher(make_credentials("token", 600), margin=300)
+        due = refresher.seconds_until_due()
+        assert due is not None
+        self.assertAlmostEqual(due, 300, delta=5)
+        self.assertEqual(
+            CredentialRefresher(make_credentials("token", 60), 300).seconds_until_due(),
+            0.0,
+        )
+
+    def test_failed_refresh_is_reported(self) -> None:
+        """Tests that refresh errors are logged instead of raised."""
+        from google.auth.exceptions import RefreshError
+
+        credentials = MagicMock()
+        credentials.refresh.side_effect = RefreshError("invalid_grant")
+        refresher = CredentialRefresher(credentials, margin=300)
+        with self.assertLogs("credentials", level="WARNING"):
+            self.assertFalse(refresher.refresh_now())
+
+
+if __name__ == "__main__":
+    unittest.main()
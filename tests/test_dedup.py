@@ -0,0 +1,58 @@
+# tests/test_dedup.py
+import os
+import tempfile
+import unittest
+
+import config
+import command_handler
+from ban_store import BanStore
+from chat_pipeline import ChatPipeline
+from dedup import RecentIds
+from fake_youtube import make_chat_item
+
+
+class TestRecentIds(unittest.TestCase):
+
+    def test_detects_duplicates(self) -> None:
+        """Tests that a repeated ID is reported and counted."""
+        recent = RecentIds(3)
+        self.assertFalse(recent.check_and_add("a"))
+        self.assertTrue(recent.check_and_add("a"))
+        self.assertEqual(recent.suppressed, 1)
+
+    def test_memory_is_constant(self) -> None:
+        """Tests that only the last `size` IDs are remembered."""
+        recent = RecentIds(3)
+        for message_id in "abcd":
+            recent.check_and_add(message_id)
+        self.assertEqual(len(recent), 3)
+        self.assertNotIn("a", recent)
+        self.assertIn("d", recent)
+        self.assertFalse(recent.check_and_add("a"))
+
+
+class TestPipelineDedup(unittest.TestCase):
+
+    def setUp(self) -> None:
+        command_handler.load_commands()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        ban_store = BanStore(os.path.join(self.tmpdir.name, "banned.json"))
+        self.pipeline = ChatPipeline(
+            config, "Bot Channel", ban_store=ban_store, startup_time=0
+        )
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_overlapping_pages(self) -> None:
+        """Tests that messages repeated across pages are only handled once."""
+        first = make_chat_item("m1", "UC1", "Alice", "hi")
+        second = make_chat_item("m2", "UC2", "Bob", "hi")
+        self.assertEqual(len(self.pipeline.process_page({"items": [first]})), 1)
+        self.assertEqual(len(self.pipeline.process_page({"items": [first, second]})), 1)
+        self.assertEqual(self.pipeline.recent_ids.suppressed, 1)
+        self.assertEqual(self.pipeline.last_message_id, "m2")
+
+
+if __name__ == "__main__":
+    unittest.main()
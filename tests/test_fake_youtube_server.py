@@ -0,0 +1,86 @@
+# tests/test_fake_youtube_server.py
+import time
+import unittest
+from typing import Any
+
+from fake_youtube_server import FakeYouTubeServer
+from youtube_api import (
+    LiveChatEndedError,
+    get_chat_messages,
+    get_live_chat_id,
+    get_own_channel_name,
+    get_youtube_service,
+    send_chat_message,
+)
+
+
+class TestFakeYouTubeServer(unittest.TestCase):
+
+    def start(self, **kwargs: Any) -> FakeYouTubeServer:
+        server = FakeYouTubeServer(seed=0, **kwargs)
+        server.start()
+        self.addCleanup(server.stop)
+        return server
+
+    def test_bot_talks_to_fake_server(self) -> None:
+        """Tests the youtube_api functions against the fake server."""
+        server = self.start(messages_per_minute=60_000, polling_interval_millis=1500)
+        youtube = get_youtube_service(server.endpoint)
+        self.assertEqual(get_own_channel_name(youtube), "Fake Bot")
+        live_chat_id = get_live_chat_id(youtube, "video123")
+        self.assertEqual(live_chat_id, "live-chat-video123")
+        assert live_chat_id is not None
+
+        first = get_chat_messages(youtube, live_chat_id)
+        assert first is not None
+        self.assertEqual(first["pollingIntervalMillis"], 1500)
+        time.sleep(0.05)
+        second = get_chat_messages(youtube, live_chat_id, first["nextPageToken"])
+        assert second is not None
+        self.assertTrue(second["items"])
+        self.assertEqual(
+            int(second["nextPageToken"]),
+            int(first["nextPageToken"]) + len(second["items"]),
+        )
+
+        self.assertIsNotNone(send_chat_message(youtube, live_chat_id, "hello"))
+        self.assertEqual(server.sent, [(live_chat_id, "hello")])
+        third = get_chat_messages(youtube, live_chat_id, second["nextPageToken"])
+        assert third is not None
+        self.assertIn("hello", [i["snippet"]["displayMessage"] for i in third["items"]])
+
+    def test_pages_are_limited_by_max_results(self) -> None:
+        """Tests that a backlog larger than the page size is paginated."""
+        server = self.start(messages_per_minute=600_000, page_size=10)
+        youtube = get_youtube_service(server.endpoint)
+        live_chat_id = get_live_chat_id(youtube, "v")
+        assert live_chat_id is not None
+        first = get_chat_messages(youtube, live_chat_id)
+        assert first is not None
+        time.sleep(0.05)
+        second = get_chat_messages(youtube, live_chat_id, first["nextPageToken"])
+        assert second is not None
+        self.assertEqual(len(second["items"]), 10)
+
+    def test_quota_exhaustion(self) -> None:
+        """Tests that calls fail once the daily quota is used up."""
+        server = self.start(daily_quota=7)
+        youtube = get_youtube_service(server.endpoint)
+        live_chat_id = get_live_chat_id(youtube, "v")
+        assert live_chat_id is not None
+        self.assertIsNotNone(get_chat_messages(youtube, live_chat_id))
+        self.assertIsNone(get_chat_messages(youtube, live_chat_id))
+        self.assertEqual(server.quota_used, 6)
+
+    def test_chat_ends_after_duration(self) -> None:
+        """Tests that the chat reports liveChatEnded after its duration."""
+        server = self.start(duration=0.0)
+        youtube = get_youtube_service(server.endpoint)
+        live_chat_id = get_live_chat_id(youtube, "v")
+        assert live_chat_id is not None
+        with self.assertRaises(LiveChatEndedError):
+            get_chat_messages(youtube, live_chat_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+# tests/test_http_transport.py
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_youtube_server import FakeYouTubeServer
+from http_transport import ThreadLocalHttp
+from youtube_api import get_live_chat_id, get_youtube_service, send_chat_message
+
+
+class TestThreadLocalHttp(unittest.TestCase):
+
+    def test_one_client_per_thread(self) -> None:
+        """Tests that a thread reuses its client and other threads get their own."""
+        http = ThreadLocalHttp(timeout=5)
+        first = http._client()
+        self.assertIs(http._client(), first)
+        other = []
+        thread = threading.Thread(target=lambda: other.append(http._client()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], first)
+        self.assertEqual(http.connection_count(), 2)
+        http.close()
+        self.assertEqual(http.connection_count(), 0)
+
+    def test_concurrent_sends_share_one_service(self) -> None:
+        """Tests that many threads can send through one service object."""
+        with FakeYouTubeServer() as server:
+            youtube = get_youtube_service(server.endpoint)
+            live_chat_id = get_live_chat_id(youtube, "video")
+            assert live_chat_id is not None
+
+            def send(i: int) -> bool:
+                return send_chat_message(youtube, live_chat_id, f"msg {i}") is not None
+
+            with ThreadPoolExecutor(8) as pool:
+                results = list(pool.map(send, range(80)))
+
+        self.assertTrue(all(results))
+        self.assertEqual(
+            sorted(text for _, text in server.sent),
+            sorted(f"msg {i}" for i in range(80)),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -18,7 +18,7 @@ class TestImprovements(unittest.TestCase):
         # Reset commands before each test
         load_commands()
         # Reset global command cooldown
-        command_handler.last_command_time = 0
+        command_handler.cooldowns.reset()
 
     @patch("command_handler.time.time")
     def test_global_command_cooldown(self, mock_time: MagicMock) -> None:
@@ -40,8 +40,8 @@ class TestImprovements(unittest.TestCase):
         self.assertEqual(response, "You do not have permission to use this command.")
 
         # Moderator should be able to use !ban
-        config.MODERATORS = ["user1"]
-        response = handle_command("!ban", config, "user1", "!ban user2")
+        with patch.object(config, "MODERATORS", ["user1"]):
+            response = handle_command("!ban", config, "user1", "!ban user2")
         self.assertNotEqual(response, "You do not have permission to use this command.")
 
     @patch("command_handler.time.time")
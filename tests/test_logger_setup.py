@@ -0,0 +1,70 @@
+# tests/test_logger_setup.py
+import io
+import json
+import logging
+import unittest
+from unittest.mock import patch
+
+import config
+import logger_setup
+from logger_setup import CHAT_LOGGER_NAME, JsonFormatter, SamplingFilter
+
+
+class TestLoggerSetup(unittest.TestCase):
+
+    def setUp(self) -> None:
+        root = logging.getLogger()
+        chat = logging.getLogger(CHAT_LOGGER_NAME)
+        saved = (root.handlers[:], root.level, chat.filters[:])
+        root.handlers = []
+
+        def restore() -> None:
+            logger_setup.stop_logger()
+            root.handlers, root.level, chat.filters = saved
+            logging.getLogger("noisy").setLevel(logging.NOTSET)
+
+        self.addCleanup(restore)
+
+    def test_json_formatter(self) -> None:
+        """Tests that records become one JSON object with the formatted message."""
+        record = logging.LogRecord(
+            "chat_pipeline", logging.INFO, __file__, 1, "Chat from %s", ("Ana",), None
+        )
+        data = json.loads(JsonFormatter().format(record))
+        self.assertEqual(data["message"], "Chat from Ana")
+        self.assertEqual(data["logger"], "chat_pipeline")
+        self.assertEqual(data["level"], "INFO")
+
+    def test_sampling_filter(self) -> None:
+        """Tests that one of every N records passes."""
+        sampler = SamplingFilter(3)
+        record = logging.makeLogRecord({})
+        self.assertEqual([sampler.filter(record) for _ in range(6)], [1, 0, 0] * 2)
+
+    def test_async_json_logging(self) -> None:
+        """Tests queued JSON logging, per-module levels and chat sampling."""
+        stream = io.StringIO()
+        with patch("sys.stderr", stream), patch.multiple(
+            config,
+            LOG_ASYNC=True,
+            LOG_FORMAT="json",
+            LOG_LEVELS={"noisy": "ERROR"},
+            LOG_CHAT_SAMPLE_EVERY=2,
+        ):
+            logger_setup.setup_logger()
+        logging.getLogger("noisy").warning("dropped")
+        logging.getLogger("quiet").info("kept %d", 1)
+        for i in range(4):
+            logging.getLogger(CHAT_LOGGER_NAME).info("Chat from %s", i)
+        logger_setup.stop_logger()
+
+        messages = [
+            json.loads(line)["message"]
+            for line in stream.getvalue().split("\n")
+            if line
+        ]
+        self.assertEqual(messages, ["kept 1", "Chat from 0", "Chat from 2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+# tests/test_metrics.py
+import os
+import socket
+import tempfile
+import unittest
+import urllib.request
+from types import ModuleType
+
+import command_handler
+import config
+from ban_store import BanStore
+from chat_pipeline import ChatPipeline
+from fake_youtube import make_chat_item
+from metrics import (
+    MESSAGES_FILTERED,
+    MESSAGES_INGESTED,
+    MetricsRegistry,
+    REGISTRY,
+    enable_metrics,
+)
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_disabled_metrics_record_nothing(self) -> None:
+        """Tests that updates are dropped while the registry is disabled."""
+        registry = MetricsRegistry()
+        counter = registry.counter("c_total", "A counter.")
+        histogram = registry.histogram("h_seconds", "A histogram.")
+        counter.inc()
+        histogram.observe(0.1)
+        self.assertEqual(counter.value(), 0)
+        self.assertEqual(histogram.count(), 0)
+
+    def test_render(self) -> None:
+        """Tests the Prometheus text output of counters and histograms."""
+        registry = MetricsRegistry()
+        registry.enabled = True
+        counter = registry.counter("c_total", "A counter.", "reason")
+        histogram = registry.histogram("h_seconds", "A histogram.", buckets=(0.1, 1))
+        counter.inc("banned")
+        counter.inc("banned", 2)
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        text = registry.render()
+        self.assertIn("# TYPE c_total counter", text)
+        self.assertIn('c_total{reason="banned"} 3', text)
+        self.assertIn('h_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('h_seconds_bucket{le="1"} 2', text)
+        self.assertIn('h_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn("h_seconds_count 3", text)
+        self.assertIn("h_seconds_sum 5.55", text)
+
+
+class TestPipelineMetrics(unittest.TestCase):
+
+    def setUp(self) -> None:
+        command_handler.load_commands()
+        REGISTRY.reset()
+        REGISTRY.enabled = True
+        self.addCleanup(setattr, REGISTRY, "enabled", False)
+        self.addCleanup(REGISTRY.reset)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_filtered_reasons(self) -> None:
+        """Tests that ignored messages are counted by reason."""
+        ban_store = BanStore(os.path.join(self.tmpdir.name, "banned.json"))
+        ban_store.add("Troll")
+        pipeline = ChatPipeline(config, "Bot", ban_store=ban_store, startup_time=0)
+        pipeline.process_page(
+            {
+                "items": [
+                    make_chat_item("m1", "UC1", "Bot", "hello"),
+                    make_chat_item("m2", "UC2", "Troll", "spam"),
+                    make_chat_item("m3", "UC3", "Alice", "hi"),
+                    make_chat_item("m4", "UC3", "Alice", "hi again"),
+                    make_chat_item("m4", "UC3", "Alice", "hi again"),
+                ]
+            }
+        )
+        self.assertEqual(MESSAGES_INGESTED.value(), 5)
+        self.assertEqual(MESSAGES_FILTERED.value("own_message"), 1)
+        self.assertEqual(MESSAGES_FILTERED.value("banned"), 1)
+        self.assertEqual(MESSAGES_FILTERED.value("cooldown"), 1)
+        self.assertEqual(MESSAGES_FILTERED.value("duplicate"), 1)
+
+    def test_http_endpoint(self) -> None:
+        """Tests that enable_metrics serves the registry over HTTP."""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        settings = ModuleType("settings")
+        settings.__dict__.update(
+            METRICS_ENABLED=True,
+            METRICS_HOST="127.0.0.1",
+            METRICS_PORT=port,
+            METRICS_DUMP_SECONDS=0,
+        )
+        stop = enable_metrics(settings)
+        self.addCleanup(stop)
+        MESSAGES_INGESTED.inc(amount=7)
+        url = f"http://127.0.0.1:{port}/metrics"
+        with urllib.request.urlopen(url) as response:
+            body = response.read().decode()
+        self.assertIn("bot_messages_ingested_total 7", body)
+
+
+if __name__ == "__main__":
+    unittest.main()
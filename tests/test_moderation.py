@@ -0,0 +1,183 @@
+# tests/test_moderation.py
+import os
+import tempfile
+import unittest
+from typing import Any, Dict, List, Tuple
+from unittest.mock import patch
+
+import config
+import command_handler
+from ban_store import BanStore
+from chat_message import ChatMessage
+from chat_pipeline import ChatPipeline
+from config_watcher import ConfigSnapshot, settings_of
+from fake_youtube import FakeYouTube, make_chat_item
+from moderation import (
+    ModerationActions,
+    ModerationFilter,
+    ModerationRule,
+    PhraseAutomaton,
+    get_moderation_filter,
+)
+from outbound import OutboundMessage
+
+RULES: List[Dict[str, Any]] = [
+    {"phrases": ["spam", "buy followers"], "action": "warn"},
+    {"phrases": ["bit.ly/"], "action": "ignore", "whole_word": False},
+    {"phrases": ["scam link"], "action": "timeout", "duration": 300},
+    {"phrases": ["slur"], "action": "ban"},
+]
+
+
+class TestPhraseAutomaton(unittest.TestCase):
+
+    def test_finds_overlapping_phrases(self) -> None:
+        """Tests the classic he/she/his/hers example."""
+        automaton = PhraseAutomaton(
+            (phrase, phrase) for phrase in ["he", "she", "his", "hers"]
+        )
+        found = sorted(automaton.matches("ushers"))
+        self.assertEqual(found, [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")])
+
+    def test_phrases_are_case_folded(self) -> None:
+        """Tests that phrases match case-folded text regardless of their case."""
+        automaton = PhraseAutomaton([("Straße", 1)])
+        self.assertEqual(list(automaton.matches("die strasse")), [(4, 11, 1)])
+
+
+class TestModerationFilter(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.filter = ModerationFilter(RULES)
+
+    def check(self, text: str) -> Tuple[str, str]:
+        found = self.filter.check(text)
+        return (found[0].action, found[1]) if found else ("", "")
+
+    def test_whole_words(self) -> None:
+        """Tests that phrases only match whole words unless configured otherwise."""
+        self.assertEqual(self.check("No SPAM please"), ("warn", "spam"))
+        self.assertEqual(self.check("spammer"), ("", ""))
+        self.assertEqual(self.check("see xbit.ly/abc"), ("ignore", "bit.ly/"))
+        self.assertEqual(self.check("hello there"), ("", ""))
+
+    def test_most_severe_rule_wins(self) -> None:
+        """Tests that a message breaking several rules gets the harshest action."""
+        self.assertEqual(self.check("spam and a scam link"), ("timeout", "scam link"))
+        self.assertEqual(self.check("slur, spam, scam link"), ("ban", "slur"))
+
+    def test_unknown_action_is_rejected(self) -> None:
+        """Tests that a typo in an action fails loudly."""
+        with self.assertRaises(ValueError):
+            ModerationFilter([{"phrases": ["x"], "action": "kick"}])
+
+    def test_timeout_without_duration_is_rejected(self) -> None:
+        """Tests that a timeout rule missing its duration fails loudly."""
+        with self.assertRaises(ValueError):
+            ModerationFilter([{"phrases": ["spam"], "action": "timeout"}])
+        with self.assertRaises(ValueError):
+            ModerationRule("timeout", duration=0)
+
+    def test_filter_is_shared_by_equal_snapshots(self) -> None:
+        """Tests that a reload with unchanged rules does not recompile them."""
+        first = ConfigSnapshot(
+            "config", dict(settings_of(config), MODERATION_RULES=RULES)
+        )
+        second = ConfigSnapshot("config", dict(settings_of(first), MODERATORS=["x"]))
+        changed = ConfigSnapshot(
+            "config", dict(settings_of(first), MODERATION_RULES=RULES[:1])
+        )
+        self.assertIs(get_moderation_filter(first), get_moderation_filter(second))
+        self.assertIsNot(get_moderation_filter(first), get_moderation_filter(changed))
+
+
+class TestPipelineModeration(unittest.TestCase):
+
+    def setUp(self) -> None:
+        command_handler.load_commands()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.actions: List[Tuple[str, str]] = []
+        patcher = patch.object(config, "MODERATION_RULES", RULES)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pipeline = ChatPipeline(
+            config,
+            "Bot Channel",
+            ban_store=BanStore(os.path.join(self.tmpdir.name, "banned.json")),
+            startup_time=0,
+            moderate=lambda message, rule: self.actions.append(
+                (message.author_id, rule.action)
+            ),
+        )
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def process(self, text: str, **author_details: bool) -> List[OutboundMessage]:
+        item = make_chat_item(f"m{len(text)}", "UC1", "Alice", text)
+        item["authorDetails"].update(author_details)
+        return self.pipeline.process_page({"items": [item]})
+
+    def test_ignore_and_warn(self) -> None:
+        """Tests that banned phrases drop the message, with a warning if configured."""
+        self.assertEqual(self.process("free followers at bit.ly/x"), [])
+        self.assertEqual(
+            self.process("spam"),
+            [
+                OutboundMessage.command(
+                    config.MODERATION_WARN_MESSAGE.format(username="Alice")
+                )
+            ],
+        )
+        self.assertNotIn("UC1", self.pipeline.seen_users)
+        self.assertEqual(self.actions, [])
+
+    def test_timeout_uses_the_handler(self) -> None:
+        """Tests that timeouts and bans are handed to the moderation handler."""
+        self.assertEqual(self.process("click this scam link"), [])
+        self.assertEqual(self.actions, [("UC1", "timeout")])
+
+    def test_moderators_are_exempt(self) -> None:
+        """Tests that chat moderators are not moderated."""
+        responses = self.process("spam", isChatModerator=True)
+        self.assertEqual(responses, [OutboundMessage.welcome("Alice")])
+
+    def test_bot_moderators_are_exempt(self) -> None:
+        """Tests that users in MODERATORS are not moderated either."""
+        with patch.object(config, "MODERATORS", ["UC1"]):
+            self.process("free followers at bit.ly/x")
+        self.assertIn("UC1", self.pipeline.seen_users)
+        self.assertEqual(self.actions, [])
+
+
+class TestModerationActions(unittest.TestCase):
+
+    def test_bans_through_the_api(self) -> None:
+        """Tests that timeouts and bans become liveChatBans.insert calls."""
+        youtube = FakeYouTube()
+        actions = ModerationActions(youtube, "chat")
+        message = ChatMessage.from_item(make_chat_item("m1", "UC1", "Alice", "x"))
+
+        actions(message, ModerationRule("timeout", duration=300))
+        actions(message, ModerationRule("ban"))
+
+        self.assertEqual(
+            youtube.bans,
+            [
+                {
+                    "liveChatId": "chat",
+                    "type": "temporary",
+                    "bannedUserDetails": {"channelId": "UC1"},
+                    "banDurationSeconds": 300,
+                },
+                {
+                    "liveChatId": "chat",
+                    "type": "permanent",
+                    "bannedUserDetails": {"channelId": "UC1"},
+                },
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+# tests/test_multi_stream.py
+import unittest
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+import config
+import command_handler
+from config_watcher import ConfigSnapshot, settings_of
+from fake_youtube import FakeYouTube, make_chat_item
+from multi_stream import MultiStreamRunner, stream_config
+
+
+class TestMultiStream(unittest.TestCase):
+
+    def setUp(self) -> None:
+        command_handler.load_commands()
+
+    def test_stream_config_overrides(self) -> None:
+        """Tests that overrides apply to the stream's copy of config only."""
+        stream = stream_config(config, "v1", {"WELCOME_MESSAGE": "Hi {username}"})
+        self.assertEqual(stream.WELCOME_MESSAGE, "Hi {username}")
+        self.assertEqual(stream.VIDEO_ID, "v1")
+        self.assertEqual(stream.CHAT_COMMANDS, config.CHAT_COMMANDS)
+        self.assertNotEqual(config.WELCOME_MESSAGE, "Hi {username}")
+
+    @patch.object(config, "WELCOMED_USERS_DB", "")
+    @patch.object(config, "WELCOME_COALESCE_WINDOW_SECONDS", 0)
+    def test_serves_streams_concurrently(self) -> None:
+        """Tests that one runner serves several chats with per-stream config."""
+        youtube = FakeYouTube(
+            live_chat_ids={"v1": "c1", "v2": "c2"},
+            chat_pages={
+                "c1": [[], [make_chat_item("m1", "UC1", "Alice", "hi")]],
+                "c2": [[], [make_chat_item("m2", "UC1", "Alice", "hi")]],
+            },
+        )
+        streams = [
+            {"video_id": "v1"},
+            {"video_id": "v2", "WELCOME_MESSAGE": "Hi {username}"},
+            {"video_id": "missing"},
+        ]
+        runner = MultiStreamRunner(youtube, streams, config, "Bot Channel")
+        self.assertEqual(runner.connect(), 2)
+        runner.run()
+
+        self.assertEqual(
+            youtube.sent_by_chat["c1"],
+            [config.WELCOME_MESSAGE.format(username="Alice")],
+        )
+        self.assertEqual(youtube.sent_by_chat["c2"], ["Hi Alice"])
+        stats = runner.stream_stats()
+        self.assertEqual(stats["v1"]["messages"], 1)
+        self.assertEqual(stats["v2"]["sent"], 1)
+        self.assertTrue(stats["v2"]["finished"])
+
+    @patch.object(config, "WELCOMED_USERS_DB", "")
+    @patch.object(config, "WELCOME_COALESCE_WINDOW_SECONDS", 0)
+    @patch.object(config, "OUTBOUND_LOW_PRIORITY_RESERVE", 0)
+    @patch.object(config, "OUTBOUND_BURST", 1)
+    def test_streams_share_the_send_budget(self) -> None:
+        """Tests that all streams together send within one project's budget."""
+        youtube = FakeYouTube(
+            live_chat_ids={"v1": "c1", "v2": "c2"},
+            chat_pages={
+                "c1": [[], [make_chat_item("m1", "UC1", "Alice", "hi")]],
+                "c2": [[], [make_chat_item("m2", "UC2", "Bob", "hi")]],
+            },
+        )
+        streams = [{"video_id": "v1"}, {"video_id": "v2"}]
+        runner = MultiStreamRunner(youtube, streams, config, "Bot Channel")
+        runner.connect()
+        first, second = runner.sessions
+        self.assertIs(first.dispatcher.bucket, second.dispatcher.bucket)
+
+        runner.run()
+        self.assertEqual(len(youtube.sent), 1)
+
+    @patch.object(config, "WELCOMED_USERS_DB", "")
+    @patch.object(config, "POLL_ERROR_BACKOFF_SECONDS", 0.01)
+    @patch.object(config, "POLL_MAX_CONSECUTIVE_ERRORS", 2)
+    def test_failing_page_backs_off(self) -> None:
+        """Tests that a page that breaks processing is retried with backoff."""
+        bad_item = make_chat_item("m1", "UC1", "Alice", "hi")
+        del bad_item["snippet"]["displayMessage"]
+        youtube = FakeYouTube(
+            live_chat_ids={"v1": "c1"}, chat_pages={"c1": [[bad_item]] * 5}
+        )
+        runner = MultiStreamRunner(youtube, [{"video_id": "v1"}], config, "Bot")
+        runner.connect()
+        with self.assertLogs("multi_stream", level="ERROR"):
+            runner.run()
+
+        self.assertEqual(youtube.calls.count("liveChatMessages.list"), 3)
+        stats = runner.stream_stats()["v1"]
+        self.assertEqual(stats["poll_errors"], 3)
+        self.assertTrue(stats["finished"])
+
+    @patch.object(config, "WELCOMED_USERS_DB", "")
+    def test_apply_config_keeps_overrides(self) -> None:
+        """Tests that a reloaded config reaches every stream with its overrides."""
+        youtube = FakeYouTube(live_chat_ids={"v1": "c1", "v2": "c2"})
+        streams = [
+            {"video_id": "v1"},
+            {"video_id": "v2", "WELCOME_MESSAGE": "Hi {username}"},
+        ]
+        runner = MultiStreamRunner(youtube, streams, config, "Bot Channel")
+        runner.connect()
+
+        reloaded = ConfigSnapshot(
+            "config", dict(settings_of(config), MODERATORS=["mod2"])
+        )
+        runner.apply_config(reloaded)
+
+        first, second = runner.sessions
+        self.assertEqual(first.pipeline.config.MODERATORS, ("mod2",))
+        self.assertIs(first.dispatcher.config, first.config)
+        self.assertEqual(second.config.MODERATORS, ("mod2",))
+        self.assertEqual(second.config.WELCOME_MESSAGE, "Hi {username}")
+        self.assertEqual(second.config.VIDEO_ID, "v2")
+
+    @patch.object(config, "WELCOMED_USERS_DB", "")
+    def test_bad_reload_changes_no_stream(self) -> None:
+        """Tests that a reload with a broken job leaves every stream as it was."""
+        youtube = FakeYouTube(live_chat_ids={"v1": "c1", "v2": "c2"})
+        streams = [{"video_id": "v1"}, {"video_id": "v2"}]
+        runner = MultiStreamRunner(youtube, streams, config, "Bot Channel")
+        runner.connect()
+        previous = [session.config for session in runner.sessions]
+
+        reloaded = ConfigSnapshot(
+            "config",
+            dict(settings_of(config), SCHEDULED_JOBS=[{"messages": ["Hi"]}]),
+        )
+        with self.assertRaises(ValueError):
+            runner.apply_config(reloaded)
+        self.assertEqual([session.config for session in runner.sessions], previous)
+        self.assertIs(runner.config, config)
+
+    @patch.object(config, "WELCOMED_USERS_DB", "")
+    def test_per_stream_scheduled_jobs(self) -> None:
+        """Tests that each stream gets its own jobs, dropped when it ends."""
+        youtube = FakeYouTube(live_chat_ids={"v1": "c1", "v2": "c2"})
+        streams: List[Dict[str, Any]] = [
+            {"video_id": "v1"},
+            {
+                "video_id": "v2",
+                "SCHEDULED_JOBS": [{"messages": ["v2 only"], "cron": "0 * * * *"}],
+            },
+        ]
+        runner = MultiStreamRunner(youtube, streams, config, "Bot Channel")
+        runner.connect()
+        self.assertEqual(
+            sorted((job.stream, job.name) for job in runner.scheduler.jobs()),
+            [("v1", "scheduled"), ("v2", "job1"), ("v2", "scheduled")],
+        )
+
+        runner.run()
+        self.assertEqual(runner.scheduler.jobs(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+# tests/test_outbound.py
+import unittest
+from unittest.mock import patch
+from typing import List, Optional
+
+import config
+from outbound import OutboundDispatcher, OutboundMessage, TokenBucket
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestOutboundDispatcher(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.sent: List[str] = []
+        self.clock = FakeClock()
+
+    def make_dispatcher(self) -> OutboundDispatcher:
+        def send(text: str) -> Optional[dict]:
+            self.sent.append(text)
+            return {}
+
+        return OutboundDispatcher(send, config, clock=self.clock)
+
+    def test_welcomes_coalesce_within_window(self) -> None:
+        """Tests that welcomes in the same window are merged into one message."""
+        dispatcher = self.make_dispatcher()
+        for name in ("Ana", "Bruno", "Carla"):
+            dispatcher.submit(OutboundMessage.welcome(name))
+        self.assertEqual(dispatcher.flush(), 0)
+
+        self.clock.now += config.WELCOME_COALESCE_WINDOW_SECONDS
+        self.assertEqual(dispatcher.flush(), 1)
+        self.assertEqual(
+            self.sent, [config.WELCOME_MESSAGE.format(username="Ana, Bruno e Carla")]
+        )
+        self.assertEqual(dispatcher.stats["coalesced"], 2)
+
+    @patch.object(config, "WELCOME_COALESCE_MAX_NAMES", 2)
+    def test_welcome_batch_closes_at_max_names(self) -> None:
+        """Tests that a full batch of names is sent without waiting for the window."""
+        dispatcher = self.make_dispatcher()
+        dispatcher.submit(OutboundMessage.welcome("Ana"))
+        dispatcher.submit(OutboundMessage.welcome("Bruno"))
+        dispatcher.flush()
+        self.assertEqual(len(self.sent), 1)
+
+    def test_duplicate_responses_are_dropped(self) -> None:
+        """Tests that identical responses are only sent once per dedup window."""
+        dispatcher = self.make_dispatcher()
+        self.assertTrue(dispatcher.submit(OutboundMessage.command("link")))
+        self.assertFalse(dispatcher.submit(OutboundMessage.command("link")))
+        dispatcher.flush()
+        self.assertFalse(dispatcher.submit(OutboundMessage.command("link")))
+
+        self.clock.now += config.OUTBOUND_DEDUP_WINDOW_SECONDS
+        self.assertTrue(dispatcher.submit(OutboundMessage.command("link")))
+        self.assertEqual(dispatcher.stats["duplicates"], 2)
+
+    @patch.object(config, "OUTBOUND_BURST", 2)
+    @patch.object(config, "OUTBOUND_LOW_PRIORITY_RESERVE", 1)
+    def test_commands_keep_priority_when_budget_is_low(self) -> None:
+        """Tests that low-priority traffic leaves the reserve to command responses."""
+        dispatcher = self.make_dispatcher()
+        dispatcher.submit(OutboundMessage.scheduled("scheduled 1"))
+        dispatcher.submit(OutboundMessage.scheduled("scheduled 2"))
+        dispatcher.flush()
+        self.assertEqual(self.sent, ["scheduled 1"])
+
+        dispatcher.submit(OutboundMessage.command("response"))
+        dispatcher.flush()
+        self.assertEqual(self.sent, ["scheduled 1", "response"])
+
+    @patch.object(config, "OUTBOUND_BURST", 0)
+    def test_deferred_messages_expire(self) -> None:
+        """Tests that messages deferred past the limit are dropped."""
+        dispatcher = self.make_dispatcher()
+        dispatcher.submit(OutboundMessage.scheduled("scheduled"))
+        self.clock.now += config.OUTBOUND_MAX_DEFER_SECONDS + 1
+        dispatcher.flush()
+        self.assertEqual(dispatcher.stats["expired"], 1)
+        self.assertEqual(dispatcher.pending(), 0)
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_refill_is_capped(self) -> None:
+        """Tests that the bucket refills at its rate up to its capacity."""
+        bucket = TokenBucket(capacity=2, rate=1, now=0)
+        self.assertTrue(bucket.try_consume(0))
+        self.assertTrue(bucket.try_consume(0))
+        self.assertFalse(bucket.try_consume(0))
+        self.assertEqual(bucket.time_until(0, 1), 1.0)
+        self.assertEqual(bucket.refill(100), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
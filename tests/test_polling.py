@@ -0,0 +1,64 @@
+# tests/test_polling.py
+import unittest
+from unittest.mock import patch
+
+import config
+from polling import LatencyStats, PollScheduler
+
+
+class TestPollScheduler(unittest.TestCase):
+
+    def test_processing_time_is_subtracted(self) -> None:
+        """Tests that time spent on the page is taken off the next sleep."""
+        poller = PollScheduler(config)
+        self.assertAlmostEqual(poller.next_delay(5000, 1.5, 5), 3.5)
+        self.assertEqual(poller.next_delay(5000, 10.0, 5), 0.0)
+
+    def test_idle_chat_slows_down_and_busy_chat_speeds_up(self) -> None:
+        """Tests that empty pages stretch the interval and busy pages reset it."""
+        poller = PollScheduler(config)
+        delays = [poller.next_delay(2000, 0, 0) for _ in range(20)]
+        self.assertGreater(delays[1], delays[0])
+        self.assertEqual(delays[-1], config.POLL_MAX_INTERVAL_SECONDS)
+
+        self.assertEqual(poller.next_delay(2000, 0, config.POLL_BUSY_MESSAGES), 2.0)
+
+    def test_never_polls_faster_than_server_minimum(self) -> None:
+        """Tests that the server's pollingIntervalMillis is a hard floor."""
+        poller = PollScheduler(config)
+        for _ in range(10):
+            self.assertGreaterEqual(poller.next_delay(4000, 0, 3), 4.0)
+
+    @patch.object(config, "POLL_MAX_CONSECUTIVE_ERRORS", 3)
+    def test_errors_back_off_exponentially_then_give_up(self) -> None:
+        """Tests exponential backoff with jitter and giving up after repeated errors."""
+        poller = PollScheduler(config, rng=lambda: 1.0)
+        base = config.POLL_ERROR_BACKOFF_SECONDS
+        self.assertEqual(poller.on_error(), base)
+        self.assertEqual(poller.on_error(), base * 2)
+        self.assertEqual(poller.on_error(), base * 4)
+        self.assertIsNone(poller.on_error())
+
+        # A successful poll resets the error count
+        poller.next_delay(1000, 0, 1)
+        jittered = PollScheduler(config, rng=lambda: 0.0)
+        self.assertEqual(jittered.on_error(), base / 2)
+        self.assertEqual(poller.consecutive_errors, 0)
+
+
+class TestLatencyStats(unittest.TestCase):
+
+    def test_percentiles(self) -> None:
+        """Tests that latency percentiles are computed over recent samples."""
+        stats = LatencyStats()
+        for i in range(1, 101):
+            stats.observe(i / 100)
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot["count"], 100)
+        self.assertAlmostEqual(snapshot["p50"], 0.51)
+        self.assertAlmostEqual(snapshot["p99"], 1.0)
+        self.assertAlmostEqual(snapshot["max"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
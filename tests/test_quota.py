@@ -0,0 +1,177 @@
+# tests/test_quota.py
+import unittest
+from types import ModuleType
+from typing import List
+from unittest.mock import MagicMock, patch
+
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpMockSequence
+
+import config
+from fake_youtube import FakeYouTube, make_http_error
+from outbound import OutboundDispatcher, OutboundMessage
+from polling import PollScheduler
+from quota import QuotaMeter
+from youtube_api import get_chat_messages
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_meter(clock: FakeClock, budget: int = 10000, hours: float = 4) -> QuotaMeter:
+    settings = ModuleType("settings")
+    settings.QUOTA_TRACKING = True  # type: ignore[attr-defined]
+    settings.DAILY_QUOTA_UNITS = budget  # type: ignore[attr-defined]
+    settings.STREAM_DURATION_HOURS = hours  # type: ignore[attr-defined]
+    settings.QUOTA_FORECAST_WINDOW_SECONDS = 600  # type: ignore[attr-defined]
+    settings.QUOTA_MAX_POLL_INTERVAL_SECONDS = 60  # type: ignore[attr-defined]
+    meter = QuotaMeter(clock)
+    meter.configure(settings)
+    return meter
+
+
+class TestQuotaMeter(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.meter = make_meter(self.clock)
+
+    def poll_for(self, seconds: float, every: float) -> None:
+        for _ in range(int(seconds / every)):
+            self.clock.now += every
+            self.meter.charge("liveChatMessages.list")
+
+    def test_disabled_by_default(self) -> None:
+        """Tests that nothing is charged until accounting is configured."""
+        meter = QuotaMeter(self.clock)
+        meter.charge("liveChatMessages.insert")
+        self.assertEqual(meter.used(), 0)
+
+    def test_rolling_day(self) -> None:
+        """Tests that calls are charged their cost and expire after 24 hours."""
+        self.meter.charge("liveChatMessages.insert")
+        self.clock.now += 12 * 3600
+        self.meter.charge("videos.list")
+        self.meter.charge("liveChatMessages.list")
+        self.assertEqual(self.meter.used(), 56)
+        self.assertEqual(self.meter.remaining(), 10000 - 56)
+        self.clock.now += 12 * 3600 + 60
+        self.assertEqual(self.meter.used(), 6)
+
+    def test_sustainable_rate_is_not_degraded(self) -> None:
+        """Tests that polling which fits the budget leaves the bot alone."""
+        # 5 units every 10s for 4 hours is 7200 units
+        self.poll_for(600, 10)
+        self.assertAlmostEqual(self.meter.rate(), 0.5)
+        self.assertGreater(self.meter.time_to_exhaustion(), 4 * 3600)
+        self.assertFalse(self.meter.degraded)
+
+    def test_forecast_degrades_and_recovers(self) -> None:
+        """Tests that spending too fast degrades until the forecast fits again."""
+        with self.assertLogs("quota", level="WARNING"):
+            self.poll_for(600, 2)
+        self.assertTrue(self.meter.degraded)
+        self.assertAlmostEqual(self.meter.rate(), 2.5)
+        self.assertLess(self.meter.time_to_exhaustion(), 3600)
+        # 8500 units left for 3h50m at 5 units a poll
+        self.assertAlmostEqual(
+            self.meter.min_poll_interval("chat"), 5 * 13800 / 8500, places=3
+        )
+
+        with self.assertLogs("quota", level="INFO"):
+            self.poll_for(1200, 30)
+        self.assertFalse(self.meter.degraded)
+
+    def test_quota_exceeded(self) -> None:
+        """Tests that a quotaExceeded error degrades until a call succeeds."""
+        with self.assertLogs("quota", level="ERROR"):
+            self.meter.exhausted()
+        self.assertEqual(self.meter.remaining(), 0)
+        self.assertTrue(self.meter.degraded)
+        self.meter.exhausted(False)
+        self.assertFalse(self.meter.degraded)
+
+
+class TestDegradation(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.meter = make_meter(self.clock)
+        with self.assertLogs("quota", level="WARNING"):
+            for _ in range(300):
+                self.clock.now += 2
+                self.meter.charge("liveChatMessages.list")
+
+    def test_polling_is_stretched_to_fit(self) -> None:
+        """Tests that polls are spaced out until polling fits the quota left."""
+        poller = PollScheduler(config, quota=self.meter)
+        delays: List[float] = []
+        for _ in range(600):
+            delay = poller.next_delay(2000, 0.0, config.POLL_BUSY_MESSAGES)
+            delays.append(delay)
+            self.clock.now += delay
+            self.meter.charge("liveChatMessages.list")
+        # What is left, spread over the rest of the stream at 5 units a poll
+        time_left = self.meter.planned_end - self.clock.now
+        affordable = 5 / (self.meter.remaining() / time_left)
+        self.assertGreater(delays[0], 2)
+        self.assertAlmostEqual(delays[-1], affordable, delta=affordable * 0.05)
+
+    def test_pollers_share_the_budget(self) -> None:
+        """Tests that each of several streams polls proportionally less often."""
+        alone = self.meter.min_poll_interval("c1")
+        self.meter.min_poll_interval("c2")
+        self.assertAlmostEqual(self.meter.min_poll_interval("c1"), 2 * alone)
+
+    def test_welcomes_and_scheduled_messages_are_dropped(self) -> None:
+        """Tests that only command responses are sent while degraded."""
+        sent: List[str] = []
+        dispatcher = OutboundDispatcher(sent.append, config, quota=self.meter)
+        with self.assertLogs("outbound", level="INFO"):
+            self.assertFalse(dispatcher.submit(OutboundMessage.welcome("Ana")))
+            self.assertFalse(dispatcher.submit(OutboundMessage.scheduled("Hi")))
+        self.assertTrue(dispatcher.submit(OutboundMessage.command("Pong")))
+        dispatcher.flush(force=True)
+        self.assertEqual(sent, ["Pong"])
+        self.assertEqual(dispatcher.stats["suppressed"], 2)
+
+
+class TestApiMetering(unittest.TestCase):
+
+    def test_calls_are_charged(self) -> None:
+        """Tests that API calls are charged and quotaExceeded is recorded."""
+        meter = make_meter(FakeClock())
+        youtube = FakeYouTube(pages=[[]])
+        with patch("youtube_api.QUOTA", meter):
+            get_chat_messages(youtube, "chat")
+            self.assertEqual(meter.used(), 5)
+            error = make_http_error(403, "quotaExceeded")
+            with patch.object(youtube, "_list_messages", side_effect=error):
+                with self.assertLogs(level="ERROR"):
+                    self.assertIsNone(get_chat_messages(youtube, "chat"))
+            self.assertTrue(meter.degraded)
+
+    @patch("googleapiclient.http.time.sleep")
+    def test_retries_are_charged(self, mock_sleep: MagicMock) -> None:
+        """Tests that every attempt googleapiclient makes is charged."""
+        meter = make_meter(FakeClock())
+        http = HttpMockSequence(
+            [
+                ({"status": "500"}, b"{}"),
+                ({"status": "503"}, b"{}"),
+                ({"status": "200"}, b'{"items": []}'),
+            ]
+        )
+        youtube = build("youtube", "v3", http=http, static_discovery=True)
+        with patch("youtube_api.QUOTA", meter):
+            self.assertEqual(get_chat_messages(youtube, "chat"), {"items": []})
+        self.assertEqual(meter.used(), 15)
+
+
+if __name__ == "__main__":
+    unittest.main()
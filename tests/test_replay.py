@@ -0,0 +1,33 @@
+# tests/test_replay.py
+import os
+import tempfile
+import unittest
+
+from replay import generate_pages, load_pages, replay, save_pages
+
+
+class TestReplay(unittest.TestCase):
+
+    def test_pages_round_trip(self) -> None:
+        """Tests that saved pages load back unchanged."""
+        pages = generate_pages(3, 5, num_users=4)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "pages.jsonl")
+            save_pages(path, pages)
+            self.assertEqual(load_pages(path), pages)
+
+    def test_replay_reports_figures(self) -> None:
+        """Tests that every item is handled and the figures are reported."""
+        pages = generate_pages(4, 50, num_users=10)
+        result = replay(pages, trace_memory=True)
+        self.assertEqual(result.pages, 4)
+        self.assertEqual(result.messages, 200)
+        self.assertEqual(result.latency.count, 200)
+        self.assertGreater(result.sends, 0)
+        self.assertGreater(result.messages_per_second, 0)
+        self.assertIsNotNone(result.peak_memory)
+        self.assertIn("handle_p99_us", result.as_dict())
+
+
+if __name__ == "__main__":
+    unittest.main()
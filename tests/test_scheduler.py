@@ -0,0 +1,233 @@
+# tests/test_scheduler.py
+import threading
+import time
+import unittest
+from datetime import datetime
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+import config
+from outbound import OutboundMessage
+from scheduler import (
+    CronSchedule,
+    IntervalSchedule,
+    Job,
+    Scheduler,
+    message_jobs,
+    validate_message_jobs,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def timestamp(year: int, month: int, day: int, hour: int, minute: int) -> float:
+    return datetime(year, month, day, hour, minute).timestamp()
+
+
+class TestCronSchedule(unittest.TestCase):
+
+    def test_next_after(self) -> None:
+        """Tests steps, ranges and lists across hour, day and year boundaries."""
+        cases = [
+            ("*/15 * * * *", (2024, 5, 1, 10, 7), (2024, 5, 1, 10, 15)),
+            ("0 9-17 * * *", (2024, 5, 1, 17, 30), (2024, 5, 2, 9, 0)),
+            ("30 12 1,15 * *", (2024, 5, 2, 0, 0), (2024, 5, 15, 12, 30)),
+            ("0 0 1 1 *", (2024, 5, 1, 0, 0), (2025, 1, 1, 0, 0)),
+            # Exactly on a match: the next one
+            ("0 * * * *", (2024, 5, 1, 10, 0), (2024, 5, 1, 11, 0)),
+        ]
+        for expression, start, expected in cases:
+            with self.subTest(expression=expression):
+                schedule = CronSchedule(expression)
+                self.assertEqual(
+                    schedule.next_after(timestamp(*start)), timestamp(*expected)
+                )
+
+    def test_weekdays(self) -> None:
+        """Tests that 0 and 7 are Sunday and day or weekday may match."""
+        # 2024-05-01 is a Wednesday
+        start = timestamp(2024, 5, 1, 12, 0)
+        self.assertEqual(
+            CronSchedule("0 10 * * 7").next_after(start), timestamp(2024, 5, 5, 10, 0)
+        )
+        self.assertEqual(
+            CronSchedule("0 10 * * 1-5").next_after(start),
+            timestamp(2024, 5, 2, 10, 0),
+        )
+        self.assertEqual(
+            CronSchedule("0 10 10 * 0").next_after(start),
+            timestamp(2024, 5, 5, 10, 0),
+        )
+
+    def test_bad_expressions(self) -> None:
+        """Tests that malformed or impossible expressions are rejected."""
+        for expression in ("* * * *", "60 * * * *", "*/0 * * * *", "x * * * *"):
+            with self.subTest(expression=expression):
+                with self.assertRaises(ValueError):
+                    CronSchedule(expression)
+        with self.assertRaisesRegex(ValueError, "never matches"):
+            CronSchedule("0 0 30 2 *")
+
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.scheduler = Scheduler(self.clock)
+        self.runs: List[str] = []
+
+    def job(self, name: str, seconds: float, **kwargs: Any) -> Job:
+        return Job(
+            name,
+            IntervalSchedule(seconds),
+            lambda: self.runs.append(name),
+            **kwargs,
+        )
+
+    def advance(self, seconds: float) -> None:
+        self.clock.now += seconds
+        self.scheduler.run_pending()
+
+    def test_independent_intervals(self) -> None:
+        """Tests that each job runs on its own interval."""
+        self.scheduler.add(self.job("a", 10))
+        self.scheduler.add(self.job("b", 25))
+        self.assertEqual(self.scheduler.run_pending(), 10)
+        for _ in range(5):
+            self.advance(10)
+        self.assertEqual(self.runs, ["a", "a", "b", "a", "a", "b", "a"])
+
+    def test_jitter_does_not_drift(self) -> None:
+        """Tests that jitter delays each run without pushing later runs back."""
+        self.scheduler.add(self.job("a", 60, jitter=30))
+        for _ in range(10):
+            job = self.scheduler.jobs()[0]
+            self.assertLessEqual(job.base, job.due)
+            self.assertLessEqual(job.due, job.base + 30)
+            self.clock.now = job.due
+            self.scheduler.run_pending()
+        self.assertEqual(len(self.runs), 10)
+        self.assertEqual(self.scheduler.jobs()[0].base, 1000 + 11 * 60)
+
+    def test_condition_skips_runs(self) -> None:
+        """Tests that a job whose condition fails waits for its next occurrence."""
+        active = [False]
+        self.scheduler.add(self.job("a", 10, condition=lambda: active[0]))
+        self.advance(10)
+        active[0] = True
+        self.advance(10)
+        self.assertEqual(self.runs, ["a"])
+
+    def test_errors_do_not_stop_the_job(self) -> None:
+        """Tests that a failing job runs again at its next occurrence."""
+        calls: List[float] = []
+
+        def fail() -> None:
+            calls.append(self.clock.now)
+            raise RuntimeError("boom")
+
+        self.scheduler.add(Job("a", IntervalSchedule(10), fail))
+        with self.assertLogs("scheduler", level="ERROR"):
+            self.advance(10)
+            self.advance(10)
+        self.assertEqual(calls, [1010, 1020])
+
+    def test_replace_keeps_unchanged_timers(self) -> None:
+        """Tests that reloading the same jobs does not restart their timers."""
+        self.scheduler.replace(
+            [self.job("a", 10, spec="a"), self.job("b", 10, spec="b")]
+        )
+        self.clock.now += 5
+        self.scheduler.replace([self.job("a", 10, spec="a"), self.job("c", 10)])
+        self.assertEqual(
+            [(job.name, job.due) for job in self.scheduler.jobs()],
+            [("a", 1010), ("c", 1015)],
+        )
+
+    def test_streams_are_replaced_separately(self) -> None:
+        """Tests that replacing or removing one stream's jobs leaves the others."""
+        self.scheduler.replace([self.job("a", 10, stream="s1")], "s1")
+        self.scheduler.replace([self.job("a", 20, stream="s2")], "s2")
+        self.scheduler.remove_stream("s1")
+        self.advance(20)
+        self.assertEqual(self.runs, ["a"])
+        self.assertEqual([job.stream for job in self.scheduler.jobs()], ["s2"])
+
+    def test_removed_jobs_are_compacted(self) -> None:
+        """Tests that replaced jobs do not pile up in the heap."""
+        for i in range(100):
+            self.scheduler.replace([self.job("a", 10 + i)])
+        self.assertLessEqual(len(self.scheduler._heap), 20)
+        self.assertEqual(self.scheduler.time_until_due(), 109)
+
+    def test_thread_wakes_for_new_jobs(self) -> None:
+        """Tests that the driver thread sleeps until a job is added, then runs it."""
+        scheduler = Scheduler()
+        ran = threading.Event()
+        scheduler.start()
+        try:
+            scheduler.add(Job("a", IntervalSchedule(0.01), ran.set))
+            self.assertTrue(ran.wait(5))
+        finally:
+            scheduler.stop()
+
+
+class TestMessageJobs(unittest.TestCase):
+
+    def test_jobs_from_config(self) -> None:
+        """Tests the legacy scheduled message plus SCHEDULED_JOBS entries."""
+        jobs_config: List[Dict[str, Any]] = [
+            {
+                "name": "discord",
+                "messages": ["Join our Discord!"],
+                "interval_minutes": 20,
+                "active_within_minutes": 10,
+            },
+            {"messages": ["Hydrate!"], "cron": "0 * * * *"},
+        ]
+        sent: List[OutboundMessage] = []
+        last_activity = [0.0]
+        with patch.object(config, "SCHEDULED_JOBS", jobs_config):
+            jobs = message_jobs(config, sent.append, lambda: last_activity[0], "s1")
+
+        self.assertEqual([job.name for job in jobs], ["scheduled", "discord", "job2"])
+        self.assertEqual(jobs[0].schedule, IntervalSchedule(15 * 60))
+        self.assertEqual(jobs[2].schedule, CronSchedule("0 * * * *"))
+        self.assertEqual({job.stream for job in jobs}, {"s1"})
+
+        discord = jobs[1]
+        assert discord.condition is not None
+        self.assertFalse(discord.condition())
+        last_activity[0] = time.time()
+        self.assertTrue(discord.condition())
+        discord.action()
+        self.assertEqual(sent, [OutboundMessage.scheduled("Join our Discord!")])
+
+    def test_job_without_messages_is_rejected(self) -> None:
+        """Tests that a typo in a job fails loudly."""
+        with patch.object(config, "SCHEDULED_JOBS", [{"interval_minutes": 5}]):
+            with self.assertRaises(ValueError):
+                message_jobs(config, print, lambda: 0.0)
+
+    def test_job_without_schedule_is_rejected(self) -> None:
+        """Tests that a job with neither cron nor interval_minutes fails validation."""
+        with patch.object(config, "SCHEDULED_JOBS", [{"messages": ["Hi"]}]):
+            with self.assertRaisesRegex(ValueError, "cron or interval_minutes"):
+                validate_message_jobs(config)
+
+    def test_validation_rejects_crons_that_never_run(self) -> None:
+        """Tests that a cron job that can never run fails validation."""
+        jobs = [{"messages": ["Hi"], "cron": "0 0 30 2 *"}]
+        with patch.object(config, "SCHEDULED_JOBS", jobs):
+            with self.assertRaisesRegex(ValueError, "never matches"):
+                validate_message_jobs(config)
+
+
+if __name__ == "__main__":
+    unittest.main()
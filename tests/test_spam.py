@@ -0,0 +1,206 @@
+# tests/test_spam.py
+import os
+import tempfile
+import unittest
+from typing import List, Tuple
+from unittest.mock import MagicMock, patch
+
+import config
+import command_handler
+from ban_store import BanStore
+from chat_message import ChatMessage
+from chat_pipeline import ChatPipeline
+from fake_youtube import make_chat_item
+from outbound import OutboundMessage
+from spam import (
+    DUPLICATE,
+    FLOOD,
+    FloodTracker,
+    NearDuplicateIndex,
+    SpamDetector,
+    simhash,
+)
+
+RAID = "Check out my channel for FREE robux giveaway now"
+
+
+def message(author_id: str, text: str) -> ChatMessage:
+    return ChatMessage.from_item(make_chat_item("m1", author_id, author_id, text))
+
+
+class TestSimHash(unittest.TestCase):
+
+    def test_normalization(self) -> None:
+        """Tests that case, punctuation and stretched letters do not matter."""
+        self.assertEqual(
+            simhash(RAID),
+            simhash("check out my channel for freeeee robux giveaway NOW!!"),
+        )
+
+    def test_different_texts_are_far_apart(self) -> None:
+        """Tests that unrelated messages differ in many bits."""
+        other = simhash("what a great stream today, loving the new setup")
+        self.assertGreater((simhash(RAID) ^ other).bit_count(), 10)
+
+
+class TestFloodTracker(unittest.TestCase):
+
+    def test_sliding_window(self) -> None:
+        """Tests that only messages within the window count."""
+        flood = FloodTracker(max_messages=3, window=10, max_users=10)
+        self.assertEqual(
+            [flood.is_flooding("UC1", t) for t in (0, 1, 2, 3, 12, 13)],
+            [False, False, False, True, False, False],
+        )
+
+    def test_users_are_bounded(self) -> None:
+        """Tests that the least recently active user is forgotten first."""
+        flood = FloodTracker(max_messages=3, window=10, max_users=2)
+        for user in ("UC1", "UC2", "UC1", "UC3"):
+            flood.is_flooding(user, 0)
+        self.assertEqual(len(flood), 2)
+        self.assertEqual(list(flood._times), ["UC1", "UC3"])
+
+
+class TestNearDuplicateIndex(unittest.TestCase):
+
+    def test_counts_other_users_within_distance(self) -> None:
+        """Tests that near-duplicates from other users are counted once each."""
+        index = NearDuplicateIndex(max_distance=3, window=60, max_size=100)
+        self.assertEqual(index.add(0b1111, "UC1", 0, enough=5), 0)
+        self.assertEqual(index.add(0b1111, "UC1", 1, enough=5), 0)
+        self.assertEqual(index.add(0b0111, "UC2", 2, enough=5), 1)
+        self.assertEqual(index.add(0b1111 << 40 | 0b111, "UC3", 3, enough=5), 0)
+        self.assertEqual(index.add(0b1110, "UC3", 4, enough=5), 2)
+
+    def test_entries_expire_and_are_bounded(self) -> None:
+        """Tests that old entries and entries beyond max_size are evicted."""
+        index = NearDuplicateIndex(max_distance=3, window=60, max_size=3)
+        for i in range(5):
+            index.add(1 << (i * 10), f"UC{i}", i, enough=5)
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.add(1, "UCx", 100, enough=5), 0)
+        self.assertEqual(len(index), 1)
+        self.assertEqual(sum(map(len, index._buckets)), 4)
+
+
+class TestSpamDetector(unittest.TestCase):
+
+    def test_copy_paste_raid(self) -> None:
+        """Tests that the same text from enough users is spam."""
+        detector = SpamDetector(config)
+        verdicts = [
+            detector.check(message(f"UC{i}", RAID + "!" * i), i) for i in range(4)
+        ]
+        self.assertEqual(verdicts, [None, None, DUPLICATE, DUPLICATE])
+
+    def test_short_messages_are_not_duplicates(self) -> None:
+        """Tests that short messages like "lol" can be repeated by anyone."""
+        detector = SpamDetector(config)
+        verdicts = [detector.check(message(f"UC{i}", "lol"), i) for i in range(5)]
+        self.assertEqual(verdicts, [None] * 5)
+
+    def test_different_emoji_texts_are_not_duplicates(self) -> None:
+        """Tests that texts without words are only duplicates of their copies."""
+        detector = SpamDetector(config)
+        texts = [
+            "😂🤣😂🤣😂🤣😂🤣😂🤣😂🤣😂🤣😂🤣",
+            "❤️💜❤️💜❤️💜❤️💜❤️💜❤️💜",
+            "?!?!?!?!?!?!?!?!?!",
+        ]
+        verdicts = [
+            detector.check(message(f"UC{i}", t), i) for i, t in enumerate(texts)
+        ]
+        self.assertEqual(verdicts, [None] * 3)
+        copies = [detector.check(message(f"UC{i}", texts[0]), i) for i in range(3, 5)]
+        self.assertEqual(copies, [None, DUPLICATE])
+
+    def test_flood(self) -> None:
+        """Tests that one user sending too many messages is flooding."""
+        detector = SpamDetector(config)
+        verdicts = [
+            detector.check(message("UC1", f"message {i}"), i / 10)
+            for i in range(config.SPAM_FLOOD_MAX_MESSAGES + 1)
+        ]
+        self.assertEqual(verdicts[-2:], [None, FLOOD])
+
+
+class TestPipelineSpam(unittest.TestCase):
+
+    def setUp(self) -> None:
+        command_handler.load_commands()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.actions: List[Tuple[str, str, int]] = []
+        for name, value in (("SPAM_ACTION", "timeout"), ("SPAM_TIMEOUT_SECONDS", 60)):
+            patcher = patch.object(config, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.pipeline = ChatPipeline(
+            config,
+            "Bot Channel",
+            ban_store=BanStore(os.path.join(self.tmpdir.name, "banned.json")),
+            startup_time=0,
+            moderate=lambda message, rule: self.actions.append(
+                (message.author_id, rule.action, rule.duration)
+            ),
+        )
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    @patch("chat_pipeline.time.time", return_value=1000.0)
+    def test_raid_is_timed_out(self, mock_time: MagicMock) -> None:
+        """Tests that copy-paste spammers get SPAM_ACTION, moderators excepted."""
+        items = [make_chat_item(f"m{i}", f"UC{i}", f"User{i}", RAID) for i in range(4)]
+        items[3]["authorDetails"]["isChatModerator"] = True
+        responses = self.pipeline.process_page({"items": items})
+
+        self.assertEqual(
+            responses,
+            [
+                OutboundMessage.welcome("User0"),
+                OutboundMessage.welcome("User1"),
+                OutboundMessage.welcome("User3"),
+            ],
+        )
+        self.assertEqual(self.actions, [("UC2", "timeout", 60)])
+
+    @patch("chat_pipeline.time.time", return_value=1000.0)
+    def test_flooder_is_timed_out_once(self, mock_time: MagicMock) -> None:
+        """Tests that a flood gets one timeout, not one per message after the limit."""
+        items = [make_chat_item(f"m{i}", "UC1", "User1", f"hi {i}") for i in range(20)]
+        self.pipeline.process_page({"items": items})
+        self.assertEqual(self.actions, [("UC1", "timeout", 60)])
+
+        # Once the timeout is over, a new flood is timed out again
+        mock_time.return_value = 1061.0
+        items = [make_chat_item(f"n{i}", "UC1", "User1", f"hi {i}") for i in range(6)]
+        self.pipeline.process_page({"items": items})
+        self.assertEqual(len(self.actions), 2)
+
+    def test_reload_changes_the_action(self) -> None:
+        """Tests that a reloaded SPAM_ACTION applies to the next verdict."""
+        with patch.object(config, "SPAM_ACTION", "warn"):
+            self.pipeline.apply_config(config)
+        self.assertEqual(self.pipeline.spam.rule.action, "warn")
+
+    def test_bad_reload_changes_nothing(self) -> None:
+        """Tests that a reload that fails leaves every setting as it was."""
+        spam = self.pipeline.spam
+        before = (self.pipeline.cooldowns.cooldown, spam.min_users, spam.flood.window)
+        with patch.multiple(
+            config,
+            SPAM_TIMEOUT_SECONDS=0,
+            USER_MESSAGE_COOLDOWN_SECONDS=99,
+            SPAM_DUPLICATE_MIN_USERS=7,
+            SPAM_FLOOD_WINDOW_SECONDS=99,
+        ):
+            with self.assertRaises(ValueError):
+                self.pipeline.apply_config(config)
+        after = (self.pipeline.cooldowns.cooldown, spam.min_users, spam.flood.window)
+        self.assertEqual(after, before)
+        self.assertEqual(spam.rule.duration, 60)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+# tests/test_startup.py
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import config
+import command_handler
+from command_handler import _LazyCommand, handle_command, load_commands
+from startup import StartupCache, StartupTimer
+
+
+class TestStartupCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "startup_cache.json")
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_survives_restart(self) -> None:
+        """Tests that cached values are read back by a new cache instance."""
+        cache = StartupCache(self.path, ttl=3600)
+        cache.set_channel_name("BotChannel")
+        cache.set_live_chat_id("video1", "chat1")
+
+        reopened = StartupCache(self.path, ttl=3600)
+        self.assertEqual(reopened.channel_name(), "BotChannel")
+        self.assertEqual(reopened.live_chat_id("video1"), "chat1")
+        self.assertIsNone(reopened.live_chat_id("video2"))
+
+    @patch("startup.time.time")
+    def test_entries_expire(self, mock_time: MagicMock) -> None:
+        """Tests that entries older than the TTL are ignored."""
+        mock_time.return_value = 1000.0
+        cache = StartupCache(self.path, ttl=60)
+        cache.set_live_chat_id("video1", "chat1")
+        mock_time.return_value = 1059.0
+        self.assertEqual(cache.live_chat_id("video1"), "chat1")
+        mock_time.return_value = 1061.0
+        self.assertIsNone(cache.live_chat_id("video1"))
+
+    def test_forget_live_chat_id(self) -> None:
+        """Tests that a forgotten chat ID is removed from disk too."""
+        cache = StartupCache(self.path, ttl=3600)
+        cache.set_live_chat_id("video1", "chat1")
+        cache.forget_live_chat_id("video1")
+        self.assertIsNone(StartupCache(self.path, ttl=3600).live_chat_id("video1"))
+
+    def test_corrupt_file_is_ignored(self) -> None:
+        """Tests that an unreadable cache file starts an empty cache."""
+        with open(self.path, "w") as f:
+            f.write("{not json")
+        with self.assertLogs("startup", level="ERROR"):
+            cache = StartupCache(self.path, ttl=3600)
+        self.assertIsNone(cache.channel_name())
+        cache.set_channel_name("BotChannel")
+        with open(self.path) as f:
+            self.assertEqual(json.load(f)["channel_name"]["value"], "BotChannel")
+
+
+class TestStartupTimer(unittest.TestCase):
+
+    @patch("startup.time.perf_counter")
+    def test_summary(self, mock_perf_counter: MagicMock) -> None:
+        """Tests that each phase is timed from the previous mark."""
+        mock_perf_counter.side_effect = [10.25, 10.5]
+        timer = StartupTimer(10.0)
+        timer.mark("imports")
+        timer.mark("lookups", "2 cached")
+        self.assertEqual(
+            timer.summary(),
+            "imports 250ms, lookups 250ms (2 cached); total 500ms",
+        )
+
+
+class TestLazyCommands(unittest.TestCase):
+
+    def setUp(self) -> None:
+        command_handler.cooldowns.reset()
+
+    def tearDown(self) -> None:
+        load_commands()
+
+    def test_command_is_imported_on_first_use(self) -> None:
+        """Tests that lazily registered commands load and run on first use."""
+        load_commands(lazy=True)
+        self.assertIsInstance(command_handler.commands["!link"], _LazyCommand)
+
+        response = handle_command("!link", config, "user1", "!link")
+
+        self.assertEqual(response, config.CHAT_COMMANDS["!link"])
+        self.assertNotIsInstance(command_handler.commands["!link"], _LazyCommand)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+# tests/test_user_state.py
+import unittest
+
+from user_state import ApproximateUserSet, BloomFilter, BoundedUserSet, CooldownTracker
+
+
+class TestCooldownTracker(unittest.TestCase):
+
+    def test_cooldown(self) -> None:
+        """Tests that a user is blocked until the cooldown has passed."""
+        tracker = CooldownTracker(cooldown=5, max_size=10)
+        self.assertTrue(tracker.try_acquire("UC1", 100))
+        self.assertFalse(tracker.try_acquire("UC1", 104))
+        self.assertTrue(tracker.try_acquire("UC1", 105))
+
+    def test_expired_entries_are_dropped(self) -> None:
+        """Tests that entries older than the cooldown do not accumulate."""
+        tracker = CooldownTracker(cooldown=5, max_size=1000)
+        for i in range(100):
+            tracker.try_acquire(f"UC{i}", i)
+        self.assertLessEqual(len(tracker), 5)
+
+    def test_max_size(self) -> None:
+        """Tests that the least recently active users are evicted past max_size."""
+        tracker = CooldownTracker(cooldown=60, max_size=3)
+        for i in range(5):
+            tracker.try_acquire(f"UC{i}", 0)
+        self.assertEqual(len(tracker), 3)
+        # UC0 was evicted, so it is no longer on cooldown
+        self.assertTrue(tracker.try_acquire("UC0", 1))
+
+
+class TestUserSets(unittest.TestCase):
+
+    def test_bounded_user_set_evicts_least_recent(self) -> None:
+        """Tests that the exact set forgets the least recently added user."""
+        users = BoundedUserSet(max_size=2)
+        users.add("a")
+        users.add("b")
+        users.add("a")
+        users.add("c")
+        self.assertIn("a", users)
+        self.assertNotIn("b", users)
+        self.assertGreater(users.memory_usage(), 0)
+
+    def test_bloom_filter_has_no_false_negatives(self) -> None:
+        """Tests that everything added is reported and false positives stay rare."""
+        bloom = BloomFilter(capacity=10000, error_rate=0.01)
+        for i in range(10000):
+            bloom.add(f"UC{i}")
+        self.assertTrue(all(f"UC{i}" in bloom for i in range(10000)))
+        false_positives = sum(f"other{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_approximate_user_set_rotates(self) -> None:
+        """Tests that the approximate set keeps a bounded number of generations."""
+        users = ApproximateUserSet(capacity=100, error_rate=0.01)
+        for i in range(250):
+            users.add(f"UC{i}")
+        self.assertIn("UC249", users)
+        self.assertIn("UC150", users)
+        self.assertLessEqual(len(users), 200)
+        memory = users.memory_usage()
+        for i in range(250, 1000):
+            users.add(f"UC{i}")
+        self.assertEqual(users.memory_usage(), memory)
+
+
+if __name__ == "__main__":
+    unittest.main()
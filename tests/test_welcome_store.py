@@ -0,0 +1,56 @@
+# tests/test_welcome_store.py
+import os
+import tempfile
+import unittest
+
+from user_state import BoundedUserSet
+from welcome_store import LIFETIME_SCOPE, PersistentUserSet, WelcomeStore
+
+
+class TestWelcomeStore(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "welcomed.db")
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_survives_restart(self) -> None:
+        """Tests that welcomed users are remembered by a new store instance."""
+        store = WelcomeStore(self.path, "video1")
+        store.add("UC1")
+        store.close()
+
+        reopened = WelcomeStore(self.path, "video1")
+        self.assertIn("UC1", reopened)
+        self.assertNotIn("UC2", reopened)
+        reopened.close()
+
+    def test_scopes_are_independent(self) -> None:
+        """Tests that a user welcomed in one stream is welcomed again in the next."""
+        store = WelcomeStore(self.path, "video1")
+        store.add("UC1")
+        store.flush()
+        self.assertNotIn("UC1", WelcomeStore(self.path, "video2"))
+        self.assertNotIn("UC1", WelcomeStore(self.path, LIFETIME_SCOPE))
+
+    def test_database_is_opened_lazily(self) -> None:
+        """Tests that creating a store does not touch the disk."""
+        WelcomeStore(self.path, "video1")
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_persistent_user_set_caches_hits(self) -> None:
+        """Tests that users found on disk are cached in memory."""
+        store = WelcomeStore(self.path, "video1")
+        store.add("UC1")
+        users = PersistentUserSet(BoundedUserSet(10), store)
+        self.assertIn("UC1", users)
+        self.assertIn("UC1", users.cache)
+        users.add("UC2")
+        self.assertIn("UC2", store)
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,14 @@
 # tests/test_youtube_api.py
 import unittest
 from unittest.mock import patch, MagicMock
-from youtube_api import get_live_chat_id, send_chat_message, get_own_channel_name
+from fake_youtube import make_http_error
+from youtube_api import (
+    get_live_chat_id,
+    get_chat_messages,
+    send_chat_message,
+    get_own_channel_name,
+    LiveChatEndedError,
+)
 
 
 class TestYoutubeApi(unittest.TestCase):
@@ -69,6 +76,23 @@ class TestYoutubeApi(unittest.TestCase):
         channel_name = get_own_channel_name(mock_youtube)
         self.assertIsNone(channel_name)
 
+    def test_get_chat_messages_retryable_error(self) -> None:
+        """Tests that transient errors return None so the caller can retry."""
+        mock_youtube = MagicMock()
+        mock_youtube.liveChatMessages().list().execute.side_effect = make_http_error(
+            500, "backendError"
+        )
+        self.assertIsNone(get_chat_messages(mock_youtube, "test_chat_id"))
+
+    def test_get_chat_messages_chat_ended(self) -> None:
+        """Tests that an ended chat raises LiveChatEndedError."""
+        mock_youtube = MagicMock()
+        mock_youtube.liveChatMessages().list().execute.side_effect = make_http_error(
+            403, "liveChatEnded"
+        )
+        with self.assertRaises(LiveChatEndedError):
+            get_chat_messages(mock_youtube, "test_chat_id")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,165 @@
+# user_state.py
+import hashlib
+import math
+import sys
+import threading
+from collections import OrderedDict
+from types import ModuleType
+from typing import Optional, Tuple, Union
+
+
+class CooldownTracker:
+    """
+    Remembers when each user last got a message through, for per-user cooldowns.
+    Entries live in an OrderedDict kept in last-touched order, so entries older
+    than the cooldown are dropped from the front and the least recently active
+    users are evicted once max_size is reached.
+    """
+
+    def __init__(self, cooldown: float, max_size: int) -> None:
+        self.cooldown = cooldown
+        self.max_size = max_size
+        self._last_seen: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._last_seen)
+
+    def try_acquire(self, user_id: str, now: float) -> bool:
+        """Returns True and starts a new cooldown if the user is not on cooldown."""
+        with self._lock:
+            last = self._last_seen.get(user_id)
+            if last is not None and now - last < self.cooldown:
+                return False
+            self._last_seen[user_id] = now
+            self._last_seen.move_to_end(user_id)
+            self._expire(now)
+            return True
+
+    def _expire(self, now: float) -> None:
+        # Called with the lock held
+        entries = self._last_seen
+        while entries:
+            user_id, last = next(iter(entries.items()))
+            if now - last < self.cooldown and len(entries) <= self.max_size:
+                break
+            del entries[user_id]
+
+    def memory_usage(self) -> int:
+        """Approximate memory used by the tracker, in bytes."""
+        with self._lock:
+            return sys.getsizeof(self._last_seen) + sum(
+                sys.getsizeof(k) + sys.getsizeof(v) for k, v in self._last_seen.items()
+            )
+
+
+class BoundedUserSet:
+    """A set of user IDs that forgets the least recently seen ones past max_size."""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._users: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, user_id: object) -> bool:
+        return user_id in self._users
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def add(self, user_id: str) -> None:
+        with self._lock:
+            self._users[user_id] = None
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_size:
+                self._users.popitem(last=False)
+
+    def memory_usage(self) -> int:
+        with self._lock:
+            return sys.getsizeof(self._users) + sum(
+                sys.getsizeof(k) for k in self._users
+            )
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings with a target false-positive rate."""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.capacity = capacity
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Tuple[int, ...]:
+        # Kirsch-Mitzenmacher double hashing from one 128-bit digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return tuple((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def __contains__(self, item: object) -> bool:
+        if not isinstance(item, str):
+            return False
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item: str) -> None:
+        for p in self._positions(item):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def memory_usage(self) -> int:
+        return sys.getsizeof(self.bits)
+
+
+class ApproximateUserSet:
+    """
+    Bloom-filter-backed user set with bounded memory. Once the current filter
+    holds capacity users it becomes the previous generation and a fresh filter
+    is started, so the false-positive rate stays near its target; users seen
+    only in the generation before last are forgotten.
+    """
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._current = BloomFilter(capacity, error_rate)
+        self._previous: Optional[BloomFilter] = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, user_id: object) -> bool:
+        previous = self._previous
+        return user_id in self._current or (
+            previous is not None and user_id in previous
+        )
+
+    def __len__(self) -> int:
+        """Approximate number of users remembered."""
+        previous = self._previous
+        return self._current.count + (previous.count if previous else 0)
+
+    def add(self, user_id: str) -> None:
+        with self._lock:
+            if self._current.count >= self.capacity:
+                self._previous = self._current
+                self._current = BloomFilter(self.capacity, self.error_rate)
+            self._current.add(user_id)
+
+    def memory_usage(self) -> int:
+        previous = self._previous
+        return self._current.memory_usage() + (
+            previous.memory_usage() if previous else 0
+        )
+
+
+UserSet = Union[BoundedUserSet, ApproximateUserSet]
+
+
+def create_seen_users(config: ModuleType) -> UserSet:
+    """Builds the "already welcomed" set selected by SEEN_USERS_MODE."""
+    if config.SEEN_USERS_MODE == "bloom":
+        return ApproximateUserSet(
+            config.SEEN_USERS_BLOOM_CAPACITY, config.SEEN_USERS_BLOOM_ERROR_RATE
+        )
+    return BoundedUserSet(config.USER_STATE_MAX_USERS)
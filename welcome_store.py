@@ -0,0 +1,132 @@
+# welcome_store.py
+import logging
+import sqlite3
+import threading
+import time
+from types import ModuleType
+from typing import Optional
+
+from user_state import UserSet
+
+logger = logging.getLogger(__name__)
+
+# Scope used by the "lifetime" policy: one welcome per user, ever
+LIFETIME_SCOPE = "*"
+
+
+class WelcomeStore:
+    """
+    On-disk index of welcomed users, keyed by (scope, channel ID).
+
+    The scope is the video ID under the "stream" policy, so a restart during
+    the same stream doesn't re-welcome anyone, or LIFETIME_SCOPE under the
+    "lifetime" policy. Lookups use the primary key index, so nothing is loaded
+    at startup no matter how many users are stored. The database is opened
+    lazily and inserts are committed in batches by flush().
+    """
+
+    def __init__(self, path: str, scope: str) -> None:
+        self.path = path
+        self.scope = scope
+        self._conn: Optional[sqlite3.Connection] = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Called with the lock held
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS welcomed ("
+                " scope TEXT NOT NULL,"
+                " channel_id TEXT NOT NULL,"
+                " welcomed_at REAL NOT NULL,"
+                " PRIMARY KEY (scope, channel_id)"
+                ") WITHOUT ROWID"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def __contains__(self, channel_id: object) -> bool:
+        with self._lock:
+            try:
+                row = (
+                    self._connect()
+                    .execute(
+                        "SELECT 1 FROM welcomed WHERE scope = ? AND channel_id = ?",
+                        (self.scope, channel_id),
+                    )
+                    .fetchone()
+                )
+            except sqlite3.Error as e:
+                logger.error("Error reading welcomed users: %s", e)
+                return False
+            return row is not None
+
+    def add(self, channel_id: str) -> None:
+        with self._lock:
+            try:
+                self._connect().execute(
+                    "INSERT OR IGNORE INTO welcomed VALUES (?, ?, ?)",
+                    (self.scope, channel_id, time.time()),
+                )
+                self._dirty = True
+            except sqlite3.Error as e:
+                logger.error("Error saving welcomed user: %s", e)
+
+    def flush(self) -> None:
+        """Commits pending inserts."""
+        with self._lock:
+            if self._conn is not None and self._dirty:
+                try:
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    logger.error("Error saving welcomed users: %s", e)
+                self._dirty = False
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class PersistentUserSet:
+    """
+    An in-memory user set in front of a WelcomeStore. Hits are answered from
+    memory; a miss is checked on disk once and then cached.
+    """
+
+    def __init__(self, cache: UserSet, store: WelcomeStore) -> None:
+        self.cache = cache
+        self.store = store
+
+    def __contains__(self, user_id: object) -> bool:
+        if user_id in self.cache:
+            return True
+        if isinstance(user_id, str) and user_id in self.store:
+            self.cache.add(user_id)
+            return True
+        return False
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def add(self, user_id: str) -> None:
+        self.cache.add(user_id)
+        self.store.add(user_id)
+
+    def memory_usage(self) -> int:
+        return self.cache.memory_usage()
+
+
+def open_welcome_store(config: ModuleType, video_id: str) -> Optional[WelcomeStore]:
+    """Returns the welcome store for a stream, or None if persistence is disabled."""
+    if not config.WELCOMED_USERS_DB:
+        return None
+    scope = LIFETIME_SCOPE if config.WELCOME_POLICY == "lifetime" else video_id
+    return WelcomeStore(config.WELCOMED_USERS_DB, scope)
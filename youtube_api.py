@@ -1,92 +1,207 @@
 import os
-import pickle
+import json
 import logging
-from typing import Optional, Any, Dict, List
+from typing import TYPE_CHECKING, Optional, Any, Dict, List
 
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build, Resource
 from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+
+import config
+from http_transport import ThreadLocalHttp
+from metrics import API_LATENCY
+from quota import QUOTA
+
+if TYPE_CHECKING:
+    from credentials import CredentialRefresher
+
+logger = logging.getLogger(__name__)
 
 # The SCOPES contain the permissions the bot will request from the user.
 SCOPES: List[str] = ["https://www.googleapis.com/auth/youtube.force-ssl"]
 
+# Where older versions kept the OAuth token; migrated to CREDENTIALS_FILE
+LEGACY_TOKEN_PATH = "token.pickle"
+
+# Keeps the OAuth token fresh for the service built by get_youtube_service
+_refresher: Optional["CredentialRefresher"] = None
+
+# Error reasons that mean the live chat is gone for good, so retrying is pointless
+CHAT_ENDED_REASONS = {"liveChatEnded", "liveChatNotFound", "liveChatDisabled"}
+
+# Error reasons for a page token the API no longer accepts, such as the one
+# saved in an old checkpoint
+PAGE_TOKEN_REASONS = {"pageTokenInvalid", "invalidPageToken"}
+
+
+class LiveChatEndedError(Exception):
+    """Raised when the API reports that the live chat has ended or is unavailable."""
+
+
+class PageTokenInvalidError(Exception):
+    """Raised when the API rejects the page token, so polling must start over."""
+
+
+def get_http_error_reason(error: HttpError) -> Optional[str]:
+    """Extracts the first error reason (e.g. "quotaExceeded") from an HttpError."""
+    try:
+        data = json.loads(error.content)
+        return str(data["error"]["errors"][0]["reason"])
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+class _MeteredHttp:
+    """
+    Wraps the service's http object for one request, charging the quota for
+    every attempt googleapiclient makes, including its own retries.
+    """
 
-def get_youtube_service() -> Optional[Resource]:
+    def __init__(self, http: Any, endpoint: str) -> None:
+        self.http = http
+        self.endpoint = endpoint
+
+    def request(self, *args: Any, **kwargs: Any) -> Any:
+        QUOTA.charge(self.endpoint)
+        return self.http.request(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.http, name)
+
+
+def execute(request: Any, endpoint: str, num_retries: int) -> Dict[str, Any]:
+    """
+    Executes an API request, charging its quota cost for every attempt and
+    timing it. A quotaExceeded error marks the quota as exhausted until a call
+    succeeds.
+    """
+    with API_LATENCY.time(endpoint):
+        try:
+            if isinstance(request, HttpRequest):
+                response: Dict[str, Any] = request.execute(
+                    http=_MeteredHttp(request.http, endpoint), num_retries=num_retries
+                )
+            else:
+                # Stand-ins such as FakeYouTube send nothing over HTTP
+                QUOTA.charge(endpoint)
+                response = request.execute(num_retries=num_retries)
+        except HttpError as e:
+            if get_http_error_reason(e) == "quotaExceeded":
+                QUOTA.exhausted()
+            raise
+    QUOTA.exhausted(False)
+    return response
+
+
+def get_youtube_service(api_endpoint: Optional[str] = None) -> Optional[Resource]:
     """
     Builds and returns an authenticated YouTube service object.
-    Handles OAuth 2.0 flow.
+    Handles OAuth 2.0 flow. With api_endpoint (e.g. a fake_youtube_server.py
+    URL), builds an unauthenticated client that sends requests there instead.
     """
-    credentials = None
-    token_path = "token.pickle"
+    if api_endpoint:
+        logger.warning("Using YouTube API endpoint %s without OAuth.", api_endpoint)
+        return build(
+            "youtube",
+            "v3",
+            http=ThreadLocalHttp(timeout=config.API_TIMEOUT_SECONDS),
+            client_options={"api_endpoint": api_endpoint},
+            static_discovery=True,
+        )
+
+    # Imported here: only needed when talking to the real API
+    from credentials import CredentialRefresher, CredentialStore
+
     client_secrets_path = "client_secret.json"
+    store = CredentialStore(config.CREDENTIALS_FILE, SCOPES)
+    credentials = store.migrate_pickle(LEGACY_TOKEN_PATH) or store.load()
 
-    if os.path.exists(token_path):
-        with open(token_path, "rb") as token:
-            credentials = pickle.load(token)
-
-    if not credentials or not credentials.valid:
-        if credentials and credentials.expired and credentials.refresh_token:
-            credentials.refresh(Request())
-        else:
-            if not os.path.exists(client_secrets_path):
-                logging.error(
-                    "client_secret.json not found. Please download it from the Google Cloud Console."
-                )
-                return None
-            flow = InstalledAppFlow.from_client_secrets_file(
-                client_secrets_path, SCOPES
+    if not credentials or not (credentials.valid or credentials.refresh_token):
+        if not os.path.exists(client_secrets_path):
+            logger.error(
+                "client_secret.json not found. Please download it from the Google Cloud Console."
             )
-            credentials = flow.run_local_server(port=0)
+            return None
+        # Imported here: the OAuth flow is slow to import and rarely needed
+        from google_auth_oauthlib.flow import InstalledAppFlow
+
+        flow = InstalledAppFlow.from_client_secrets_file(client_secrets_path, SCOPES)
+        credentials = store.save(flow.run_local_server(port=0))
+
+    if credentials.refresh_token:
+        # An expired token is refreshed by this thread right away, while the
+        # client is being built, instead of blocking startup
+        global _refresher
+        stop_credential_refresher()
+        _refresher = CredentialRefresher(
+            credentials, margin=config.CREDENTIALS_REFRESH_MARGIN_SECONDS
+        )
+        _refresher.start()
+
+    # The service is shared by the polling, sending and command threads
+    http = ThreadLocalHttp(credentials, timeout=config.API_TIMEOUT_SECONDS)
+    return build("youtube", "v3", http=http, static_discovery=True)
 
-        with open(token_path, "wb") as token:
-            pickle.dump(credentials, token)
 
-    return build("youtube", "v3", credentials=credentials)
+def stop_credential_refresher() -> None:
+    """Stops refreshing the OAuth token of the service, if it was started."""
+    global _refresher
+    if _refresher is not None:
+        _refresher.stop()
+        _refresher = None
 
 
 def get_live_chat_id(youtube: Resource, video_id: str) -> Optional[str]:
     """Gets the live chat ID for a given video ID."""
     try:
         request = youtube.videos().list(part="liveStreamingDetails", id=video_id)
-        response: Dict[str, Any] = request.execute()
+        response = execute(request, "videos.list", config.API_NUM_RETRIES)
 
         if not response.get("items"):
-            logging.error(f"Video with ID '{video_id}' not found.")
+            logger.error("Video with ID '%s' not found.", video_id)
             return None
 
         live_streaming_details: Optional[Dict[str, Any]] = response["items"][0].get(
             "liveStreamingDetails"
         )
         if not live_streaming_details:
-            logging.error(
-                f"Video with ID '{video_id}' is not a live stream or has no live chat."
+            logger.error(
+                "Video with ID '%s' is not a live stream or has no live chat.", video_id
             )
             return None
 
         live_chat_id: Optional[str] = live_streaming_details.get("activeLiveChatId")
         if not live_chat_id:
-            logging.error(f"Could not find live chat ID for video ID '{video_id}'.")
+            logger.error("Could not find live chat ID for video ID '%s'.", video_id)
             return None
 
         return live_chat_id
     except HttpError as e:
-        logging.error(f"An HTTP error {e.resp.status} occurred: {e.content}")
+        logger.error("An HTTP error %s occurred: %s", e.resp.status, e.content)
         return None
 
 
 def get_chat_messages(
     youtube: Resource, live_chat_id: str, page_token: Optional[str] = None
 ) -> Optional[Dict[str, Any]]:
-    """Gets live chat messages."""
+    """
+    Gets live chat messages.
+    Returns None on errors worth retrying, raises LiveChatEndedError once the
+    chat is gone and PageTokenInvalidError if page_token is no longer valid.
+    """
     try:
         request = youtube.liveChatMessages().list(
             liveChatId=live_chat_id, part="snippet,authorDetails", pageToken=page_token
         )
-        response: Dict[str, Any] = request.execute()
+        response = execute(request, "liveChatMessages.list", config.API_NUM_RETRIES)
         return response
     except HttpError as e:
-        logging.error(f"An HTTP error {e.resp.status} occurred: {e.content}")
+        reason = get_http_error_reason(e)
+        if reason in CHAT_ENDED_REASONS:
+            raise LiveChatEndedError(reason) from e
+        if page_token is not None and reason in PAGE_TOKEN_REASONS:
+            raise PageTokenInvalidError(reason) from e
+        logger.error("An HTTP error %s occurred: %s", e.resp.status, e.content)
         return None
 
 
@@ -105,11 +220,44 @@ def send_chat_message(
                 }
             },
         )
-        response: Dict[str, Any] = request.execute()
+        response = execute(request, "liveChatMessages.insert", config.API_SEND_RETRIES)
+        return response
+    except HttpError as e:
+        logger.error(
+            "An HTTP error %s occurred while sending message: %s",
+            e.resp.status,
+            e.content,
+        )
+        return None
+
+
+def ban_chat_user(
+    youtube: Resource,
+    live_chat_id: str,
+    channel_id: str,
+    duration_seconds: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    """Bans a user from the live chat, for duration_seconds or permanently."""
+    snippet: Dict[str, Any] = {
+        "liveChatId": live_chat_id,
+        "type": "permanent",
+        "bannedUserDetails": {"channelId": channel_id},
+    }
+    if duration_seconds is not None:
+        snippet["type"] = "temporary"
+        snippet["banDurationSeconds"] = duration_seconds
+    try:
+        request = youtube.liveChatBans().insert(
+            part="snippet", body={"snippet": snippet}
+        )
+        response = execute(request, "liveChatBans.insert", config.API_SEND_RETRIES)
         return response
     except HttpError as e:
-        logging.error(
-            f"An HTTP error {e.resp.status} occurred while sending message: {e.content}"
+        logger.error(
+            "An HTTP error %s occurred while banning %s: %s",
+            e.resp.status,
+            channel_id,
+            e.content,
         )
         return None
 
@@ -118,13 +266,13 @@ def get_own_channel_name(youtube: Resource) -> Optional[str]:
     """Gets the channel name of the authenticated user."""
     try:
         request = youtube.channels().list(part="snippet", mine=True)
-        response: Dict[str, Any] = request.execute()
+        response = execute(request, "channels.list", config.API_NUM_RETRIES)
         if not response.get("items"):
-            logging.warning(
+            logger.warning(
                 "Could not retrieve authenticated user's channel information."
             )
             return None
         return response["items"][0]["snippet"]["title"]
     except HttpError as e:
-        logging.error(f"An HTTP error {e.resp.status} occurred: {e.content}")
+        logger.error("An HTTP error %s occurred: %s", e.resp.status, e.content)
         return None